@@ -0,0 +1,80 @@
+"""Append benchmark: time of `YarrowDataset.append` and `YarrowDataset.__eq__`
+on datasets with many annotations.
+
+Run with:
+
+    python benchmarks/bench_append.py --size 100000
+
+Two datasets of `size` annotations are built, the second one shares half of
+its annotations with the first one, then the second one is appended to the
+first one. Most of the time goes to hashing and comparing annotations.
+"""
+
+import argparse
+from time import perf_counter
+
+from bench_load import make_dataset
+
+from yarrow import *
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--size", type=int, default=100_000, help="Number of annotations per dataset"
+    )
+    args = parser.parse_args()
+
+    yar_pydantic = make_dataset(args.size)
+    half = args.size // 2
+    yar_other = make_dataset(args.size - half)
+    yar_other.annotations = yar_pydantic.annotations[:half] + yar_other.annotations
+    yar_other.images = yar_pydantic.images + yar_other.images
+    yar_other.categories = yar_pydantic.categories + yar_other.categories
+    yar_other.contributors = yar_pydantic.contributors + yar_other.contributors
+    yar_other.confidential = yar_pydantic.confidential + yar_other.confidential
+
+    yar_first = YarrowDataset.from_yarrow(yar_pydantic)
+    yar_second = YarrowDataset.from_yarrow(yar_other)
+    yar_copy = YarrowDataset.from_yarrow(yar_pydantic)
+
+    start = perf_counter()
+    yar_first.append(yar_second)
+    append_time = perf_counter() - start
+
+    start = perf_counter()
+    yar_second == yar_copy
+    eq_time = perf_counter() - start
+
+    start = perf_counter()
+    yar_copy.add_annotations(yar_copy.annotations)
+    readd_time = perf_counter() - start
+
+    yar_empty = YarrowDataset(info=yar_copy.info)
+    start = perf_counter()
+    yar_empty.add_annotations(yar_second.annotations)
+    add_time = perf_counter() - start
+
+    yar_empty = YarrowDataset(info=yar_copy.info)
+    start = perf_counter()
+    yar_empty.add_annotations_bulk(yar_second.annotations)
+    bulk_time = perf_counter() - start
+
+    start = perf_counter()
+    yar_copy.add_annotations_bulk(yar_copy.annotations)
+    bulk_readd_time = perf_counter() - start
+
+    print("annotations per dataset: {}".format(args.size))
+    print("annotations after append: {}".format(len(yar_first.annotations)))
+    print("{:<34} {:>8.3f} s".format("append", append_time))
+    print("{:<34} {:>8.3f} s".format("__eq__", eq_time))
+    print("{:<34} {:>8.3f} s".format("add_annotations (existing)", readd_time))
+    print(
+        "{:<34} {:>8.3f} s".format("add_annotations_bulk (existing)", bulk_readd_time)
+    )
+    print("{:<34} {:>8.3f} s".format("add_annotations (empty dataset)", add_time))
+    print("{:<34} {:>8.3f} s".format("add_annotations_bulk (empty dataset)", bulk_time))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Load benchmark of the columnar binary format against JSON.
+
+Run with:
+
+    python benchmarks/bench_binary.py --sizes 10000 100000 1000000
+"""
+
+import argparse
+import os
+import tempfile
+from time import perf_counter
+
+from bench_load import make_dataset
+
+from yarrow import *
+
+
+def timed(func, *args, **kwargs) -> float:
+    start = perf_counter()
+    func(*args, **kwargs)
+    return perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[10_000, 100_000, 1_000_000],
+        help="Numbers of annotations to benchmark",
+    )
+    args = parser.parse_args()
+
+    print(
+        "{:>12} {:>10} {:>14} {:>10} {:>10}".format(
+            "annotations", "json (s)", "trusted (s)", "binary (s)", "speedup"
+        )
+    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_path = os.path.join(tmp_dir, "dataset.yarrow.json")
+        binary_path = os.path.join(tmp_dir, "dataset.yarrow.npz")
+        for size in args.sizes:
+            yar_dataset = make_dataset(size)
+            yar_dataset.save_to_file(json_path)
+            yar_dataset.to_binary(binary_path)
+            del yar_dataset
+
+            json_time = timed(YarrowDataset_pydantic.parse_file, json_path)
+            trusted_time = timed(
+                YarrowDataset_pydantic.parse_file, json_path, validate=False
+            )
+            binary_time = timed(YarrowDataset_pydantic.from_binary, binary_path)
+            print(
+                "{:>12} {:>10.3f} {:>14.3f} {:>10.3f} {:>9.1f}x".format(
+                    size, json_time, trusted_time, binary_time, json_time / binary_time
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
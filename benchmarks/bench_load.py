@@ -0,0 +1,77 @@
+"""Load benchmark: time to turn a parsed `YarrowDataset_pydantic` into a
+`YarrowDataset` for a growing number of annotations.
+
+Run with:
+
+    python benchmarks/bench_load.py --sizes 1000 10000 100000 1000000
+
+The time per annotation should stay roughly constant when the number of
+annotations grows, i.e. `YarrowDataset.from_yarrow` scales linearly.
+"""
+
+import argparse
+from time import perf_counter
+
+from yarrow import *
+
+
+def make_dataset(
+    nb_annotations: int, nb_categories: int = 500, nb_contributors: int = 50
+) -> YarrowDataset_pydantic:
+    """Build a valid dataset with `nb_annotations` annotations spread over
+    `nb_annotations // 10` images"""
+    categories = [rand_category() for _ in range(nb_categories)]
+    contributors = [rand_contrib() for _ in range(nb_contributors)]
+    confidential = [rand_clearance() for _ in range(4)]
+    images = [rand_image(confidential) for _ in range(max(1, nb_annotations // 10))]
+    annotations = [
+        rand_annot(
+            image_id=images[i % len(images)].id,
+            cat_id=categories[i % nb_categories].id,
+            contrib_id=contributors[i % nb_contributors].id,
+        )
+        for i in range(nb_annotations)
+    ]
+    return rand_dataset(
+        images=images,
+        annotations=annotations,
+        categories=categories,
+        contributors=contributors,
+        confidential=confidential,
+        multilayer_images=[],
+    )
+
+
+def bench_from_yarrow(nb_annotations: int, repeat: int = 1) -> float:
+    yar_pydantic = make_dataset(nb_annotations)
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        YarrowDataset.from_yarrow(yar_pydantic)
+        best = min(best, perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1_000, 10_000, 100_000, 1_000_000],
+        help="Numbers of annotations to benchmark",
+    )
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    print("{:>12} {:>12} {:>16}".format("annotations", "seconds", "us/annotation"))
+    for size in args.sizes:
+        duration = bench_from_yarrow(size, args.repeat)
+        print(
+            "{:>12} {:>12.3f} {:>16.2f}".format(size, duration, duration / size * 1e6)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Memory benchmark: memory held by the runtime classes of a `YarrowDataset`.
+
+Run with:
+
+    python benchmarks/bench_memory.py --sizes 100000 1000000
+
+The dataset is built by `rand_dataset`, see `bench_load.make_dataset`. Three
+numbers are reported per annotation: the memory allocated by
+`YarrowDataset.from_yarrow`, the memory still held once the result of
+`YarrowDataset.pydantic()` is dropped, and the size of a single `Annotation` object
+without the values it references. Both the default classes and the slotted
+ones of `from_yarrow(slots=True)` are measured.
+"""
+
+import argparse
+import gc
+import sys
+import tracemalloc
+
+from bench_load import make_dataset
+
+from yarrow import *
+
+
+def object_size(obj) -> int:
+    """Size of the object itself and of its instance dict if it has one"""
+    size = sys.getsizeof(obj)
+    if type(obj).__dictoffset__ != 0:
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+
+def traced(func, *args):
+    gc.collect()
+    tracemalloc.start()
+    result = func(*args)
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def discarded(func, *args) -> None:
+    """Calls `func` and drops its result"""
+    func(*args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[100_000, 1_000_000],
+        help="Numbers of annotations to benchmark",
+    )
+    args = parser.parse_args()
+
+    print(
+        "{:>12} {:>6} {:>14} {:>18} {:>18} {:>14}".format(
+            "annotations",
+            "slots",
+            "dataset (MB)",
+            "B/annot from_yarrow",
+            "B/annot pydantic()",
+            "B/Annotation",
+        )
+    )
+    for size in args.sizes:
+        for slots in (False, True):
+            yar_pydantic = make_dataset(size)
+            yar_dataset, loaded = traced(YarrowDataset.from_yarrow, yar_pydantic, slots)
+            del yar_pydantic
+            _, kept = traced(discarded, yar_dataset.pydantic)
+            print(
+                "{:>12} {:>6} {:>14.1f} {:>18.0f} {:>18.0f} {:>14}".format(
+                    size,
+                    str(slots),
+                    loaded / 2**20,
+                    loaded / size,
+                    kept / size,
+                    object_size(yar_dataset.annotations[0]),
+                )
+            )
+            del yar_dataset
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Merge benchmark: `YarrowDataset.extend` and `yarrow.load_many` on many small
+datasets, like one yarrow file per camera.
+
+Run with:
+
+    python benchmarks/bench_merge.py --files 200 --annotations 500 --workers 4
+
+Each dataset shares its categories and contributors with the others and a
+tenth of its annotations with the previous dataset.
+"""
+
+import argparse
+import os
+import pickle
+import tempfile
+from time import perf_counter
+
+from bench_load import make_dataset
+
+from yarrow import *
+from yarrow.load import _compact_parse
+
+
+def make_datasets(nb_files: int, nb_annotations: int) -> list:
+    base = make_dataset(nb_annotations, nb_categories=50, nb_contributors=10)
+    result = [base]
+    for _ in range(nb_files - 1):
+        yar_new = make_dataset(nb_annotations, nb_categories=1, nb_contributors=1)
+        previous = result[-1]
+        shared = previous.annotations[: nb_annotations // 10]
+        for annot in yar_new.annotations:
+            annot.category_id = base.categories[hash(annot.id) % 50].id
+            annot.contributor_id = base.contributors[hash(annot.id) % 10].id
+        yar_new.annotations = shared + yar_new.annotations[len(shared) :]
+        shared_ids = {annot.image_id for annot in shared}
+        yar_new.images = [
+            img for img in previous.images if img.id in shared_ids
+        ] + yar_new.images
+        yar_new.categories = base.categories
+        yar_new.contributors = base.contributors
+        yar_new.confidential = base.confidential
+        result.append(yar_new)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--annotations", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    datasets = make_datasets(args.files, args.annotations)
+    yarrows = [YarrowDataset.from_yarrow(yar) for yar in datasets]
+
+    start = perf_counter()
+    yar_append = YarrowDataset(info=yarrows[0].info)
+    for yarrow in yarrows:
+        yar_append.append(yarrow)
+    append_time = perf_counter() - start
+
+    start = perf_counter()
+    yar_extend = YarrowDataset(info=yarrows[0].info)
+    yar_extend.extend(yarrows)
+    extend_time = perf_counter() - start
+
+    print("{} datasets of {} annotations".format(args.files, args.annotations))
+    print("annotations after merge: {}".format(len(yar_extend.annotations)))
+    print("{:<32} {:>8.3f} s".format("append loop", append_time))
+    print("{:<32} {:>8.3f} s".format("extend", extend_time))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = []
+        for idx, yar in enumerate(datasets):
+            paths.append(os.path.join(tmp_dir, "{}.yarrow.json".format(idx)))
+            yar.save_to_file(paths[-1])
+
+        for workers in (1, args.workers):
+            start = perf_counter()
+            load_many(paths, workers=workers)
+            print(
+                "{:<32} {:>8.3f} s".format(
+                    "load_many, workers={}".format(workers), perf_counter() - start
+                )
+            )
+
+        # Size of what a worker sends back for one file
+        pickled = pickle.dumps(YarrowDataset_pydantic.parse_file(paths[1]))
+        compact = _compact_parse(paths[1], validate=True)
+        print(
+            "{:<32} {:>8} B pickled, {} B compact".format(
+                "result of one file", len(pickled), len(compact)
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Region query benchmark: `BoxIndex` against brute force scans over the boxes
+of a single image.
+
+Run with:
+
+    python benchmarks/bench_spatial.py --sizes 1000 10000 100000
+
+For each size, an image of 10000x10000 pixels gets `size` boxes of at most 100
+pixels and `--queries` crops of 512x512 pixels are queried with a Python loop
+over the `Annotation.bbox` lists, a NumPy scan of all the boxes and the
+R-tree. The build time of the R-tree is reported separately.
+"""
+
+import argparse
+from time import perf_counter
+
+import numpy as np
+
+from yarrow import *
+
+
+def python_query(bboxes: list, region: list) -> list:
+    left, top, right, bottom = region
+    return [
+        row
+        for row, bbox in enumerate(bboxes)
+        if bbox[0] <= right and bbox[2] >= left and bbox[1] <= bottom and bbox[3] >= top
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1_000, 10_000, 100_000],
+        help="Numbers of boxes of the image",
+    )
+    parser.add_argument("--queries", type=int, default=200, help="Number of crops")
+    args = parser.parse_args()
+
+    print(
+        "{:>8} {:>12} {:>12} {:>12} {:>12} {:>10}".format(
+            "boxes", "build (ms)", "python (ms)", "numpy (ms)", "rtree (ms)", "speedup"
+        )
+    )
+    rng = np.random.default_rng(0)
+    for size in args.sizes:
+        corners = rng.uniform(0, 10_000, size=(size, 2))
+        boxes = np.concatenate(
+            (corners, corners + rng.uniform(1, 100, size=(size, 2))), axis=1
+        )
+        bboxes = boxes.tolist()
+        crops = rng.uniform(0, 10_000 - 512, size=(args.queries, 2))
+        regions = np.concatenate((crops, crops + 512), axis=1).tolist()
+
+        start = perf_counter()
+        index = BoxIndex(boxes)
+        build_time = perf_counter() - start
+
+        timings = []
+        results = []
+        for query in (
+            lambda region: python_query(bboxes, region),
+            lambda region: brute_force_query(boxes, region).tolist(),
+            lambda region: index.query(region).tolist(),
+        ):
+            start = perf_counter()
+            results.append([query(region) for region in regions])
+            timings.append((perf_counter() - start) / args.queries)
+        assert results[0] == results[1] == results[2]
+
+        print(
+            "{:>8} {:>12.3f} {:>12.3f} {:>12.3f} {:>12.3f} {:>9.1f}x".format(
+                size,
+                build_time * 1e3,
+                *(timing * 1e3 for timing in timings),
+                timings[1] / timings[2],
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,14 @@
 from . import _version
 from ._yarrow_version import _yarrow_version
+from .aio import *
+from .iou import *
+from .json_backend import *
+from .load import *
 from .main import *
+from .spatial import *
+from .splits import *
+from .stream import *
+from .table import *
 from .utils import *
 from .yarrow import *
 from .yarrow_cls import *
@@ -0,0 +1,177 @@
+"""Asynchronous loading of yarrow files from local or remote storage.
+
+The files are read through a `ByteSource`, an object with an async `read`
+method returning the content of a file. `LocalSource` reads a local directory,
+remote storages are supported by implementing `read` with an async client:
+
+>>> class BlobSource(ByteSource):
+        async def read(self, path: str) -> bytes:
+            return await container.download_blob(path).readall()
+
+    yar_dataset = await aload_many(paths, source=BlobSource(), concurrency=64)
+
+The files are fetched concurrently, at most `concurrency` at a time, and each
+one is parsed in a thread as soon as it is received so the event loop is not
+blocked. Compressed and binary files are recognized by their extension like in
+`YarrowDataset.parse_file`.
+"""
+
+import abc
+import asyncio
+import io
+import os
+from typing import IO, Iterable, List, Union
+
+from . import binary
+from .compression import decompress
+from .yarrow import *
+from .yarrow_cls import YarrowDataset
+
+
+class ByteSource(abc.ABC):
+    """Interface of the storages yarrow files are read from, the paths are the
+    ones given to `aparse`/`aload_many`"""
+
+    @abc.abstractmethod
+    async def read(self, path: str) -> bytes:
+        """Content of a file"""
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as fp:
+        return fp.read()
+
+
+class LocalSource(ByteSource):
+    """Files of a local directory, they are read in threads
+
+    Args:
+        root (Union[str, os.PathLike], optional): directory the paths are relative \
+            to, absolute paths are used as is. Defaults to the current directory.
+    """
+
+    def __init__(self, root: Union[str, os.PathLike] = None) -> None:
+        self.root = os.fspath(root) if root is not None else os.getcwd()
+
+    def __repr__(self) -> str:
+        return "LocalSource(root={!r})".format(self.root)
+
+    async def read(self, path: str) -> bytes:
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            None, _read_file, os.path.join(self.root, os.fspath(path))
+        )
+
+
+def _parse_bytes(data: bytes, name: str, validate: bool) -> YarrowDataset_pydantic:
+    data = decompress(data, name)
+    if binary.is_binary(name):
+        return binary.from_binary(io.BytesIO(data))
+    return YarrowDataset_pydantic.parse_raw(data, validate=validate)
+
+
+async def _aread(
+    path_or_stream: Union[str, os.PathLike, IO], source: ByteSource
+) -> bytes:
+    if isinstance(path_or_stream, (str, os.PathLike)):
+        return await (source or LocalSource()).read(os.fspath(path_or_stream))
+    data = path_or_stream.read()
+    if asyncio.iscoroutine(data) or isinstance(data, asyncio.Future):
+        data = await data
+    return data.encode("utf-8") if isinstance(data, str) else data
+
+
+async def aparse_pydantic(
+    path_or_stream: Union[str, os.PathLike, IO],
+    source: ByteSource = None,
+    validate: bool = True,
+    name: str = None,
+) -> YarrowDataset_pydantic:
+    """Reads and parses a yarrow file without blocking the event loop
+
+    Args:
+        path_or_stream (Union[str, os.PathLike, IO]): path read through `source` or \
+            stream with a `read()` method, synchronous or asynchronous like \
+            `asyncio.StreamReader`
+        source (ByteSource, optional): storage of the paths. Defaults to `LocalSource()`.
+        validate (bool, optional): validate the JSON files with pydantic, see \
+            `YarrowDataset_pydantic.parse_file`. Defaults to True.
+        name (str, optional): file name giving the format and the compression of \
+            a stream, ex: "file.yarrow.json.gz". Defaults to the path or the `name` \
+            attribute of the stream.
+
+    Returns:
+        YarrowDataset_pydantic
+    """
+    data = await _aread(path_or_stream, source)
+    if name is None:
+        name = path_or_stream
+        if not isinstance(name, (str, os.PathLike)):
+            name = getattr(path_or_stream, "name", "")
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(
+        None, _parse_bytes, data, os.fspath(name), validate
+    )
+
+
+async def aparse(
+    path_or_stream: Union[str, os.PathLike, IO],
+    source: ByteSource = None,
+    validate: bool = True,
+    name: str = None,
+) -> YarrowDataset:
+    """`YarrowDataset` version of `aparse_pydantic`, see `YarrowDataset.aparse`"""
+    yarrow = await aparse_pydantic(path_or_stream, source, validate, name)
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(None, YarrowDataset.from_yarrow, yarrow)
+
+
+async def aload_many(
+    paths: Iterable[Union[str, os.PathLike]],
+    source: ByteSource = None,
+    concurrency: int = 16,
+    info: Info = None,
+    validate: bool = True,
+) -> YarrowDataset:
+    """Fetches and parses yarrow files concurrently and merges them in a single
+    dataset, the asynchronous version of `yarrow.load_many`
+
+    Args:
+        paths (Iterable[Union[str, os.PathLike]]): paths read through `source`
+        source (ByteSource, optional): storage of the files. Defaults to `LocalSource()`.
+        concurrency (int, optional): maximum number of files fetched at the same \
+            time. Defaults to 16.
+        info (Info, optional): info of the merged dataset. Defaults to the info \
+            of the first file.
+        validate (bool, optional): see `aparse`. Defaults to True.
+
+    Raises:
+        ValueError: if there is no file and no info
+
+    Returns:
+        YarrowDataset: the merged dataset, the files are merged in the order of `paths`
+    """
+    paths = list(paths)
+    if info is None and not paths:
+        raise ValueError("no file to merge and no info given")
+    source = source or LocalSource()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(path) -> YarrowDataset:
+        async with semaphore:
+            data = await source.read(os.fspath(path))
+        return await aparse(io.BytesIO(data), validate=validate, name=os.fspath(path))
+
+    yarrows = await asyncio.gather(*(fetch(path) for path in paths))
+
+    # A large merge would block the other coroutines of the loop
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(
+        None, _merge, yarrows[0].info if info is None else info, yarrows
+    )
+
+
+def _merge(info: Info, yarrows: List[YarrowDataset]) -> YarrowDataset:
+    merged = YarrowDataset(info=info)
+    merged.extend(yarrows)
+    return merged
@@ -0,0 +1,511 @@
+"""Columnar binary container for yarrow datasets.
+
+A binary yarrow file, `.yarrow.npz` by convention, is a zip archive of NumPy
+`.npy` arrays, one or more per field of each section, plus a `header.json`
+member holding the `Info` and the layout of the columns:
+
+- strings, including the ids, are stored once in a string table and the
+  columns hold int32 indexes into it, -1 meaning None
+- numbers, booleans and datetimes are typed arrays, with a `.null` boolean
+  array when some values are None
+- `bbox` is a (N, 4) float array when all the boxes have 4 values
+- `image_id` and `category_id` references are offsets into a flat array of
+  string indexes, with a flag telling if the value was a list
+- the irregular fields (meta, polygons, masks, layers...) are JSON values
+  stored only for the rows where they are set
+- the fields set of the elements are the fields that are not None, a `.set`
+  boolean array records them when a column has a default value that was not
+  set, ex: `is_crowd`, or a None value that was set
+
+The members are not compressed by default so that the arrays can be memory
+mapped, see `yarrow.lazy`. `from_binary` loads about 5 times faster than a
+validated JSON parse and 2 times faster than a trusted one, most of its time
+goes to building the pydantic objects, see `benchmarks/bench_binary.py`.
+
+>>> to_binary(yar_dataset_pydantic, "path/to/file.yarrow.npz")
+    yar_dataset_pydantic = from_binary("path/to/file.yarrow.npz")
+
+"""
+
+import gc
+import json
+import os
+import zipfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import IO, Any, Dict, List, Tuple, Union
+
+import numpy as np
+from pydantic import BaseModel
+
+from .json_backend import get_json_backend
+from .yarrow import *
+from .yarrow import _TRUSTED_CONVERTERS, _construct
+
+BINARY_FORMAT = "yarrow-columnar"
+BINARY_VERSION = 1
+BINARY_EXTENSION = ".npz"
+
+# Storage kind of each field, "vector" and "refs" fall back to "json" when the
+# values do not fit
+SECTION_COLUMNS = {
+    "images": {
+        "id": "str",
+        "width": "int",
+        "height": "int",
+        "file_name": "str",
+        "date_captured": "datetime",
+        "azure_url": "str",
+        "confidential_id": "str",
+        "meta": "json",
+        "comment": "str",
+        "asset_id": "str",
+        "layers": "json",
+        "split": "str",
+    },
+    "annotations": {
+        "id": "str",
+        "image_id": "refs",
+        "category_id": "refs",
+        "contributor_id": "str",
+        "name": "str",
+        "comment": "str",
+        "segmentation": "json",
+        "is_crowd": "int",
+        "mask": "json",
+        "polygon": "json",
+        "polyline": "json",
+        "area": "float",
+        "bbox": "vector",
+        "keypoints": "json",
+        "num_keypoints": "int",
+        "weight": "float",
+        "date_captured": "datetime",
+        "meta": "json",
+    },
+    "confidential": {"id": "str", "level": "int", "perimeter": "str"},
+    "contributors": {
+        "id": "str",
+        "human": "bool",
+        "name": "str",
+        "model_id": "str",
+        "human_id": "str",
+    },
+    "categories": {
+        "id": "str",
+        "name": "str",
+        "value": "str",
+        "super_category": "str",
+        "keypoints": "json",
+        "skeleton": "json",
+    },
+    "multilayer_images": {
+        "id": "str",
+        "image_id": "refs",
+        "name": "str",
+        "meta": "json",
+        "split": "str",
+    },
+}
+
+SECTION_MODELS = {
+    "images": Image_pydantic,
+    "annotations": Annotation_pydantic,
+    "confidential": Clearance,
+    "contributors": Contributor,
+    "categories": Category,
+    "multilayer_images": MultilayerImage_pydantic,
+}
+
+_NUMERIC_DTYPES = {"int": np.int64, "float": np.float64, "bool": np.bool_}
+_NAIVE = np.iinfo(np.int32).min
+_EPOCH = datetime(1970, 1, 1)
+
+
+@contextmanager
+def _gc_paused():
+    """The garbage collector is paused while building many objects that cannot
+    hold reference cycles, its repeated passes would dominate the load time"""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _kept_fields(model: BaseModel) -> set:
+    """Fields of a pydantic object that are written, the fields set and the
+    generated ones like the ids, the other ones take their default when read"""
+    return {
+        name
+        for name, field in model.__fields__.items()
+        if name in model.__fields_set__ or field.default_factory is not None
+    }
+
+
+def _plain(value: Any) -> Any:
+    """Nested pydantic objects to plain python values"""
+    if isinstance(value, BaseModel):
+        return {name: _plain(getattr(value, name)) for name in _kept_fields(value)}
+    if isinstance(value, list):
+        return [_plain(elem) for elem in value]
+    return value
+
+
+class _StringTable:
+    def __init__(self) -> None:
+        self._index = {}
+        self.strings = []
+
+    def add(self, value: str) -> int:
+        if value is None:
+            return -1
+        idx = self._index.get(value)
+        if idx is None:
+            idx = self._index[value] = len(self.strings)
+            self.strings.append(value)
+        return idx
+
+
+def _json_blob(values: List[Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """Every value followed by a comma, and the offsets of the values"""
+    dumps = get_json_backend().dumps
+    encoded = [(dumps(value, default=str) + ",").encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(text) for text in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _load_blob(blob: np.ndarray) -> list:
+    """Decodes all the values of a `_json_blob` at once"""
+    if len(blob) == 0:
+        return []
+    return get_json_backend().loads(b"[" + blob[:-1].tobytes() + b"]")
+
+
+def _load_blob_item(blob: np.ndarray, offsets: np.ndarray, idx: int) -> Any:
+    return get_json_backend().loads(blob[offsets[idx] : offsets[idx + 1] - 1].tobytes())
+
+
+def _encode_column(
+    kind: str, values: List[Any], strings: _StringTable
+) -> Tuple[str, Dict[str, np.ndarray]]:
+    """Returns the kind actually used and the arrays of a column"""
+    null = np.array([value is None for value in values], dtype=np.bool_)
+    arrays = {}
+
+    if kind == "vector":
+        lengths = {len(value) for value in values if value is not None}
+        if len(lengths) != 1:
+            kind = "json"
+        else:
+            width = lengths.pop()
+            fill = [0.0] * width
+            arrays[""] = np.array(
+                [fill if value is None else value for value in values],
+                dtype=np.float64,
+            ).reshape(len(values), width)
+    elif kind == "refs":
+        if not all(isinstance(value, (str, list)) for value in values):
+            kind = "json"
+        else:
+            is_list = [isinstance(value, list) for value in values]
+            refs = [value if lst else [value] for value, lst in zip(values, is_list)]
+            offsets = np.zeros(len(refs) + 1, dtype=np.int64)
+            np.cumsum([len(ref) for ref in refs], out=offsets[1:])
+            arrays["is_list"] = np.array(is_list, dtype=np.bool_)
+            arrays["offsets"] = offsets
+            arrays["values"] = np.array(
+                [strings.add(idx) for ref in refs for idx in ref], dtype=np.int32
+            )
+            return kind, arrays
+
+    if kind == "str":
+        arrays[""] = np.array([strings.add(value) for value in values], dtype=np.int32)
+        return kind, arrays
+    elif kind in _NUMERIC_DTYPES:
+        arrays[""] = np.array(
+            [0 if value is None else value for value in values],
+            dtype=_NUMERIC_DTYPES[kind],
+        )
+    elif kind == "datetime":
+        naive = [
+            _EPOCH if value is None else value.replace(tzinfo=None) for value in values
+        ]
+        arrays[""] = np.array(naive, dtype="datetime64[us]").astype(np.int64)
+        offsets = [
+            (
+                _NAIVE
+                if value is None or value.utcoffset() is None
+                else int(value.utcoffset().total_seconds())
+            )
+            for value in values
+        ]
+        if any(offset != _NAIVE for offset in offsets):
+            arrays["utcoffset"] = np.array(offsets, dtype=np.int32)
+    elif kind == "json":
+        present = [_plain(value) for value in values if value is not None]
+        arrays["rows"] = np.flatnonzero(~null)
+        arrays["blob"], arrays["offsets"] = _json_blob(present)
+        return kind, arrays
+
+    if null.any():
+        arrays["null"] = null
+    return kind, arrays
+
+
+def _decode_column(
+    kind: str, arrays: Dict[str, np.ndarray], strings: List[str], length: int
+) -> List[Any]:
+    if kind == "str":
+        return [None if idx < 0 else strings[idx] for idx in arrays[""].tolist()]
+    if kind == "refs":
+        values = [strings[idx] for idx in arrays["values"].tolist()]
+        offsets = arrays["offsets"].tolist()
+        return [
+            values[start:end] if is_list else values[start]
+            for start, end, is_list in zip(
+                offsets[:-1], offsets[1:], arrays["is_list"].tolist()
+            )
+        ]
+    if kind == "json":
+        result = [None] * length
+        for row, value in zip(arrays["rows"].tolist(), _load_blob(arrays["blob"])):
+            result[row] = value
+        return result
+
+    if kind == "datetime":
+        values = arrays[""].astype("datetime64[us]").astype(object).tolist()
+        if "utcoffset" in arrays:
+            for row, offset in enumerate(arrays["utcoffset"].tolist()):
+                if offset != _NAIVE:
+                    values[row] = values[row].replace(
+                        tzinfo=timezone(timedelta(seconds=offset))
+                    )
+    else:
+        values = arrays[""].tolist()
+    if "null" in arrays:
+        for row in np.flatnonzero(arrays["null"]).tolist():
+            values[row] = None
+    return values
+
+
+def _fields_set_array(elems: list, name: str, values: List[Any]) -> np.ndarray:
+    """Rows where `name` is in the fields set, None when they are the rows where
+    the value is not None"""
+    is_set = [name in elem.__fields_set__ for elem in elems]
+    if all(flag == (value is not None) for flag, value in zip(is_set, values)):
+        return None
+    return np.array(is_set, dtype=np.bool_)
+
+
+def _build_models(
+    model: type,
+    columns: Dict[str, List[Any]],
+    length: int,
+    fields_set: Dict[str, np.ndarray] = None,
+) -> list:
+    """Instantiates `model` without validation from decoded columns, the fields
+    set are the rows of the `.set` array of a column when it has one, the values
+    that are not None otherwise"""
+    fields_set = fields_set or {}
+    converters = _TRUSTED_CONVERTERS.get(model, {})
+    for name, values in columns.items():
+        if name in converters:
+            convert = converters[name]
+            columns[name] = [None if val is None else convert(val) for val in values]
+
+    names = [name for name in model.__fields__ if name in columns]
+    missing = [field for name, field in model.__fields__.items() if name not in columns]
+    result = []
+    new = model.__new__
+    setattr_ = object.__setattr__
+    # Only the columns set on some rows need a per row check
+    always_set = set()
+    mixed = []
+    for name in names:
+        flags = fields_set.get(name)
+        if flags is None:
+            flags = [value is not None for value in columns[name]]
+        else:
+            flags = flags.tolist()
+        nb_set = sum(flags)
+        if nb_set == length:
+            always_set.add(name)
+        elif nb_set:
+            mixed.append((name, flags))
+
+    for idx, row in enumerate(zip(*(columns[name] for name in names))):
+        values = dict(zip(names, row))
+        elem_set = set(always_set)
+        for name, flags in mixed:
+            if flags[idx]:
+                elem_set.add(name)
+        for field in missing:
+            values[field.name] = field.get_default()
+        elem = new(model)
+        setattr_(elem, "__dict__", values)
+        setattr_(elem, "__fields_set__", elem_set)
+        result.append(elem)
+    return result
+
+
+def _write_array(archive: zipfile.ZipFile, name: str, array: np.ndarray) -> None:
+    with archive.open(name + ".npy", "w", force_zip64=True) as fp:
+        np.lib.format.write_array(fp, np.ascontiguousarray(array), allow_pickle=False)
+
+
+def to_binary(
+    yarrow: YarrowDataset_pydantic,
+    path: Union[str, os.PathLike, IO[bytes]],
+    compress: bool = False,
+) -> None:
+    """Writes a dataset to the columnar binary format
+
+    Args:
+        yarrow (YarrowDataset_pydantic): dataset to write
+        path (Union[str, os.PathLike, IO[bytes]]): output path, by convention ending \
+            with .yarrow.npz, or binary file object, ex: `io.BytesIO`
+        compress (bool, optional): deflate the zip members, the file cannot be \
+            memory mapped anymore. Defaults to False.
+    """
+    strings = _StringTable()
+    header = {
+        "format": BINARY_FORMAT,
+        "version": BINARY_VERSION,
+        "info": json.loads(yarrow.info.json(include=_kept_fields(yarrow.info))),
+        "sections": {},
+    }
+    compression = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+
+    with zipfile.ZipFile(path, "w", compression=compression) as archive:
+        for section, columns in SECTION_COLUMNS.items():
+            elems = getattr(yarrow, section)
+            section_header = {"length": None if elems is None else len(elems)}
+            section_header["columns"] = {}
+            for name, kind in columns.items():
+                values = [getattr(elem, name) for elem in elems or []]
+                kind, arrays = _encode_column(kind, values, strings)
+                is_set = _fields_set_array(elems or [], name, values)
+                if is_set is not None:
+                    arrays["set"] = is_set
+                section_header["columns"][name] = kind
+                for suffix, array in arrays.items():
+                    member = "{}/{}".format(section, name)
+                    _write_array(
+                        archive, member + ("." + suffix if suffix else ""), array
+                    )
+            header["sections"][section] = section_header
+
+        blob, offsets = _json_blob(strings.strings)
+        _write_array(archive, "strings/blob", blob)
+        _write_array(archive, "strings/offsets", offsets)
+        archive.writestr("header.json", json.dumps(header, default=str))
+
+
+class BinaryFile:
+    """Read access to the arrays of a binary yarrow file
+
+    Args:
+        path (Union[str, os.PathLike, IO[bytes]]): path to the binary file or \
+            seekable binary file object
+    """
+
+    def __init__(self, path: Union[str, os.PathLike, IO[bytes]]) -> None:
+        self.path = os.fspath(path) if isinstance(path, (str, os.PathLike)) else path
+        with zipfile.ZipFile(self.path) as archive:
+            self._members = set(archive.namelist())
+            if "header.json" not in self._members:
+                raise ValueError("{} is not a binary yarrow file".format(self.path))
+            self.header = json.loads(archive.read("header.json"))
+        if self.header.get("format") != BINARY_FORMAT:
+            raise ValueError("{} is not a binary yarrow file".format(self.path))
+        if self.header.get("version", 0) > BINARY_VERSION:
+            raise ValueError(
+                "{} was written by a newer version of yarrow".format(self.path)
+            )
+
+    @property
+    def info(self) -> Info:
+        return Info.parse_obj(self.header["info"])
+
+    def length(self, section: str) -> int:
+        """Number of elements of a section, None if it was None in the dataset"""
+        return self.header["sections"][section]["length"]
+
+    def kind(self, section: str, column: str) -> str:
+        return self.header["sections"][section]["columns"][column]
+
+    def _read(self, archive: zipfile.ZipFile, member: str) -> np.ndarray:
+        with archive.open(member) as fp:
+            return np.lib.format.read_array(fp, allow_pickle=False)
+
+    def column_arrays(
+        self, section: str, column: str, archive: zipfile.ZipFile = None
+    ) -> Dict[str, np.ndarray]:
+        """Arrays of a column keyed by their suffix, "" for the main array"""
+        if archive is None:
+            with zipfile.ZipFile(self.path) as archive:
+                return self.column_arrays(section, column, archive)
+
+        prefix = "{}/{}".format(section, column)
+        result = {}
+        for member in self._members:
+            if member == prefix + ".npy":
+                result[""] = self._read(archive, member)
+            elif member.startswith(prefix + ".") and member.endswith(".npy"):
+                result[member[len(prefix) + 1 : -4]] = self._read(archive, member)
+        return result
+
+    def strings(self) -> List[str]:
+        """The complete string table"""
+        return _load_blob(self.column_arrays("strings", "blob")[""])
+
+    def read_section(self, section: str, strings: List[str] = None) -> list:
+        """Instantiates all the elements of a section without validation"""
+        length = self.length(section)
+        if length is None:
+            return None
+        strings = self.strings() if strings is None else strings
+        columns = {}
+        fields_set = {}
+        with zipfile.ZipFile(self.path) as archive:
+            for name in self.header["sections"][section]["columns"]:
+                arrays = self.column_arrays(section, name, archive)
+                columns[name] = _decode_column(
+                    self.kind(section, name), arrays, strings, length
+                )
+                if "set" in arrays:
+                    fields_set[name] = arrays["set"]
+        return _build_models(SECTION_MODELS[section], columns, length, fields_set)
+
+
+def from_binary(path: Union[str, os.PathLike, IO[bytes]]) -> YarrowDataset_pydantic:
+    """Reads a dataset written by `to_binary`
+
+    Args:
+        path (Union[str, os.PathLike, IO[bytes]]): path of the binary file or \
+            seekable binary file object
+
+    Raises:
+        ValueError: if the file is not a binary yarrow file or its version is not supported
+
+    Returns:
+        YarrowDataset_pydantic
+    """
+    binary = BinaryFile(path)
+    with _gc_paused():
+        strings = binary.strings()
+        sections = {
+            section: binary.read_section(section, strings)
+            for section in SECTION_COLUMNS
+        }
+    # The sections were validated when written
+    return _construct(YarrowDataset_pydantic, {"info": binary.info, **sections})
+
+
+def is_binary(path: Union[str, os.PathLike]) -> bool:
+    """True if `path` has the binary format extension"""
+    return os.fspath(path).lower().endswith(BINARY_EXTENSION)
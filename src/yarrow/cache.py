@@ -0,0 +1,139 @@
+"""On-disk cache of parsed yarrow files.
+
+`parse_file(path, cache_dir=...)` stores a binary snapshot of each JSON file
+it parses, see `yarrow.binary`, and loads the snapshot instead of the JSON
+file the next time the same file is parsed:
+
+>>> yar_dataset = YarrowDataset.parse_file("path/to/file.yarrow.json.gz", cache_dir="~/.cache/yarrow")
+
+A snapshot is keyed by the absolute path, the size and the modification time
+of the file, a modified file is parsed again. Snapshots are written to a
+temporary file and renamed so jobs sharing a cache directory never read a
+partial one. The least recently used snapshots are removed when the cache
+directory grows over `max_size` bytes.
+"""
+
+import hashlib
+import os
+import tempfile
+import zipfile
+from typing import Callable, List, Tuple, Union
+
+from . import binary
+from ._yarrow_version import _yarrow_version
+from .yarrow import *
+
+DEFAULT_CACHE_SIZE = 10 * 2**30
+CACHE_EXTENSION = ".yarrow" + binary.BINARY_EXTENSION
+
+
+def cache_key(path: Union[str, os.PathLike], validate: bool = True) -> str:
+    """Name of the snapshot of a file, changes when the file is modified
+
+    Args:
+        path (Union[str, os.PathLike]): path of the parsed file
+        validate (bool, optional): snapshots of validated and trusted parses are \
+            kept apart. Defaults to True.
+
+    Returns:
+        str: file name of the snapshot in the cache directory
+    """
+    path = os.path.abspath(os.path.expanduser(os.fspath(path)))
+    stat = os.stat(path)
+    key = "\0".join(
+        [
+            path,
+            str(stat.st_size),
+            str(stat.st_mtime_ns),
+            str(bool(validate)),
+            _yarrow_version,
+            str(binary.BINARY_VERSION),
+        ]
+    )
+    return hashlib.sha256(key.encode("utf-8")).hexdigest() + CACHE_EXTENSION
+
+
+def _snapshots(cache_dir: str) -> List[Tuple[float, int, str]]:
+    """(last use, size, path) of the snapshots of a cache directory"""
+    result = []
+    with os.scandir(cache_dir) as entries:
+        for entry in entries:
+            if not entry.name.endswith(CACHE_EXTENSION) or not entry.is_file():
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                # Removed by another job
+                continue
+            result.append((stat.st_mtime, stat.st_size, entry.path))
+    return result
+
+
+def evict(cache_dir: Union[str, os.PathLike], max_size: int = DEFAULT_CACHE_SIZE):
+    """Removes the least recently used snapshots until the snapshots of
+    `cache_dir` take at most `max_size` bytes"""
+    snapshots = sorted(_snapshots(os.path.expanduser(os.fspath(cache_dir))))
+    total = sum(size for _, size, _ in snapshots)
+    for _, size, path in snapshots:
+        if total <= max_size:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def cached_parse(
+    path: Union[str, os.PathLike],
+    parse: Callable[[], YarrowDataset_pydantic],
+    cache_dir: Union[str, os.PathLike],
+    validate: bool = True,
+    max_size: int = DEFAULT_CACHE_SIZE,
+) -> YarrowDataset_pydantic:
+    """Loads the snapshot of `path` from `cache_dir`, or calls `parse` and saves
+    its result as the snapshot
+
+    Args:
+        path (Union[str, os.PathLike]): path of the parsed file
+        parse (Callable[[], YarrowDataset_pydantic]): parses the file on a miss
+        cache_dir (Union[str, os.PathLike]): directory of the snapshots, created \
+            if it does not exist
+        validate (bool, optional): see `cache_key`. Defaults to True.
+        max_size (int, optional): maximum size in bytes of the snapshots of \
+            `cache_dir`. Defaults to 10 GiB.
+
+    Returns:
+        YarrowDataset_pydantic
+    """
+    cache_dir = os.path.expanduser(os.fspath(cache_dir))
+    snapshot = os.path.join(cache_dir, cache_key(path, validate))
+
+    if os.path.isfile(snapshot):
+        try:
+            yarrow = binary.from_binary(snapshot)
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            # Corrupted or unreadable snapshot, it is replaced below
+            pass
+        else:
+            try:
+                # The modification time of a snapshot is its last use
+                os.utime(snapshot)
+            except OSError:
+                pass
+            return yarrow
+
+    yarrow = parse()
+
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fp:
+            binary.to_binary(yarrow, fp)
+        os.replace(tmp_path, snapshot)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    evict(cache_dir, max_size)
+    return yarrow
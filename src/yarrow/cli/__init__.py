@@ -1,3 +1,4 @@
 from .check import *
+from .convert import *
 from .open import *
 from .save import *
@@ -3,7 +3,7 @@
 import click
 
 from ..yarrow import YarrowDataset_pydantic
-from .open import open_yarrow
+from .open import open_yarrow, trusted_option
 
 
 def check_default(yar: YarrowDataset_pydantic):
@@ -30,9 +30,10 @@ pattern_available = {"default": check_default}
     help="Pattern(s) to check",
     show_choices=True,
 )
-def check(file_path=None, json_str=None, json_opt=False, pattern=None):
+@trusted_option
+def check(file_path=None, json_str=None, json_opt=False, pattern=None, trusted=False):
 
-    yar = open_yarrow(file_path, json_str)
+    yar = open_yarrow(file_path, json_str, validate=not trusted)
 
     if json_opt:
         click.echo({"result": True, "yarrow": yar.json(exclude_unset=True)})
@@ -0,0 +1,74 @@
+"""CLI conversion between the JSON and binary formats"""
+
+import sys
+
+import click
+
+from ..binary import from_binary, is_binary, to_binary
+from .open import open_yarrow, trusted_option
+
+
+@click.command(
+    "convert", help="Convert a yarrow file between the JSON and binary formats"
+)
+@click.option("-f", "--file-path", default=None, help="Yarrow file to convert")
+@click.option(
+    "--output",
+    "output_path",
+    default=None,
+    help="File path to save the file, binary if it ends with .npz, JSON otherwise",
+)
+@trusted_option
+@click.option(
+    "--compress/--no-compress",
+    default=False,
+    help="Deflate the arrays of a binary output, they cannot be memory mapped anymore",
+)
+def convert(
+    file_path: str = None,
+    output_path: str = None,
+    trusted: bool = False,
+    compress: bool = False,
+) -> bool:
+    """Convert a yarrow file, the format of each file is given by its extension,
+    `.npz` for the binary format and JSON otherwise, possibly compressed
+
+    :param file_path: Input file path, defaults to None
+    :type file_path: str, optional
+    :param output_path: Ouput path to save the file, defaults to None
+    :type output_path: str, optional
+    :param trusted: Skip the validation of a JSON input, defaults to False
+    :type trusted: bool, optional
+    :param compress: Deflate the arrays of a binary output, defaults to False
+    :type compress: bool, optional
+    :return: Return True on completion or exits with error code 104 if no
+            output_path was given or exits with error code 105 if the file
+            could not be saved
+    :rtype: bool
+    """
+    if file_path and is_binary(file_path):
+        try:
+            yar = from_binary(file_path)
+        except Exception as e:
+            click.echo("File was not parsed correctly")
+            click.echo(e)
+            sys.exit(101)
+        click.echo("File was successfully parsed")
+    else:
+        yar = open_yarrow(file_path=file_path, validate=not trusted)
+
+    if not output_path:
+        click.echo("No path specified")
+        sys.exit(104)
+
+    try:
+        if is_binary(output_path):
+            to_binary(yar, output_path, compress=compress)
+        else:
+            yar.save_to_file(output_path)
+    except Exception as e:
+        click.echo("Could not save file")
+        click.echo(e)
+        sys.exit(105)
+
+    return True
@@ -8,10 +8,12 @@ import click
 from ..yarrow import YarrowDataset_pydantic
 
 
-def open_yarrow(file_path=None, json_str=None) -> YarrowDataset_pydantic:
+def open_yarrow(
+    file_path=None, json_str=None, validate: bool = True
+) -> YarrowDataset_pydantic:
     if file_path:
         try:
-            yar = YarrowDataset_pydantic.parse_file(file_path)
+            yar = YarrowDataset_pydantic.parse_file(file_path, validate=validate)
         except Exception as e:
             click.echo("File was not parsed correctly")
             click.echo(e)
@@ -19,7 +21,7 @@ def open_yarrow(file_path=None, json_str=None) -> YarrowDataset_pydantic:
         click.echo("File was successfully parsed")
     elif json_str:
         try:
-            yar = YarrowDataset_pydantic.parse_raw(json_str)
+            yar = YarrowDataset_pydantic.parse_raw(json_str, validate=validate)
         except Exception as e:
             click.echo("Text was not parsed correctly")
             click.echo(e)
@@ -30,3 +32,10 @@ def open_yarrow(file_path=None, json_str=None) -> YarrowDataset_pydantic:
         sys.exit(103)
 
     return yar
+
+
+trusted_option = click.option(
+    "--trusted/--no-trusted",
+    default=False,
+    help="Skip the validation, only for yarrow files produced by yarrow",
+)
@@ -4,7 +4,7 @@ import sys
 
 import click
 
-from .open import open_yarrow
+from .open import open_yarrow, trusted_option
 
 
 @click.command("save", help="Save the given content at the specified path")
@@ -13,9 +13,18 @@ from .open import open_yarrow
     "-j", "--json-input", "json_str", default=None, help="Yarrow JSON text to check"
 )
 @click.option(
-    "--output", "output_path", default=None, help="File path to save the file"
+    "--output",
+    "output_path",
+    default=None,
+    help="File path to save the file, compressed if it ends with .gz, .xz or .zst",
 )
-def save(file_path: str = None, json_str: str = None, output_path: str = None) -> None:
+@trusted_option
+def save(
+    file_path: str = None,
+    json_str: str = None,
+    output_path: str = None,
+    trusted: bool = False,
+) -> None:
     """Save the given content, file or string, to the given output path
 
     :param file_path: Input file path, defaults to None
@@ -24,13 +33,15 @@ def save(file_path: str = None, json_str: str = None, output_path: str = None) -
     :type json_str: str, optional
     :param output_path: Ouput path to save the file, defaults to None
     :type output_path: str, optional
+    :param trusted: Skip the validation of the input, defaults to False
+    :type trusted: bool, optional
     :return: Return True on completion or exits with error code 104 if no
             output_path was given or exits with error code 105 if the file
             could not be saved
     :rtype: bool
     """
 
-    yar = open_yarrow(file_path=file_path, json_str=json_str)
+    yar = open_yarrow(file_path=file_path, json_str=json_str, validate=not trusted)
 
     if output_path:
         try:
@@ -0,0 +1,73 @@
+"""Transparent compression of yarrow files based on their extension.
+
+`.gz` (gzip), `.xz` (lzma) and `.zst` (zstandard) files are decompressed and
+compressed on the fly, ex: `dataset.yarrow.json.gz`. The zstandard format
+needs the optional `zstandard` package, `pip install yarrowformat[zstd]`.
+"""
+
+import gzip
+import io
+import lzma
+import os
+from typing import IO, Union
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def _zstd_open(path: Union[str, os.PathLike], mode: str, **kwargs) -> IO:
+    if zstandard is None:
+        raise ImportError(
+            "zstandard is needed to open {}, install it with pip install zstandard".format(
+                path
+            )
+        )
+    return zstandard.open(path, mode, **kwargs)
+
+
+COMPRESSIONS = {".gz": gzip.open, ".xz": lzma.open, ".zst": _zstd_open}
+
+
+def compression_of(path: Union[str, os.PathLike]) -> str:
+    """Returns the compression extension of `path` or None if it is not compressed"""
+    ext = os.path.splitext(os.fspath(path))[1].lower()
+    return ext if ext in COMPRESSIONS else None
+
+
+def open_file(path: Union[str, os.PathLike], mode: str = "r") -> IO:
+    """Opens a possibly compressed file, the (de)compression is streamed
+
+    Args:
+        path (Union[str, os.PathLike]): file path, compressed if its extension is in `COMPRESSIONS`
+        mode (str, optional): "r", "w", "rb" or "wb", text modes use utf-8. Defaults to "r".
+
+    Returns:
+        IO: the opened file
+    """
+    kwargs = {} if "b" in mode else {"encoding": "utf-8"}
+    compression = compression_of(path)
+    if compression is None:
+        return open(path, mode, **kwargs)
+    if "b" not in mode:
+        mode += "t"
+    return COMPRESSIONS[compression](path, mode, **kwargs)
+
+
+def decompress(data: bytes, path: Union[str, os.PathLike]) -> bytes:
+    """Decompresses the content of a file read as bytes, based on the extension of
+    its path, the data is returned as is when the path is not compressed
+
+    Args:
+        data (bytes): content of the file
+        path (Union[str, os.PathLike]): name or path of the file
+
+    Returns:
+        bytes: decompressed content
+    """
+    compression = compression_of(path)
+    if compression is None:
+        return data
+    with COMPRESSIONS[compression](io.BytesIO(data), "rb") as fp:
+        return fp.read()
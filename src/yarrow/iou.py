@@ -0,0 +1,183 @@
+"""Intersection over union of annotation boxes.
+
+`box_iou` computes the IoU matrix of two sets of `[left, top, right, bottom]`
+boxes at once, ex: to match the annotations of a human and a model
+contributor on an image:
+
+>>> human = yar_dataset.annotations_by_contributor(human_contributor)
+    model = yar_dataset.annotations_by_contributor(model_contributor)
+    ious = box_iou(annotation_boxes(human), annotation_boxes(model))
+
+`find_duplicate_annotations` finds the pairs of annotations of the same
+category on the same image whose boxes overlap more than a threshold, over a
+whole dataset. The boxes are grouped by image and category and sorted by
+their left edge, only the boxes of a group starting before the right edge of
+a box are compared to it, the IoU of all the candidate pairs is then computed
+in one NumPy call.
+"""
+
+from typing import List, NamedTuple, Tuple, Union
+
+import numpy as np
+
+from .table import AnnotationTable
+from .yarrow import *
+from .yarrow_cls import Annotation
+
+
+def box_iou(boxes1: np.ndarray, boxes2: np.ndarray) -> np.ndarray:
+    """IoU matrix of two sets of boxes
+
+    Args:
+        boxes1 (np.ndarray): (N, 4) `[left, top, right, bottom]` boxes
+        boxes2 (np.ndarray): (M, 4) boxes
+
+    Returns:
+        np.ndarray: (N, M) float64, 0 for empty boxes and NaN for the rows with a NaN
+    """
+    boxes1 = np.asarray(boxes1, dtype=np.float64).reshape(-1, 4)
+    boxes2 = np.asarray(boxes2, dtype=np.float64).reshape(-1, 4)
+    return paired_iou(boxes1[:, None, :], boxes2[None, :, :])
+
+
+def paired_iou(boxes1: np.ndarray, boxes2: np.ndarray) -> np.ndarray:
+    """IoU of each box of `boxes1` with the box at the same row of `boxes2`, the
+    arrays are broadcast together on their leading dimensions
+
+    Args:
+        boxes1 (np.ndarray): (..., 4) boxes
+        boxes2 (np.ndarray): (..., 4) boxes
+
+    Returns:
+        np.ndarray: (...) float64
+    """
+    boxes1 = np.asarray(boxes1, dtype=np.float64)
+    boxes2 = np.asarray(boxes2, dtype=np.float64)
+    width = np.minimum(boxes1[..., 2], boxes2[..., 2]) - np.maximum(
+        boxes1[..., 0], boxes2[..., 0]
+    )
+    height = np.minimum(boxes1[..., 3], boxes2[..., 3]) - np.maximum(
+        boxes1[..., 1], boxes2[..., 1]
+    )
+    inter = np.clip(width, 0, None) * np.clip(height, 0, None)
+    area1 = (boxes1[..., 2] - boxes1[..., 0]) * (boxes1[..., 3] - boxes1[..., 1])
+    area2 = (boxes2[..., 2] - boxes2[..., 0]) * (boxes2[..., 3] - boxes2[..., 1])
+    union = area1 + area2 - inter
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(
+            union > 0, inter / union, np.where(np.isnan(union), np.nan, 0.0)
+        )
+
+
+def overlapping_pairs(
+    boxes: np.ndarray, groups: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Pairs of rows of the same group whose boxes overlap horizontally, found by
+    sorting the boxes of each group by left edge
+
+    Args:
+        boxes (np.ndarray): (N, 4) boxes, the rows with a NaN are skipped
+        groups (np.ndarray): (N,) int group of each box
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: rows of the first and second box of each pair
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    rows = np.flatnonzero(~np.isnan(boxes).any(axis=1))
+    rows = rows[np.lexsort((boxes[rows, 0], np.asarray(groups)[rows]))]
+    groups = np.asarray(groups)[rows]
+    left, right = boxes[rows, 0], boxes[rows, 2]
+
+    firsts, seconds = [], []
+    # Compare each box to the k-th next one while some pairs still overlap, the
+    # next boxes of a group start further right
+    active = np.arange(len(rows) - 1)
+    offset = 1
+    while len(active):
+        others = active + offset
+        overlap = (groups[others] == groups[active]) & (left[others] <= right[active])
+        active = active[overlap]
+        firsts.append(active)
+        seconds.append(active + offset)
+        offset += 1
+        active = active[active + offset < len(rows)]
+
+    if not firsts:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+    return rows[np.concatenate(firsts)], rows[np.concatenate(seconds)]
+
+
+class DuplicateAnnotations(NamedTuple):
+    """Pair of annotations found by `find_duplicate_annotations`
+
+    Args:
+        first: annotation appearing first in the annotations of the dataset
+        second: the other annotation
+        iou (float): IoU of their boxes
+    """
+
+    first: Union[Annotation_pydantic, Annotation]
+    second: Union[Annotation_pydantic, Annotation]
+    iou: float
+
+
+def find_duplicate_annotations(
+    yarrow, iou_threshold: float = 0.9, distinct_contributors: bool = False
+) -> List[DuplicateAnnotations]:
+    """Pairs of annotations of the same category on the same image whose boxes
+    have an IoU of at least `iou_threshold`, see `yarrow.iou`
+
+    Args:
+        yarrow (Union[YarrowDataset, YarrowDataset_pydantic]): runtime or pydantic dataset
+        iou_threshold (float, optional): minimum IoU, in ]0, 1]. Defaults to 0.9.
+        distinct_contributors (bool, optional): only the pairs of annotations of \
+            two different contributors, ex: a human and a model. Defaults to False.
+
+    Raises:
+        ValueError: if the threshold is not in ]0, 1], see also `AnnotationTable.from_yarrow`
+
+    Returns:
+        List[DuplicateAnnotations]: each pair once, in the order of the annotations
+    """
+    if not 0 < iou_threshold <= 1:
+        raise ValueError(
+            "iou_threshold should be in ]0, 1], got {}".format(iou_threshold)
+        )
+    table = AnnotationTable.from_yarrow(yarrow)
+
+    # One row per (annotation, image, category) of each annotation
+    nb_images = np.diff(table.image_offsets)
+    nb_categories = np.diff(table.category_offsets)
+    counts = nb_images * nb_categories
+    annot_rows = np.repeat(np.arange(len(table)), counts)
+    local = np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts)
+    row_categories = nb_categories[annot_rows]
+    images = table.image_indexes[
+        table.image_offsets[:-1][annot_rows] + local // np.maximum(row_categories, 1)
+    ]
+    categories = table.category_indexes[
+        table.category_offsets[:-1][annot_rows] + local % np.maximum(row_categories, 1)
+    ]
+    groups = images.astype(np.int64) * max(len(table.categories), 1) + categories
+
+    firsts, seconds = overlapping_pairs(table.bbox[annot_rows], groups)
+    firsts, seconds = annot_rows[firsts], annot_rows[seconds]
+    ious = paired_iou(table.bbox[firsts], table.bbox[seconds])
+    keep = (ious >= iou_threshold) & (firsts != seconds)
+    if distinct_contributors:
+        keep &= table.contributor[firsts] != table.contributor[seconds]
+    firsts, seconds, ious = firsts[keep], seconds[keep], ious[keep]
+
+    # Each pair once, the annotations sharing several images or categories are
+    # found several times
+    keys = np.minimum(firsts, seconds) * len(table) + np.maximum(firsts, seconds)
+    pairs, unique_rows = np.unique(keys, return_index=True)
+    firsts, seconds = np.divmod(pairs, max(len(table), 1))
+    ious = ious[unique_rows]
+
+    annotations = table.annotations
+    return [
+        DuplicateAnnotations(annotations[first], annotations[second], iou)
+        for first, second, iou in zip(firsts.tolist(), seconds.tolist(), ious.tolist())
+    ]
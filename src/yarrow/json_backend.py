@@ -0,0 +1,175 @@
+"""JSON backend selection.
+
+The yarrow files are decoded and encoded with the standard `json` module by
+default. The faster `orjson` and `ujson` libraries are opt-in, install one with
+`pip install yarrowformat[fast]` and select it explicitly:
+
+>>> set_json_backend("orjson") # or "auto" for the fastest installed one
+    get_json_backend().name
+    'orjson'
+
+All the backends decode the same documents and the `default` function is
+called for datetimes with all of them so dates are written the same way, but
+the encoded text is not byte for byte the same:
+
+- `json` and `ujson` escape non-ASCII characters and write NaN and infinity as
+  `NaN`/`Infinity`
+- `orjson` writes UTF-8 without escaping, U+2028 and U+2029 included, and
+  writes NaN and infinity as `null`, which are read back as None
+- `orjson` reads the integers larger than 64 bits as floats, silently losing
+  their precision, while they are written exactly as the standard library is
+  used for the documents holding one
+
+Only select orjson for files that cannot hold NaN, infinity or integers
+larger than 64 bits, ex: in `meta`, as it changes them silently. Checking each
+document for such integers before decoding it with orjson would cost several
+times its decoding time, so the standard library stays the default.
+"""
+
+import json
+import re
+from typing import Any, Callable, List, Union
+
+_LEADING_SPACES = re.compile(r"^( +)", flags=re.MULTILINE)
+
+
+class JsonBackend:
+    """A JSON library wrapped behind the `loads`/`dumps` signatures used by yarrow"""
+
+    def __init__(self, name: str, loads: Callable, dumps: Callable) -> None:
+        self.name = name
+        self._loads = loads
+        self._dumps = dumps
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return self._loads(data)
+
+    def dumps(
+        self, obj: Any, default: Callable = None, indent: Union[int, str] = None
+    ) -> str:
+        """Serializes `obj`, `indent=None` gives compact JSON without whitespace
+
+        Args:
+            obj (Any): object to serialize
+            default (Callable, optional): called on the objects the backend cannot serialize. Defaults to None.
+            indent (Union[int, str], optional): same as `json.dumps`. Defaults to None.
+
+        Returns:
+            str: JSON text
+        """
+        return self._dumps(obj, default, indent)
+
+    def __repr__(self) -> str:
+        return "JsonBackend(name={})".format(self.name)
+
+
+def _json_dumps(obj: Any, default: Callable, indent: Union[int, str]) -> str:
+    if indent is None:
+        return json.dumps(obj, default=default, separators=(",", ":"))
+    return json.dumps(obj, default=default, indent=indent)
+
+
+JSON_BACKENDS = {"json": JsonBackend("json", json.loads, _json_dumps)}
+
+try:
+    import orjson
+
+    _ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def _orjson_dumps(obj: Any, default: Callable, indent: Union[int, str]) -> str:
+        if indent is not None and not isinstance(indent, int):
+            return _json_dumps(obj, default, indent)
+        options = (
+            _ORJSON_OPTIONS if not indent else _ORJSON_OPTIONS | orjson.OPT_INDENT_2
+        )
+        try:
+            text = orjson.dumps(obj, default=default, option=options).decode("utf-8")
+        except TypeError:
+            # ex: integers larger than 64 bits
+            return _json_dumps(obj, default, indent)
+        if indent and indent != 2:
+            # orjson only indents with 2 spaces, lines only start with indentation
+            # as strings cannot hold a raw newline
+            text = _LEADING_SPACES.sub(
+                lambda match: " " * (len(match.group(1)) // 2 * indent), text
+            )
+        return text
+
+    JSON_BACKENDS["orjson"] = JsonBackend("orjson", orjson.loads, _orjson_dumps)
+except ImportError:
+    pass
+
+try:
+    import ujson
+
+    def _ujson_dumps(obj: Any, default: Callable, indent: Union[int, str]) -> str:
+        if indent is not None and not isinstance(indent, int):
+            return _json_dumps(obj, default, indent)
+        return ujson.dumps(
+            obj,
+            default=default,
+            indent=indent or 0,
+            escape_forward_slashes=False,
+        )
+
+    JSON_BACKENDS["ujson"] = JsonBackend("ujson", ujson.loads, _ujson_dumps)
+except ImportError:
+    pass
+
+_PREFERRED_ORDER = ("orjson", "ujson", "json")
+
+_current_backend = None
+
+
+def available_json_backends() -> List[str]:
+    """Returns the names of the installed JSON backends, fastest first"""
+    return [name for name in _PREFERRED_ORDER if name in JSON_BACKENDS]
+
+
+def set_json_backend(name: str = "json") -> JsonBackend:
+    """Selects the JSON backend used to read and write yarrow files
+
+    Args:
+        name (str, optional): "json", "orjson", "ujson" or "auto" for the fastest \
+            installed one. Defaults to "json", the standard library.
+
+    Raises:
+        ValueError: if the backend is unknown or not installed
+
+    Returns:
+        JsonBackend: the selected backend
+    """
+    global _current_backend
+    if name == "auto":
+        name = available_json_backends()[0]
+    if name not in JSON_BACKENDS:
+        raise ValueError(
+            "JSON backend {} is not available, installed backends are {}".format(
+                name, available_json_backends()
+            )
+        )
+    _current_backend = JSON_BACKENDS[name]
+    return _current_backend
+
+
+def get_json_backend() -> JsonBackend:
+    """Returns the JSON backend currently in use, see `set_json_backend`"""
+    if _current_backend is None:
+        return set_json_backend("json")
+    return _current_backend
+
+
+def json_loads(data: Union[str, bytes]) -> Any:
+    """`json.loads` equivalent using the current backend"""
+    return get_json_backend().loads(data)
+
+
+def json_dumps(obj: Any, *, default: Callable = None, indent=None, **kwargs) -> str:
+    """`json.dumps` equivalent using the current backend, used by pydantic `.json()`.
+
+    Other `json.dumps` keyword arguments are only supported by the standard library,
+    the call falls back to it when they are given.
+    """
+    if kwargs:
+        return json.dumps(obj, default=default, indent=indent, **kwargs)
+    return get_json_backend().dumps(obj, default=default, indent=indent)
@@ -0,0 +1,324 @@
+"""Read-only lazy view over a binary yarrow file.
+
+`LazyYarrowDataset` memory maps a file written by `yarrow.binary.to_binary`
+and builds the `Image`, `Annotation` and `MultilayerImage` objects only when
+they are accessed, the memory use does not depend on the size of the dataset:
+
+>>> yar_lazy = LazyYarrowDataset("path/to/file.yarrow.npz")
+    annot = yar_lazy.annotations[123] # Annotation linked to its images
+    len(yar_lazy.annotations)
+
+The file is mapped once and read-only, processes opening the same file, for
+example the workers of a dataloader, share the pages of the OS cache instead
+of each holding a copy. A view is pickled as its path and mapped again when
+unpickled.
+
+Each access builds a new object, `yar_lazy.images[0] is yar_lazy.images[0]`
+is False, the objects compare equal as usual. The small sections, contributors,
+confidential and categories, are read once when the view is opened.
+"""
+
+import mmap
+import os
+import struct
+import zipfile
+from collections.abc import Sequence
+from datetime import timedelta, timezone
+from typing import Any, Callable, Dict, List, Union
+
+import numpy as np
+
+from .binary import _EPOCH, _NAIVE, SECTION_MODELS, BinaryFile, _load_blob_item
+from .yarrow import *
+from .yarrow_cls import (
+    Annotation,
+    Image,
+    MultilayerImage,
+    YarrowDataset,
+    _first_by_id,
+)
+
+# Size of the fixed part of a zip local file header, then the name and extra
+# field lengths are at the end of it
+_LOCAL_HEADER = struct.Struct("<26xHH")
+
+
+def _map_member(
+    buffer: mmap.mmap, fp, archive: zipfile.ZipFile, info: zipfile.ZipInfo
+) -> np.ndarray:
+    """Array of a .npy member, a view on the mapped file when it is not compressed"""
+    if info.compress_type != zipfile.ZIP_STORED:
+        with archive.open(info) as member:
+            return np.lib.format.read_array(member, allow_pickle=False)
+
+    fp.seek(info.header_offset)
+    name_length, extra_length = _LOCAL_HEADER.unpack(fp.read(_LOCAL_HEADER.size))
+    fp.seek(info.header_offset + _LOCAL_HEADER.size + name_length + extra_length)
+    version = np.lib.format.read_magic(fp)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(fp)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(fp)
+    count = int(np.prod(shape))
+    array = np.frombuffer(buffer, dtype=dtype, count=count, offset=fp.tell())
+    return array.reshape(shape, order="F" if fortran_order else "C")
+
+
+class _Strings:
+    """String table decoded one string at a time"""
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray) -> None:
+        self._blob = blob
+        self._offsets = offsets
+
+    def __getitem__(self, idx: int) -> str:
+        return _load_blob_item(self._blob, self._offsets, idx)
+
+
+class _Column:
+    """Values of a single column read row by row from its arrays"""
+
+    def __init__(self, kind: str, arrays: Dict[str, np.ndarray], strings: _Strings):
+        self.kind = kind
+        self.arrays = arrays
+        self.strings = strings
+        self.null = arrays.get("null")
+        self.set = arrays.get("set")
+
+    def __getitem__(self, row: int) -> Any:
+        kind, arrays = self.kind, self.arrays
+        if kind == "str":
+            idx = int(arrays[""][row])
+            return None if idx < 0 else self.strings[idx]
+        if kind == "refs":
+            start, end = arrays["offsets"][row : row + 2].tolist()
+            refs = [self.strings[idx] for idx in arrays["values"][start:end].tolist()]
+            return refs if arrays["is_list"][row] else refs[0]
+        if kind == "json":
+            rows = arrays["rows"]
+            pos = int(np.searchsorted(rows, row))
+            if pos == len(rows) or rows[pos] != row:
+                return None
+            return _load_blob_item(arrays["blob"], arrays["offsets"], pos)
+
+        if self.null is not None and self.null[row]:
+            return None
+        value = arrays[""][row]
+        if kind == "datetime":
+            value = _EPOCH + timedelta(microseconds=int(value))
+            if "utcoffset" in arrays and arrays["utcoffset"][row] != _NAIVE:
+                offset = timedelta(seconds=int(arrays["utcoffset"][row]))
+                value = value.replace(tzinfo=timezone(offset))
+            return value
+        return value.tolist()
+
+
+class LazySection(Sequence):
+    """Read-only sequence building its elements on access
+
+    Args:
+        length (int): number of elements
+        build (Callable[[int], Any]): builds the element at a row
+    """
+
+    def __init__(self, length: int, build: Callable[[int], Any]) -> None:
+        self._length = length
+        self._build = build
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, idx: Union[int, slice]) -> Any:
+        if isinstance(idx, slice):
+            return [self._build(row) for row in range(*idx.indices(self._length))]
+        if idx < 0:
+            idx += self._length
+        if not 0 <= idx < self._length:
+            raise IndexError("{} index out of range".format(type(self).__name__))
+        return self._build(idx)
+
+    def __repr__(self) -> str:
+        return "LazySection(length={})".format(self._length)
+
+
+class LazyYarrowDataset:
+    """Read-only `YarrowDataset` view over a binary yarrow file, see `yarrow.lazy`
+
+    Args:
+        path (Union[str, os.PathLike]): path to a file written by `to_binary`
+
+    Raises:
+        ValueError: if the file is not a binary yarrow file
+    """
+
+    def __init__(self, path: Union[str, os.PathLike]) -> None:
+        self.path = os.fspath(path)
+        self._binary = BinaryFile(self.path)
+        self.info = self._binary.info
+
+        self._columns = {}
+        with open(self.path, "rb") as fp:
+            # Only the views on the mapping keep it alive
+            buffer = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            with zipfile.ZipFile(fp) as archive:
+                arrays = {}
+                for info in archive.infolist():
+                    if info.filename.endswith(".npy"):
+                        arrays[info.filename[:-4]] = _map_member(
+                            buffer, fp, archive, info
+                        )
+
+        self._strings = _Strings(arrays["strings/blob"], arrays["strings/offsets"])
+        for section, header in self._binary.header["sections"].items():
+            for name, kind in header["columns"].items():
+                prefix = "{}/{}".format(section, name)
+                column_arrays = {
+                    member[len(prefix) + 1 :]: array
+                    for member, array in arrays.items()
+                    if member == prefix or member.startswith(prefix + ".")
+                }
+                self._columns[section, name] = _Column(
+                    kind, column_arrays, self._strings
+                )
+
+        self.confidential = self._binary.read_section("confidential") or []
+        self.contributors = self._binary.read_section("contributors") or []
+        self.categories = self._binary.read_section("categories") or []
+        self._confidential_by_id = _first_by_id(self.confidential)
+        self._contributor_by_id = _first_by_id(self.contributors)
+        self._category_by_id = _first_by_id(self.categories)
+
+        self._image_order = None
+        self._image_id_indexes = None
+        self.images = LazySection(self._length("images"), self.image)
+        self.annotations = LazySection(self._length("annotations"), self.annotation)
+        self.multilayer_images = LazySection(
+            self._length("multilayer_images"), self.multilayer_image
+        )
+
+    def __reduce__(self):
+        return type(self), (self.path,)
+
+    def __repr__(self) -> str:
+        return "LazyYarrowDataset(path={!r}, images={}, annotations={})".format(
+            self.path, len(self.images), len(self.annotations)
+        )
+
+    def _length(self, section: str) -> int:
+        return self._binary.length(section) or 0
+
+    def _row_values(self, section: str, row: int) -> dict:
+        """Values set at a row of a section, the None values and the defaults that
+        were not set when the file was written are left out, the generated values
+        like the ids are kept"""
+        fields = SECTION_MODELS[section].__fields__
+        values = {}
+        for name in self._binary.header["sections"][section]["columns"]:
+            column = self._columns[section, name]
+            if (
+                column.set is not None
+                and not column.set[row]
+                and fields[name].default_factory is None
+            ):
+                continue
+            value = column[row]
+            if value is not None:
+                values[name] = value
+        return values
+
+    def _image_rows(self, section: str, row: int) -> List[int]:
+        """Rows of the images referenced by the `image_id` at a row of a section,
+        each id is kept once like in `YarrowDataset.from_yarrow`"""
+        if self._image_order is None:
+            # Equal ids share the same string index, the rows of an id are found
+            # by binary search in the sorted indexes
+            id_column = self._columns["images", "id"].arrays[""]
+            self._image_order = np.argsort(id_column, kind="stable")
+            self._sorted_image_ids = id_column[self._image_order]
+
+        column = self._columns[section, "image_id"]
+        if column.kind == "refs":
+            start, end = column.arrays["offsets"][row : row + 2].tolist()
+            indexes = column.arrays["values"][start:end].tolist()
+        else:
+            # The ids that could not be stored as references are json values, they
+            # are mapped to the string indexes of the image ids
+            image_id = column[row]
+            if image_id is None:
+                image_id = []
+            elif isinstance(image_id, str):
+                image_id = [image_id]
+            if self._image_id_indexes is None:
+                self._image_id_indexes = {
+                    self._strings[idx]: idx
+                    for idx in np.unique(self._sorted_image_ids).tolist()
+                }
+            indexes = []
+            for value in image_id:
+                if value not in self._image_id_indexes:
+                    raise ValueError(
+                        "could not find image {}, invalid yarrow".format(value)
+                    )
+                indexes.append(self._image_id_indexes[value])
+
+        rows = []
+        for idx in dict.fromkeys(indexes):
+            first, last = np.searchsorted(self._sorted_image_ids, [idx, idx + 1])
+            if first == last:
+                raise ValueError(
+                    "could not find image {}, invalid yarrow".format(self._strings[idx])
+                )
+            rows.extend(self._image_order[first:last].tolist())
+        return rows
+
+    def image(self, row: int) -> Image:
+        """Builds the `Image` at a row of the images section"""
+        values = self._row_values("images", row)
+        values["confidential"] = self._confidential_by_id.get(
+            values.get("confidential_id")
+        )
+        return Image(**values)
+
+    def annotation(self, row: int) -> Annotation:
+        """Builds the `Annotation` at a row of the annotations section, with its
+        images, categories and contributor"""
+        values = self._row_values("annotations", row)
+
+        contributor = self._contributor_by_id.get(values.get("contributor_id"))
+        if contributor is None:
+            raise ValueError(
+                "could not find the contributor matching object, invalid yarrow"
+            )
+        values["contributor"] = contributor
+
+        values["images"] = [
+            self.image(img_row) for img_row in self._image_rows("annotations", row)
+        ]
+
+        category_id = values.get("category_id", [])
+        category_ids = [category_id] if isinstance(category_id, str) else category_id
+        values["categories"] = []
+        for cat_id in category_ids:
+            cat = self._category_by_id.get(cat_id)
+            if cat is None:
+                raise ValueError("Could not find category matching object")
+            values["categories"].append(cat)
+        return Annotation(**values)
+
+    def multilayer_image(self, row: int) -> MultilayerImage:
+        """Builds the `MultilayerImage` at a row of the multilayer_images section"""
+        values = self._row_values("multilayer_images", row)
+        return MultilayerImage(
+            images=[
+                self.image(img_row)
+                for img_row in self._image_rows("multilayer_images", row)
+            ],
+            name=values.get("name"),
+            meta=values.get("meta"),
+            id=values.get("id"),
+            split=values.get("split"),
+        )
+
+    def materialize(self) -> YarrowDataset:
+        """Loads the complete dataset in memory, see `YarrowDataset.from_binary`"""
+        return YarrowDataset.from_binary(self.path)
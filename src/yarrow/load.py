@@ -0,0 +1,91 @@
+"""Loading of many yarrow files at once.
+
+`load_many` parses the files in a process pool and merges them in a single
+`YarrowDataset`:
+
+>>> yar_dataset = load_many(glob("path/to/*.yarrow.json"), workers=8)
+
+Each worker validates its file with pydantic and sends it back in the columnar
+binary format of `yarrow.binary`, a few arrays instead of a pickled tree of
+pydantic objects. The main process rebuilds the elements without validation
+and merges them with `YarrowDataset.extend`, an image, category, contributor or
+annotation present in several files is a single object of the result.
+"""
+
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, Union
+
+from . import binary
+from .yarrow import *
+from .yarrow_cls import YarrowDataset
+
+
+def _compact_parse(path: Union[str, os.PathLike], validate: bool) -> bytes:
+    """Parses a JSON yarrow file and returns it in the binary format, runs in the
+    workers"""
+    buffer = io.BytesIO()
+    binary.to_binary(YarrowDataset_pydantic.parse_file(path, validate=validate), buffer)
+    return buffer.getvalue()
+
+
+def _iter_parsed(
+    paths: list, workers: int, validate: bool
+) -> Iterator[YarrowDataset_pydantic]:
+    """Parsed files in the order of `paths`"""
+    json_paths = [path for path in paths if not binary.is_binary(path)]
+    if workers <= 1 or len(json_paths) <= 1:
+        for path in paths:
+            if binary.is_binary(path):
+                yield binary.from_binary(path)
+            else:
+                yield YarrowDataset_pydantic.parse_file(path, validate=validate)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        compact = executor.map(_compact_parse, json_paths, [validate] * len(json_paths))
+        for path in paths:
+            # Binary files are already compact, they are read here
+            if binary.is_binary(path):
+                yield binary.from_binary(path)
+            else:
+                yield binary.from_binary(io.BytesIO(next(compact)))
+
+
+def load_many(
+    paths: Iterable[Union[str, os.PathLike]],
+    workers: int = None,
+    info: Info = None,
+    validate: bool = True,
+) -> YarrowDataset:
+    """Parses yarrow files in parallel and merges them in a single dataset
+
+    Args:
+        paths (Iterable[Union[str, os.PathLike]]): JSON, compressed or binary yarrow files
+        workers (int, optional): number of worker processes, the files are parsed \
+            in this process if 1. Defaults to the number of CPUs.
+        info (Info, optional): info of the merged dataset. Defaults to the info \
+            of the first file.
+        validate (bool, optional): validate the JSON files with pydantic, see \
+            `YarrowDataset_pydantic.parse_file`. Defaults to True.
+
+    Raises:
+        ValueError: if there is no file and no info
+
+    Returns:
+        YarrowDataset: the merged dataset
+    """
+    paths = list(paths)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if info is None and not paths:
+        raise ValueError("no file to merge and no info given")
+
+    merged = None
+    for yarrow in _iter_parsed(paths, workers, validate):
+        if merged is None:
+            merged = YarrowDataset(info=yarrow.info if info is None else info)
+        # Merged one file at a time, the indexes of `merged` keep it linear
+        merged.extend([YarrowDataset.from_yarrow(yarrow)])
+    return YarrowDataset(info=info) if merged is None else merged
@@ -1,14 +1,23 @@
 import click
 
-from .cli import check, save
+from .cli import check, convert, save
+from .json_backend import JSON_BACKENDS, set_json_backend
 
 
 @click.group()
-def cli():
-    pass
+@click.option(
+    "--json-backend",
+    type=click.Choice(["auto", *JSON_BACKENDS]),
+    default="json",
+    show_default=True,
+    help="JSON library used to read and write yarrow files, auto for the fastest installed one",
+)
+def cli(json_backend="json"):
+    set_json_backend(json_backend)
 
 
 cli.add_command(check)
+cli.add_command(convert)
 cli.add_command(save)
 
 if __name__ == "__main__":
@@ -0,0 +1,132 @@
+"""Spatial index over annotation boxes.
+
+`BoxIndex` is a packed R-tree built with the Sort-Tile-Recursive algorithm
+over a (N, 4) array of boxes `[left, top, right, bottom]`, the order of
+`Annotation.bbox`. The boxes are sorted in tiles of `node_size` boxes, each
+level of the tree holds the bounding boxes of `node_size` nodes of the level
+below, and a query walks down the levels testing all the candidate nodes of a
+level at once with NumPy:
+
+>>> index = BoxIndex(np.array([annot.bbox for annot in annotations]))
+    rows = index.query([0, 0, 512, 512]) # rows of the boxes overlapping the crop
+
+`YarrowDataset.query_region(image, box)` keeps one index per image.
+"""
+
+from math import ceil, sqrt
+from typing import List, Sequence
+
+import numpy as np
+
+from .yarrow import *
+
+
+def _str_order(boxes: np.ndarray, node_size: int) -> np.ndarray:
+    """Sort-Tile-Recursive order of the boxes: vertical slices by center x, each
+    sorted by center y"""
+    centers_x = boxes[:, 0] + boxes[:, 2]
+    centers_y = boxes[:, 1] + boxes[:, 3]
+    nb_leaves = ceil(len(boxes) / node_size)
+    slice_size = max(ceil(sqrt(nb_leaves)), 1) * node_size
+
+    order = np.argsort(centers_x, kind="stable")
+    slices = np.arange(len(boxes)) // slice_size
+    # Sorted by slice, then by center y inside a slice
+    return order[np.lexsort((centers_y[order], slices))]
+
+
+class BoxIndex:
+    """Packed STR R-tree over boxes, see `yarrow.spatial`
+
+    Args:
+        boxes (np.ndarray): (N, 4) `[left, top, right, bottom]` boxes, the rows \
+            with a NaN are not indexed
+        node_size (int, optional): number of children of a node. Defaults to 16.
+    """
+
+    def __init__(self, boxes: np.ndarray, node_size: int = 16) -> None:
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        if node_size < 2:
+            raise ValueError("node_size should be at least 2, got {}".format(node_size))
+        self.node_size = node_size
+        self.size = len(boxes)
+
+        rows = np.flatnonzero(~np.isnan(boxes).any(axis=1))
+        order = rows[_str_order(boxes[rows], node_size)]
+        self._rows = order
+        # levels[0] are the boxes in tree order, levels[-1] the root nodes
+        self._levels = [boxes[order]]
+        while len(self._levels[-1]) > node_size:
+            level = self._levels[-1]
+            starts = np.arange(0, len(level), node_size)
+            self._levels.append(
+                np.concatenate(
+                    (
+                        np.minimum.reduceat(level[:, :2], starts),
+                        np.maximum.reduceat(level[:, 2:], starts),
+                    ),
+                    axis=1,
+                )
+            )
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __repr__(self) -> str:
+        return "BoxIndex(boxes={}, levels={})".format(self.size, len(self._levels))
+
+    def query(self, box: Sequence[float]) -> np.ndarray:
+        """Rows of the boxes overlapping `box`, touching edges overlap
+
+        Args:
+            box (Sequence[float]): `[left, top, right, bottom]`
+
+        Returns:
+            np.ndarray: sorted int64 rows into the boxes given to the constructor
+        """
+        left, top, right, bottom = (float(value) for value in box)
+        node_size = self.node_size
+        depth = len(self._levels) - 1
+        candidates = np.arange(len(self._levels[depth]))
+        while True:
+            nodes = self._levels[depth][candidates]
+            candidates = candidates[
+                (nodes[:, 0] <= right)
+                & (nodes[:, 2] >= left)
+                & (nodes[:, 1] <= bottom)
+                & (nodes[:, 3] >= top)
+            ]
+            if depth == 0 or len(candidates) == 0:
+                break
+            # Children of the overlapping nodes in the level below
+            depth -= 1
+            children = (candidates[:, None] * node_size + np.arange(node_size)).ravel()
+            candidates = children[children < len(self._levels[depth])]
+        # Empty when the search stopped above the leaves
+        return np.sort(self._rows[candidates])
+
+
+def brute_force_query(boxes: np.ndarray, box: Sequence[float]) -> np.ndarray:
+    """Rows of `boxes` overlapping `box` by testing all of them, the reference
+    of `BoxIndex.query`"""
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    left, top, right, bottom = (float(value) for value in box)
+    return np.flatnonzero(
+        (boxes[:, 0] <= right)
+        & (boxes[:, 2] >= left)
+        & (boxes[:, 1] <= bottom)
+        & (boxes[:, 3] >= top)
+    )
+
+
+def annotation_boxes(annotations: List) -> np.ndarray:
+    """(N, 4) array of the bbox of the annotations, NaN when it is not set or
+    does not have 4 values"""
+    nan = [float("nan")] * 4
+    return np.array(
+        [
+            annot.bbox if annot.bbox is not None and len(annot.bbox) == 4 else nan
+            for annot in annotations
+        ],
+        dtype=np.float64,
+    ).reshape(len(annotations), 4)
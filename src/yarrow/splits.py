@@ -0,0 +1,212 @@
+"""Deterministic assignment of the images of a dataset to splits.
+
+`split_assignment` chooses a split for each image from the ratios of the
+splits, `assign_splits` or `YarrowDataset.assign_splits` apply it to the
+images and multilayer images of a dataset:
+
+>>> yar_dataset.assign_splits({"train": 0.8, "validate": 0.1, "test": 0.1})
+
+- the images linked by a multilayer image or by an annotation on several
+  images form a group, a group is always in a single split
+- the split of a group comes from a hash of the sorted `file_name` of its
+  images mapped on the cumulative ratios, the same seed always gives the same
+  split to a group: adding or removing images never moves the groups they are
+  not part of, so a dataset that grew can be split again without leaking
+  images from test to train
+- each split gets its ratio of the groups on average, and so does each category
+- with `stratify=True` the groups are stratified by the rarest category
+  annotated on their images, the groups without annotations form their own
+  stratum, and each stratum is ordered by hash and cut at the exact ratios.
+  The split of a group then depends on its rank in its stratum: adding or
+  removing images shifts the ranks and can move existing images to another split
+
+The hashes and the ranks are computed with NumPy over all the groups at once.
+"""
+
+import hashlib
+from typing import Dict, List
+
+import numpy as np
+
+from .yarrow import *
+
+DEFAULT_RATIOS = {"train": 0.8, "validate": 0.1, "test": 0.1}
+
+
+def _group_hashes(
+    images: list, groups: np.ndarray, nb_groups: int, seed: str
+) -> np.ndarray:
+    """uint64 hash of each group, stable across processes and uniform whatever the
+    size of the group: the key of a group is the sorted file names of its images,
+    the file name alone for a single image"""
+    names = [[] for _ in range(nb_groups)]
+    for img, group in zip(images, groups.tolist()):
+        names[group].append(img.file_name)
+
+    prefix = seed.encode("utf-8") + b"\0"
+    digests = b"".join(
+        hashlib.blake2b(
+            prefix + "\0".join(sorted(group_names)).encode("utf-8"), digest_size=8
+        ).digest()
+        for group_names in names
+    )
+    return np.frombuffer(digests, dtype="<u8")
+
+
+class _ImageRows:
+    """Row of each image of a dataset in its image list, by identity and by
+    equality for the images of annotations which are copies"""
+
+    def __init__(self, images: list) -> None:
+        self.images = images
+        self._by_id = {id(img): row for row, img in enumerate(images)}
+        self._by_value = None
+
+    def __getitem__(self, image) -> int:
+        row = self._by_id.get(id(image))
+        if row is None:
+            if self._by_value is None:
+                self._by_value = {}
+                for idx, img in enumerate(self.images):
+                    self._by_value.setdefault(img, idx)
+            row = self._by_value.get(image)
+            if row is None:
+                raise ValueError(
+                    "image {} is not in the images of the dataset".format(image.id)
+                )
+        return row
+
+
+def image_groups(yarrow) -> np.ndarray:
+    """Group of each image, the images linked by a multilayer image or by an
+    annotation on several images are in the same group
+
+    Args:
+        yarrow (YarrowDataset): dataset
+
+    Returns:
+        np.ndarray: (len(yarrow.images),) int64 group indexes, from 0 to the number of groups
+    """
+    rows = _ImageRows(yarrow.images)
+    parent = list(range(len(yarrow.images)))
+
+    def find(row: int) -> int:
+        while parent[row] != row:
+            parent[row] = parent[parent[row]]
+            row = parent[row]
+        return row
+
+    for elem in (*yarrow.annotations, *yarrow.multilayer_images):
+        if len(elem.images) < 2:
+            continue
+        root = find(rows[elem.images[0]])
+        for img in elem.images[1:]:
+            other = find(rows[img])
+            if other != root:
+                parent[other] = root
+
+    roots = np.array([find(row) for row in range(len(parent))], dtype=np.int64)
+    return np.unique(roots, return_inverse=True)[1].reshape(-1)
+
+
+def _strata(yarrow, groups: np.ndarray, nb_groups: int) -> np.ndarray:
+    """Stratum of each group, the key of the least frequent category annotated on
+    its images, the groups without annotations have the largest key"""
+    rows = _ImageRows(yarrow.images)
+    cat_rows = {}
+    pair_rows, pair_cats = [], []
+    for annot in yarrow.annotations:
+        if not annot.images:
+            continue
+        row = rows[annot.images[0]]
+        for cat in annot.categories:
+            pair_rows.append(row)
+            pair_cats.append(cat_rows.setdefault(cat, len(cat_rows)))
+
+    no_annotation = np.iinfo(np.int64).max
+    strata = np.full(nb_groups, no_annotation, dtype=np.int64)
+    if pair_cats:
+        pair_cats = np.array(pair_cats, dtype=np.int64)
+        frequency = np.bincount(pair_cats)
+        keys = frequency[pair_cats] * len(cat_rows) + pair_cats
+        np.minimum.at(strata, groups[np.array(pair_rows, dtype=np.int64)], keys)
+    return strata
+
+
+def split_assignment(
+    yarrow, ratios: Dict[str, float] = None, seed: str = "", stratify: bool = False
+) -> List[str]:
+    """Chooses the split of each image of a dataset, see `yarrow.splits`
+
+    Args:
+        yarrow (YarrowDataset): dataset
+        ratios (Dict[str, float], optional): relative size of each split, they are \
+            normalized. Defaults to `DEFAULT_RATIOS`, 80% train, 10% validate and 10% test.
+        seed (str, optional): another seed gives another assignment. Defaults to "".
+        stratify (bool, optional): keep the exact ratios for each category, the \
+            splits are not stable anymore when the dataset changes. Defaults to False.
+
+    Raises:
+        ValueError: if the ratios are empty or negative or an annotation or \
+            multilayer image is linked to an image that is not in the dataset
+
+    Returns:
+        List[str]: split of each image of `yarrow.images`
+    """
+    ratios = DEFAULT_RATIOS if ratios is None else ratios
+    names = list(ratios)
+    weights = np.array([ratios[name] for name in names], dtype=np.float64)
+    if not names or (weights < 0).any() or weights.sum() <= 0:
+        raise ValueError(
+            "ratios should be positive with a positive sum, got {}".format(ratios)
+        )
+    if not yarrow.images:
+        return []
+
+    groups = image_groups(yarrow)
+    nb_groups = int(groups.max()) + 1
+    hashes = _group_hashes(yarrow.images, groups, nb_groups, seed)
+    bounds = np.cumsum(weights) / weights.sum()
+
+    if stratify:
+        # Rank of each group in its stratum, the ranks are mapped to the splits by
+        # the cumulative ratios
+        strata = _strata(yarrow, groups, nb_groups)
+        order = np.lexsort((hashes, strata))
+        _, starts, sizes = np.unique(
+            strata[order], return_index=True, return_counts=True
+        )
+        ranks = np.arange(nb_groups) - np.repeat(starts, sizes)
+        fractions = np.empty(nb_groups, dtype=np.float64)
+        fractions[order] = (ranks + 0.5) / np.repeat(sizes, sizes)
+    else:
+        # The hash of a group alone gives its split
+        fractions = hashes / 2.0**64
+
+    group_splits = np.minimum(
+        np.searchsorted(bounds, fractions, side="right"), len(names) - 1
+    )
+    return [names[idx] for idx in group_splits[groups].tolist()]
+
+
+def assign_splits(
+    yarrow, ratios: Dict[str, float] = None, seed: str = "", stratify: bool = False
+) -> Dict[str, int]:
+    """Sets the split of the images and multilayer images of a dataset to the ones
+    of `split_assignment`, see `YarrowDataset.assign_splits`
+
+    Returns:
+        Dict[str, int]: number of images of each split
+    """
+    splits = split_assignment(yarrow, ratios, seed=seed, stratify=stratify)
+    counts = dict.fromkeys(DEFAULT_RATIOS if ratios is None else ratios, 0)
+    for image, split in zip(yarrow.images, splits):
+        image.split = split
+        counts[split] += 1
+
+    # The images of a multilayer image are in the same group
+    rows = _ImageRows(yarrow.images)
+    for multilayer in yarrow.multilayer_images:
+        if multilayer.images:
+            multilayer.split = splits[rows[multilayer.images[0]]]
+    return counts
@@ -0,0 +1,352 @@
+"""Streaming access to yarrow files.
+
+`iter_file` reads a .yarrow.json file element by element and yields validated
+pydantic objects as soon as they are read, memory use is bounded by the size
+of the largest single element instead of the size of the file:
+
+>>> for key, elem in iter_file("path/to/file.yarrow.json", sections=["annotations"]):
+        print(elem.bbox)
+
+`write_file` is the reverse operation, the sections can be generators and each
+element is serialized and written on its own.
+
+"""
+
+import io
+import json
+import os
+from contextlib import contextmanager
+from typing import IO, Any, Iterable, Iterator, List, Tuple, Union
+
+from pydantic import BaseModel
+
+from .compression import open_file
+from .json_backend import get_json_backend
+from .yarrow import *
+from .yarrow import _compress_rle_dict
+
+SECTION_MODELS = {
+    "info": Info,
+    "images": Image_pydantic,
+    "annotations": Annotation_pydantic,
+    "confidential": Clearance,
+    "contributors": Contributor,
+    "categories": Category,
+    "multilayer_images": MultilayerImage_pydantic,
+}
+
+_WHITESPACE = " \t\n\r"
+
+
+class _JsonStreamReader:
+    """Minimal incremental reader over a text stream, values are decoded with
+    `json.JSONDecoder.raw_decode` on a buffer refilled chunk by chunk"""
+
+    def __init__(self, fp: IO[str], chunk_size: int) -> None:
+        self._fp = fp
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self, min_size: int = 0) -> bool:
+        """Reads at least one chunk, returns False if the stream is exhausted"""
+        if self._eof:
+            return False
+        if self._pos > 0:
+            self._buffer = self._buffer[self._pos :]
+            self._pos = 0
+        chunks = [self._buffer]
+        read_size = 0
+        while read_size < max(min_size, 1):
+            chunk = self._fp.read(max(self._chunk_size, min_size))
+            if not chunk:
+                self._eof = True
+                break
+            chunks.append(chunk)
+            read_size += len(chunk)
+        self._buffer = "".join(chunks)
+        return read_size > 0
+
+    def peek(self) -> str:
+        """Returns the next non whitespace character without consuming it, "" at
+        the end of the stream"""
+        while True:
+            while self._pos < len(self._buffer):
+                if self._buffer[self._pos] not in _WHITESPACE:
+                    return self._buffer[self._pos]
+                self._pos += 1
+            if not self._fill():
+                return ""
+
+    def expect(self, chars: str) -> str:
+        char = self.peek()
+        if char == "" or char not in chars:
+            raise ValueError(
+                "invalid yarrow JSON, expected one of {!r} but got {!r}".format(
+                    chars, char
+                )
+            )
+        self._pos += 1
+        return char
+
+    def read_value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                # Grow the buffer geometrically so that large values are not
+                # decoded again for every chunk
+                if not self._fill(len(self._buffer) - self._pos):
+                    raise
+                continue
+            # A number could be truncated at the end of the buffer
+            if end == len(self._buffer) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def iter_array(self) -> Iterator:
+        self.expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self.read_value()
+            if self.expect(",]") == "]":
+                return
+
+
+@contextmanager
+def _open_text(source: Union[str, os.PathLike, IO]) -> Iterator[IO[str]]:
+    """Text stream over a path, a text stream or a binary stream, only the
+    files opened here are closed"""
+    if isinstance(source, (str, os.PathLike)):
+        with open_file(source, "r") as fp:
+            yield fp
+    elif isinstance(source, io.TextIOBase):
+        yield source
+    else:
+        fp = io.TextIOWrapper(source, encoding="utf-8")
+        try:
+            yield fp
+        finally:
+            fp.detach()
+
+
+def iter_file(
+    source: Union[str, os.PathLike, IO],
+    sections: Iterable[str] = None,
+    chunk_size: int = 1 << 16,
+) -> Iterator[Tuple[str, BaseModel]]:
+    """Iterates over the elements of a yarrow file in the order they appear
+
+    Each element is validated with its pydantic class before being yielded, for
+    example the `annotations` elements are yielded as `Annotation_pydantic`. The
+    `info` key yields a single `Info` object. Unknown keys are skipped.
+
+    Args:
+        source (Union[str, os.PathLike, IO]): file path, compressed if it ends with \
+            .gz, .xz or .zst, or opened file, text or binary
+        sections (Iterable[str], optional): keys to yield, ex: ["images", "annotations"]. \
+            Other keys are read but not validated. Defaults to all the keys of `SECTION_MODELS`.
+        chunk_size (int, optional): number of characters read at a time. Defaults to 65536.
+
+    Raises:
+        ValueError: if the file is not a JSON object or a section is unknown
+
+    Yields:
+        Tuple[str, BaseModel]: the key of the section and the validated element
+    """
+    sections = set(SECTION_MODELS if sections is None else sections)
+    unknown = sections.difference(SECTION_MODELS)
+    if unknown:
+        raise ValueError("unknown yarrow sections {}".format(sorted(unknown)))
+
+    with _open_text(source) as fp:
+        reader = _JsonStreamReader(fp, chunk_size)
+        if reader.peek() == "\ufeff":
+            reader.expect("\ufeff")
+        reader.expect("{")
+        if reader.peek() == "}":
+            return
+        while True:
+            key = reader.read_value()
+            reader.expect(":")
+
+            model = SECTION_MODELS.get(key) if key in sections else None
+            if reader.peek() == "[":
+                # Skipped lists are also read one element at a time
+                for value in reader.iter_array():
+                    if model is not None:
+                        yield key, model.parse_obj(value)
+            elif model is None:
+                reader.read_value()
+            elif key == "info":
+                yield key, model.parse_obj(reader.read_value())
+            elif reader.read_value() is not None:
+                # Like YarrowDataset_pydantic, null sections are accepted
+                raise ValueError("yarrow section {} is not a list".format(key))
+
+            if reader.expect(",}") == "}":
+                return
+
+
+def iter_section(
+    source: Union[str, os.PathLike, IO], section: str, chunk_size: int = 1 << 16
+) -> Iterator[BaseModel]:
+    """Iterates over the elements of a single section of a yarrow file, see
+    `iter_file`
+
+    Args:
+        source (Union[str, os.PathLike, IO]): file path or opened file
+        section (str): key of the section, ex: "annotations"
+        chunk_size (int, optional): number of characters read at a time. Defaults to 65536.
+
+    Yields:
+        BaseModel: the validated elements of the section
+    """
+    for _, elem in iter_file(source, sections=[section], chunk_size=chunk_size):
+        yield elem
+
+
+def write_file(
+    dest: Union[str, os.PathLike, IO],
+    info: Union[Info, dict],
+    images: Iterable = (),
+    annotations: Iterable = None,
+    confidential: Iterable = None,
+    contributors: Iterable = None,
+    categories: Iterable = None,
+    multilayer_images: Iterable = None,
+    exclude_unset: bool = False,
+    exclude_none: bool = True,
+    indent: Union[int, str] = 4,
+    default=str,
+    rle_encoding: str = "list",
+    **kwargs
+) -> None:
+    """Writes a yarrow file one element at a time
+
+    The sections can be any iterable, including generators, of pydantic objects or
+    of dicts, they are never gathered in memory. With the same options the output
+    is identical to `json.dump(dataset.dict(), indent=indent)` with the standard
+    library JSON backend, see `yarrow.json_backend`. With `indent=None` the output
+    is compact JSON without any whitespace.
+
+    Args:
+        dest (Union[str, os.PathLike, IO]): file path, compressed if it ends with \
+            .gz, .xz or .zst, or opened text file
+        info (Union[Info, dict]): info of the dataset
+        images (Iterable, optional): Defaults to ().
+        annotations (Iterable, optional): Defaults to None.
+        confidential (Iterable, optional): Defaults to None.
+        contributors (Iterable, optional): Defaults to None.
+        categories (Iterable, optional): Defaults to None.
+        multilayer_images (Iterable, optional): Defaults to None.
+        exclude_unset (bool, optional): passed to the `dict()` of each element. Defaults to False.
+        exclude_none (bool, optional): passed to the `dict()` of each element, \
+            None sections are also skipped. Defaults to True.
+        indent (Union[int, str], optional): JSON indentation, None for compact JSON. Defaults to 4.
+        default (optional): function serializing the objects unknown to json. Defaults to str.
+        rle_encoding (str, optional): "list" or "compressed", see `RLE`. Defaults to "list".
+        kwargs: passed to the `dict()` of each element, ex: `by_alias`
+    """
+    sections = [
+        ("info", info),
+        ("images", images),
+        ("annotations", annotations),
+        ("confidential", confidential),
+        ("contributors", contributors),
+        ("categories", categories),
+        ("multilayer_images", multilayer_images),
+    ]
+    _write_sections(
+        dest,
+        sections,
+        exclude_unset=exclude_unset,
+        exclude_none=exclude_none,
+        indent=indent,
+        default=default,
+        rle_encoding=rle_encoding,
+        **kwargs
+    )
+
+
+def _write_sections(
+    dest: Union[str, os.PathLike, IO],
+    sections: List[Tuple[str, Any]],
+    exclude_unset: bool = False,
+    exclude_none: bool = True,
+    indent: Union[int, str] = 4,
+    default=str,
+    rle_encoding: str = "list",
+    **kwargs
+) -> None:
+    """Writes the given (key, value) sections in order, the missing keys are left out"""
+    if rle_encoding not in RLE_ENCODINGS:
+        raise ValueError(
+            "rle_encoding should be one of {}, got {}".format(
+                RLE_ENCODINGS, rle_encoding
+            )
+        )
+    dumps = get_json_backend().dumps
+
+    def to_dict(elem) -> dict:
+        if isinstance(elem, BaseModel):
+            elem = elem.dict(
+                exclude_unset=exclude_unset, exclude_none=exclude_none, **kwargs
+            )
+        return elem
+
+    if indent is None:
+        newline, step, key_sep = "", "", ":"
+    else:
+        newline, key_sep = "\n", ": "
+        step = indent if isinstance(indent, str) else " " * indent
+
+    with _open_text_write(dest) as fp:
+        fp.write("{")
+        first_key = True
+        for key, value in sections:
+            if value is None and exclude_none:
+                continue
+            fp.write(
+                "{}{}{}{}{}".format(
+                    "" if first_key else ",", newline, step, json.dumps(key), key_sep
+                )
+            )
+            first_key = False
+
+            if key == "info" or value is None:
+                text = dumps(to_dict(value), default, indent)
+                fp.write(text.replace("\n", "\n" + step))
+                continue
+
+            fp.write("[")
+            empty = True
+            for elem in value:
+                elem = to_dict(elem)
+                if key == "annotations" and rle_encoding == "compressed":
+                    _compress_rle_dict(elem)
+                text = dumps(elem, default, indent)
+                fp.write("," if not empty else "")
+                fp.write(newline + step * 2 + text.replace("\n", "\n" + step * 2))
+                empty = False
+            if not empty:
+                fp.write(newline + step)
+            fp.write("]")
+        if not first_key:
+            fp.write(newline)
+        fp.write("}")
+
+
+@contextmanager
+def _open_text_write(dest: Union[str, os.PathLike, IO]) -> Iterator[IO[str]]:
+    if isinstance(dest, (str, os.PathLike)):
+        with open_file(dest, "w") as fp:
+            yield fp
+    else:
+        yield dest
@@ -0,0 +1,316 @@
+"""Columnar view of the annotations of a dataset.
+
+`AnnotationTable` holds the numeric fields of every annotation in NumPy
+arrays, one row per annotation, so that statistics over a whole dataset are
+computed with vectorized operations instead of attribute lookups:
+
+>>> table = AnnotationTable.from_yarrow(yar_dataset)
+    widths = table.bbox[:, 2] - table.bbox[:, 0]
+    per_category = np.bincount(table.category, minlength=len(table.categories))
+
+Missing values are NaN in the float columns and -1 in the integer columns.
+The images, categories and contributors of an annotation are indexes into
+the `images`, `categories` and `contributors` lists of the table, which are
+the lists of the dataset. An annotation linked to several images or
+categories has all of them in the `*_offsets`/`*_indexes` columns, the
+`image` and `category` columns only hold the first one.
+"""
+
+from copy import copy
+from math import isnan
+from operator import attrgetter
+from typing import Any, Callable, Dict, List, Union
+
+import numpy as np
+
+from .yarrow import *
+from .yarrow_cls import Annotation, YarrowDataset
+
+
+def _ids(value: Union[str, List[str]]) -> List[str]:
+    return [value] if isinstance(value, str) else value
+
+
+def _first_index(key: Callable, elems: list) -> Dict[Any, int]:
+    """Maps the key of each element of `elems` to the index of the first element
+    with that key"""
+    result = {}
+    for idx, elem in enumerate(elems):
+        result.setdefault(key(elem), idx)
+    return result
+
+
+def _lookup(rows: Dict[Any, int], key: Any, row: int) -> int:
+    idx = rows.get(key)
+    if idx is None:
+        raise ValueError(
+            "annotation {} references {} which is not in the dataset".format(row, key)
+        )
+    return idx
+
+
+class AnnotationTable:
+    """Struct of arrays holding the annotations of a dataset, see `yarrow.table`
+
+    Args:
+        yarrow (Union[YarrowDataset, YarrowDataset_pydantic]): dataset the annotations \
+            belong to
+        annotations (list): the annotations, one per row
+        bbox (np.ndarray): (N, 4) float64
+        area (np.ndarray): (N,) float64
+        weight (np.ndarray): (N,) float64
+        num_keypoints (np.ndarray): (N,) int64
+        image_offsets (np.ndarray): (N + 1,) int64, the images of row i are \
+            `image_indexes[image_offsets[i]:image_offsets[i + 1]]`
+        image_indexes (np.ndarray): int32 indexes into `images`
+        category_offsets (np.ndarray): (N + 1,) int64
+        category_indexes (np.ndarray): int32 indexes into `categories`
+        contributor (np.ndarray): (N,) int32 indexes into `contributors`
+    """
+
+    def __init__(
+        self,
+        yarrow: Union[YarrowDataset, YarrowDataset_pydantic],
+        annotations: list,
+        bbox: np.ndarray,
+        area: np.ndarray,
+        weight: np.ndarray,
+        num_keypoints: np.ndarray,
+        image_offsets: np.ndarray,
+        image_indexes: np.ndarray,
+        category_offsets: np.ndarray,
+        category_indexes: np.ndarray,
+        contributor: np.ndarray,
+    ) -> None:
+        self.yarrow = yarrow
+        self.annotations = annotations
+        self.bbox = bbox
+        self.area = area
+        self.weight = weight
+        self.num_keypoints = num_keypoints
+        self.image_offsets = image_offsets
+        self.image_indexes = image_indexes
+        self.category_offsets = category_offsets
+        self.category_indexes = category_indexes
+        self.contributor = contributor
+
+    @property
+    def images(self) -> list:
+        return self.yarrow.images or []
+
+    @property
+    def categories(self) -> list:
+        return self.yarrow.categories or []
+
+    @property
+    def contributors(self) -> list:
+        return self.yarrow.contributors or []
+
+    @property
+    def image(self) -> np.ndarray:
+        """Index of the first image of each annotation, -1 if it has none"""
+        return self._first(self.image_offsets, self.image_indexes)
+
+    @property
+    def category(self) -> np.ndarray:
+        """Index of the first category of each annotation, -1 if it has none"""
+        return self._first(self.category_offsets, self.category_indexes)
+
+    @staticmethod
+    def _first(offsets: np.ndarray, indexes: np.ndarray) -> np.ndarray:
+        result = np.full(len(offsets) - 1, -1, dtype=np.int32)
+        has_any = offsets[1:] > offsets[:-1]
+        result[has_any] = indexes[offsets[:-1][has_any]]
+        return result
+
+    def __len__(self) -> int:
+        return len(self.annotations)
+
+    def __repr__(self) -> str:
+        return "AnnotationTable(annotations={})".format(len(self))
+
+    @classmethod
+    def from_yarrow(
+        cls, yarrow: Union[YarrowDataset, YarrowDataset_pydantic]
+    ) -> "AnnotationTable":
+        """Builds the table of the annotations of a dataset in one pass
+
+        Args:
+            yarrow (Union[YarrowDataset, YarrowDataset_pydantic]): runtime or pydantic dataset
+
+        Raises:
+            TypeError: if the input is not a dataset
+            ValueError: if a bbox does not have 4 values or an annotation references \
+                an element that is not in the dataset
+
+        Returns:
+            AnnotationTable
+        """
+        if isinstance(yarrow, YarrowDataset):
+            # Like `YarrowDataset.add_annotation`, an element is the first equal
+            # one of the dataset lists
+            key = lambda elem: elem
+            image_rows = _first_index(key, yarrow.images)
+            category_rows = _first_index(key, yarrow.categories)
+            contributor_rows = _first_index(key, yarrow.contributors)
+
+            def links(annot: Annotation):
+                return annot.images, annot.categories, annot.contributor
+
+        elif isinstance(yarrow, YarrowDataset_pydantic):
+            key = attrgetter("id")
+            image_rows = _first_index(key, yarrow.images or [])
+            category_rows = _first_index(key, yarrow.categories or [])
+            contributor_rows = _first_index(key, yarrow.contributors or [])
+
+            def links(annot: Annotation_pydantic):
+                return (
+                    _ids(annot.image_id),
+                    _ids(annot.category_id),
+                    annot.contributor_id,
+                )
+
+        else:
+            raise TypeError("input is not appropriate type %s", yarrow)
+
+        annotations = list(yarrow.annotations or [])
+        nan, no_bbox = float("nan"), [float("nan")] * 4
+        bbox, area, weight, num_keypoints, contributor = [], [], [], [], []
+        image_indexes, image_counts = [], []
+        category_indexes, category_counts = [], []
+
+        for row, annot in enumerate(annotations):
+            if annot.bbox is None:
+                bbox.append(no_bbox)
+            elif len(annot.bbox) != 4:
+                raise ValueError(
+                    "bbox of annotation {} should have 4 values, got {}".format(
+                        row, annot.bbox
+                    )
+                )
+            else:
+                bbox.append(annot.bbox)
+            area.append(nan if annot.area is None else annot.area)
+            weight.append(nan if annot.weight is None else annot.weight)
+            num_keypoints.append(
+                -1 if annot.num_keypoints is None else annot.num_keypoints
+            )
+
+            images, categories, contrib = links(annot)
+            image_indexes.extend(_lookup(image_rows, img, row) for img in images)
+            image_counts.append(len(images))
+            category_indexes.extend(
+                _lookup(category_rows, cat, row) for cat in categories
+            )
+            category_counts.append(len(categories))
+            contributor.append(_lookup(contributor_rows, contrib, row))
+
+        return cls(
+            yarrow=yarrow,
+            annotations=annotations,
+            bbox=np.array(bbox, dtype=np.float64).reshape(len(annotations), 4),
+            area=np.array(area, dtype=np.float64),
+            weight=np.array(weight, dtype=np.float64),
+            num_keypoints=np.array(num_keypoints, dtype=np.int64),
+            image_offsets=np.concatenate(
+                ([0], np.cumsum(image_counts, dtype=np.int64))
+            ),
+            image_indexes=np.array(image_indexes, dtype=np.int32),
+            category_offsets=np.concatenate(
+                ([0], np.cumsum(category_counts, dtype=np.int64))
+            ),
+            category_indexes=np.array(category_indexes, dtype=np.int32),
+            contributor=np.array(contributor, dtype=np.int32),
+        )
+
+    def to_annotations(self) -> list:
+        """Copies of the annotations with the values of the columns, the links to
+        images, categories and contributors are the ones of the index columns
+
+        Returns:
+            list: `Annotation` or `Annotation_pydantic`, like the source dataset
+        """
+        bbox = self.bbox.tolist()
+        bbox_set = (~np.isnan(self.bbox).any(axis=1)).tolist()
+        area = self.area.tolist()
+        weight = self.weight.tolist()
+        num_keypoints = self.num_keypoints.tolist()
+        contributor = self.contributor.tolist()
+        image_offsets = self.image_offsets.tolist()
+        image_indexes = self.image_indexes.tolist()
+        category_offsets = self.category_offsets.tolist()
+        category_indexes = self.category_indexes.tolist()
+        images, categories, contributors = (
+            self.images,
+            self.categories,
+            self.contributors,
+        )
+        runtime = isinstance(self.yarrow, YarrowDataset)
+
+        result = []
+        for row, annot in enumerate(self.annotations):
+            values = {
+                "bbox": bbox[row] if bbox_set[row] else None,
+                "area": None if isnan(area[row]) else area[row],
+                "weight": None if isnan(weight[row]) else weight[row],
+                "num_keypoints": None if num_keypoints[row] < 0 else num_keypoints[row],
+            }
+            row_images = [
+                images[idx]
+                for idx in image_indexes[image_offsets[row] : image_offsets[row + 1]]
+            ]
+            row_categories = [
+                categories[idx]
+                for idx in category_indexes[
+                    category_offsets[row] : category_offsets[row + 1]
+                ]
+            ]
+            row_contributor = contributors[contributor[row]]
+
+            if runtime:
+                annot = copy(annot)
+                annot.images = row_images
+                annot.categories = row_categories
+                annot.contributor = row_contributor
+                for name, value in values.items():
+                    setattr(annot, name, value)
+            else:
+                image_id = [img.id for img in row_images]
+                category_id = [cat.id for cat in row_categories]
+                values["image_id"] = (
+                    image_id[0] if isinstance(annot.image_id, str) else image_id
+                )
+                values["category_id"] = (
+                    category_id[0]
+                    if isinstance(annot.category_id, str)
+                    else category_id
+                )
+                values["contributor_id"] = row_contributor.id
+                # Unset fields that are still None stay unset
+                update = {
+                    name: value
+                    for name, value in values.items()
+                    if value is not None or name in annot.__fields_set__
+                }
+                annot = annot.copy(update=update)
+            result.append(annot)
+        return result
+
+    def to_yarrow(self) -> Union[YarrowDataset, YarrowDataset_pydantic]:
+        """Dataset of the same type as the source one with the annotations of
+        `to_annotations`, the other elements are shared with the source dataset"""
+        annotations = self.to_annotations()
+        if isinstance(self.yarrow, YarrowDataset_pydantic):
+            # A None section stays None, an empty list stays an empty list
+            if not annotations and self.yarrow.annotations is None:
+                annotations = None
+            return self.yarrow.copy(update={"annotations": annotations})
+        return YarrowDataset(
+            info=self.yarrow.info,
+            images=list(self.yarrow.images),
+            annotations=annotations,
+            contributors=list(self.yarrow.contributors),
+            confidential=list(self.yarrow.confidential),
+            categories=list(self.yarrow.categories),
+            multilayer_images=list(self.yarrow.multilayer_images),
+        )
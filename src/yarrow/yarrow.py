@@ -1,13 +1,17 @@
 import json
 import uuid
 from datetime import datetime
-from typing import Any, List, Optional, Union
+from typing import Any, List, Optional, Tuple, Union
 from warnings import warn
 
 import numpy as np
-from pydantic import BaseModel, Field, Json
+from pydantic import BaseModel, Field, Json, StrBytes, validator
+from pydantic.datetime_parse import parse_datetime
+from pydantic.parse import load_file, load_str_bytes
 
 from ._yarrow_version import _yarrow_version
+from .compression import compression_of, open_file
+from .json_backend import get_json_backend, json_dumps, json_loads
 
 
 def uuid_init():
@@ -170,55 +174,192 @@ class Category(BaseModel):
         return hash((self.name, self.value, self.super_category))
 
 
+def _mask_to_counts(flat_mask: np.ndarray) -> List[int]:
+    """Run lengths of a flat mask, the first run always counts zeros"""
+    if flat_mask.size == 0:
+        return [0]
+    change = np.flatnonzero(flat_mask[1:] != flat_mask[:-1]) + 1
+    bounds = np.concatenate(([0], change, [flat_mask.size]))
+    counts = np.diff(bounds).tolist()
+    if flat_mask[0] != 0:
+        counts.insert(0, 0)
+    return counts
+
+
+def _counts_to_mask(counts: List[int], length: int) -> np.ndarray:
+    """Flat uint8 mask of `length` pixels from alternating zero/one run lengths"""
+    counts = np.asarray(counts, dtype=np.int64)
+    values = (np.arange(counts.size) % 2).astype(np.uint8)
+    flat = np.repeat(values, counts)
+    if flat.size < length:
+        flat = np.concatenate((flat, np.zeros(length - flat.size, dtype=np.uint8)))
+    return flat[:length]
+
+
+def _counts_to_string(counts: List[int]) -> str:
+    """Compressed string of RLE counts, same encoding as pycocotools `rleToString`
+
+    Each count, minus the count two positions before it from the fourth count on,
+    is written in 5 bits chunks with a continuation bit, offset by 48 to be a
+    printable character.
+    """
+    chars = []
+    for idx, count in enumerate(counts):
+        value = count - counts[idx - 2] if idx > 2 else count
+        more = True
+        while more:
+            char = value & 0x1F
+            value >>= 5
+            more = value != -1 if char & 0x10 else value != 0
+            if more:
+                char |= 0x20
+            chars.append(chr(char + 48))
+    return "".join(chars)
+
+
+def _string_to_counts(compressed: str) -> List[int]:
+    """Inverse of `_counts_to_string`, same decoding as pycocotools `rleFrString`"""
+    counts = []
+    pos = 0
+    while pos < len(compressed):
+        value = 0
+        shift = 0
+        more = True
+        while more:
+            char = ord(compressed[pos]) - 48
+            value |= (char & 0x1F) << shift
+            more = char & 0x20
+            pos += 1
+            shift += 5
+            if not more and char & 0x10:
+                value |= -1 << shift
+        if len(counts) > 2:
+            value += counts[-2]
+        counts.append(value)
+    return counts
+
+
 class RLE(BaseModel):
     """Uncompressed binary Mask
 
     Args:
-        counts  : List[int]
+        counts  : List[int] or the compressed string of the counts, decoded on load
         size    : List[int]
 
     Can take "binary_mask" of type ndarray as an input, will have the normal attributes
+
+    `counts` can be given as the compressed string used by pycocotools, only the
+    string encoding is shared: the counts still follow the row major ("C") order of
+    the mask. Use `compressed_counts` or `save_to_file(..., rle_encoding="compressed")`
+    to write it.
+
+    Stacks of masks can be converted at once with `RLE.from_binary_masks()` and
+    `RLE.to_binary_masks()`
     """
 
     # fmt: off
-    counts          : List[int]
+    counts          : Union[List[int], str]
     size            : List[int]
     # fmt: on
 
-    def _binary_mask_to_rle(self, binary_mask: np.ndarray):
-        counts = []
-        size = list(binary_mask.shape)
-
-        last_elem = 0
-        running_length = 0
-
-        for _, elem in enumerate(binary_mask.ravel(order="C")):
-            if elem != last_elem:
-                counts.append(running_length)
-                running_length = 0
-                last_elem = elem
-            running_length += 1
+    @validator("counts", pre=True)
+    def _decompress_counts(cls, value):
+        if isinstance(value, str):
+            return _string_to_counts(value)
+        return value
 
-        counts.append(running_length)
+    @property
+    def compressed_counts(self) -> str:
+        """Counts as the pycocotools compressed string"""
+        return _counts_to_string(self.counts)
 
-        return counts, size
+    def _binary_mask_to_rle(self, binary_mask: np.ndarray):
+        return _mask_to_counts(binary_mask.ravel(order="C")), list(binary_mask.shape)
 
     @property
     def binary_mask(self):
         return self._rle_to_binary_mask()
 
     def _rle_to_binary_mask(self):
-        bi_mask = np.zeros(shape=self.size[0] * self.size[1], dtype=np.uint8)
+        bi_mask = _counts_to_mask(self.counts, int(np.prod(self.size)))
+        return np.reshape(bi_mask, tuple(self.size), order="C")
 
-        last_elem = False
-        cur_pos = 0
-        for count in self.counts:
-            if last_elem:
-                bi_mask[cur_pos : cur_pos + count] = 1
-            last_elem = not last_elem
-            cur_pos += count
+    @classmethod
+    def from_binary_masks(cls, binary_masks: np.ndarray) -> List["RLE"]:
+        """Encodes a stack of masks in one call
 
-        return np.reshape(bi_mask, newshape=tuple(self.size), order="C")
+        Args:
+            binary_masks (np.ndarray): array of shape (N, height, width)
+
+        Returns:
+            List[RLE]: one RLE per mask, identical to `RLE(binary_mask=mask)`
+        """
+        binary_masks = np.asarray(binary_masks)
+        size = list(binary_masks.shape[1:])
+        nb_masks = binary_masks.shape[0]
+        if nb_masks == 0:
+            return []
+        flat = binary_masks.reshape(nb_masks, -1)
+        length = flat.shape[1]
+        if length == 0:
+            return [cls.construct(counts=[0], size=list(size)) for _ in range(nb_masks)]
+
+        # A run starts at the first pixel of each mask and at every change
+        starts = np.empty(flat.shape, dtype=bool)
+        starts[:, 0] = True
+        np.not_equal(flat[:, 1:], flat[:, :-1], out=starts[:, 1:])
+        rows, cols = np.nonzero(starts)
+
+        ends = np.empty_like(cols)
+        ends[:-1] = cols[1:]
+        ends[-1] = length
+        ends[:-1][rows[1:] != rows[:-1]] = length
+        runs = (ends - cols).tolist()
+
+        nb_runs = np.bincount(rows, minlength=nb_masks).tolist()
+        leading_zero = (flat[:, 0] != 0).tolist()
+
+        result = []
+        offset = 0
+        for nb, lead in zip(nb_runs, leading_zero):
+            counts = runs[offset : offset + nb]
+            offset += nb
+            if lead:
+                counts.insert(0, 0)
+            # counts are built here from ints, no need to validate them again
+            result.append(cls.construct(counts=counts, size=list(size)))
+        return result
+
+    @staticmethod
+    def to_binary_masks(rles: List["RLE"]) -> np.ndarray:
+        """Decodes a list of RLE sharing the same size in one call
+
+        Args:
+            rles (List[RLE]): masks to decode, they must all have the same `size`
+
+        Raises:
+            ValueError: if the RLE sizes differ
+
+        Returns:
+            np.ndarray: uint8 array of shape (N, *size)
+        """
+        if len(rles) == 0:
+            return np.zeros(shape=(0,), dtype=np.uint8)
+        size = rles[0].size
+        if any(rle.size != size for rle in rles):
+            raise ValueError("all RLE must have the same size to be stacked")
+        length = int(np.prod(size))
+
+        counts = [np.asarray(rle.counts, dtype=np.int64) for rle in rles]
+        if any(int(cnt.sum()) != length for cnt in counts):
+            # Malformed counts are padded or truncated individually
+            return np.stack([rle.binary_mask for rle in rles])
+
+        lengths = np.array([len(cnt) for cnt in counts])
+        offsets = np.repeat(np.cumsum(lengths) - lengths, lengths)
+        values = ((np.arange(lengths.sum()) - offsets) % 2).astype(np.uint8)
+        flat = np.repeat(values, np.concatenate(counts))
+        return flat.reshape((len(rles), *size), order="C")
 
     def __init__(self, **kwargs) -> None:
         if "binary_mask" in kwargs.keys():
@@ -270,6 +411,19 @@ class Annotation_pydantic(BaseModel):
         return NotImplemented
 
 
+RLE_ENCODINGS = ("list", "compressed")
+
+
+def _compress_rle_dict(annot: dict) -> dict:
+    """Replaces in place the RLE counts of a serialized annotation by their
+    compressed string"""
+    for key in ("mask", "segmentation"):
+        rle = annot.get(key)
+        if isinstance(rle, dict) and isinstance(rle.get("counts"), list):
+            rle["counts"] = _counts_to_string(rle["counts"])
+    return annot
+
+
 class Contributor(BaseModel):
     # fmt: off
     id              : str = Field(default_factory=uuid_init)
@@ -299,11 +453,88 @@ class YarrowDataset_pydantic(BaseModel):
     multilayer_images: Optional[List[MultilayerImage_pydantic]] = Field(default_factory=list)
     # fmt: on
 
+    class Config:
+        # parse_file, parse_raw and json() use the selected JSON backend
+        json_loads = json_loads
+        json_dumps = json_dumps
+
     def __eq__(self, other: Any) -> bool:
         if not isinstance(other, YarrowDataset_pydantic):
             return False
         return NotImplemented
 
+    @classmethod
+    def parse_obj(cls, obj: Any, validate: bool = True) -> "YarrowDataset_pydantic":
+        """Pydantic `parse_obj`, pass `validate=False` to skip the validation of
+        trusted inputs, see `construct_trusted()`"""
+        if validate:
+            return super().parse_obj(obj)
+        return cls.construct_trusted(obj)
+
+    @classmethod
+    def parse_raw(
+        cls, b: StrBytes, validate: bool = True, **kwargs
+    ) -> "YarrowDataset_pydantic":
+        """Pydantic `parse_raw`, pass `validate=False` to skip the validation of
+        trusted inputs, see `construct_trusted()`"""
+        if validate:
+            return super().parse_raw(b, **kwargs)
+        obj = load_str_bytes(b, json_loads=cls.__config__.json_loads, **kwargs)
+        return cls.construct_trusted(obj)
+
+    @classmethod
+    def parse_file(
+        cls,
+        path,
+        validate: bool = True,
+        cache_dir: str = None,
+        cache_max_size: int = None,
+        **kwargs
+    ) -> "YarrowDataset_pydantic":
+        """Pydantic `parse_file`, pass `validate=False` to skip the validation of
+        trusted inputs, see `construct_trusted()`. Files ending with .gz, .xz or .zst
+        are decompressed, see `yarrow.compression`. With `cache_dir`, a binary
+        snapshot of the file is kept in that directory and loaded instead of the
+        file until it is modified, see `yarrow.cache`"""
+        if cache_dir is not None:
+            # cache imports this module
+            from .cache import DEFAULT_CACHE_SIZE, cached_parse
+
+            return cached_parse(
+                path,
+                lambda: cls.parse_file(path, validate=validate, **kwargs),
+                cache_dir,
+                validate=validate,
+                max_size=(
+                    DEFAULT_CACHE_SIZE if cache_max_size is None else cache_max_size
+                ),
+            )
+
+        if compression_of(path) is None:
+            obj = load_file(path, json_loads=cls.__config__.json_loads, **kwargs)
+        else:
+            with open_file(path, "rb") as fp:
+                obj = load_str_bytes(
+                    fp.read(), json_loads=cls.__config__.json_loads, **kwargs
+                )
+        return cls.parse_obj(obj, validate=validate)
+
+    @classmethod
+    def construct_trusted(cls, obj: dict) -> "YarrowDataset_pydantic":
+        """Builds the dataset and all its elements without pydantic validation.
+
+        Only use it on files produced by yarrow: the values are not checked, only the
+        datetimes, the JSON `meta` strings and the compressed RLE counts are converted,
+        and the nested objects are built. Unknown keys are dropped like in validation.
+
+        Args:
+            obj (dict): decoded yarrow JSON
+
+        Returns:
+            YarrowDataset_pydantic
+        """
+        return _construct(cls, obj)
+
     def _clean_unused(self):
         return NotImplemented
 
@@ -314,107 +545,293 @@ class YarrowDataset_pydantic(BaseModel):
         exclude_none: bool = True,
         indent: int = 4,
         default=str,
+        rle_encoding: str = "list",
         **kwargs
     ):
         """Save this dataset to a file
 
-        :param fp: File path to save the dataset to
+        :param fp: File path to save the dataset to, compressed if it ends with .gz, .xz or .zst
         :type fp: _type_
         :param exclude_unset: Exclude unset keys you should not write what you don't use, defaults to True
         :type exclude_unset: bool, optional
-        :param indent: Number of indents in the json file, defaults to 4
+        :param indent: Number of indents in the json file, None writes compact JSON without whitespace, defaults to 4
         :type indent: int, optional
         :param default: default(obj) is a function that should return a serializable version of obj or raise TypeError. The default simply raises TypeError, defaults to str
         :type default: obj, optional
+        :param rle_encoding: How RLE counts are written, "list" for a list of int or "compressed" for the pycocotools compressed string, defaults to "list"
+        :type rle_encoding: str, optional
+
+        The elements are serialized and written one at a time, see `yarrow.stream.write_file`,
+        except when `include` or `exclude` are given in kwargs
         """
-        with open(fp, "w") as fp:
-            json.dump(
-                self.dict(
-                    exclude_unset=exclude_unset, exclude_none=exclude_none, **kwargs
-                ),
-                fp,
-                default=default,
-                indent=indent,
+        if rle_encoding not in RLE_ENCODINGS:
+            raise ValueError(
+                "rle_encoding should be one of {}, got {}".format(
+                    RLE_ENCODINGS, rle_encoding
+                )
             )
 
-    def _check_valid_ids(self):
-        results = []
-        cat_dict = {cat.id: 0 for cat in self.categories} if self.categories else {}
-        contr_dict = (
-            {contr.id: 0 for contr in self.contributors} if self.contributors else {}
-        )
-        confid_dict = (
-            {confid.id: 0 for confid in self.confidential} if self.confidential else {}
+        if "include" in kwargs or "exclude" in kwargs:
+            # include and exclude target the whole dataset, use its complete dict
+            content = self.dict(
+                exclude_unset=exclude_unset, exclude_none=exclude_none, **kwargs
+            )
+            if rle_encoding == "compressed":
+                for annot in content.get("annotations") or []:
+                    _compress_rle_dict(annot)
+
+            with open_file(fp, "w") as fp:
+                fp.write(get_json_backend().dumps(content, default, indent))
+            return
+
+        # stream imports this module
+        from .stream import _write_sections
+
+        # Like self.dict(exclude_unset=...), an unset section is left out, not written as null
+        sections = [
+            (key, getattr(self, key))
+            for key in self.__fields__
+            if not exclude_unset or key in self.__fields_set__
+        ]
+        _write_sections(
+            fp,
+            sections,
+            exclude_unset=exclude_unset,
+            exclude_none=exclude_none,
+            indent=indent,
+            default=default,
+            rle_encoding=rle_encoding,
+            **kwargs
         )
 
-        img_dict = {}
-        for img in self.images:
-            if img.confidential_id in confid_dict.keys():
-                confid_dict[img.confidential_id] += 1
-            elif not img.confidential_id is None:
+    def to_binary(self, path: str, compress: bool = False) -> None:
+        """Save this dataset in the columnar binary format, see `yarrow.binary`
+
+        :param path: File path, by convention ending with .yarrow.npz
+        :type path: str
+        :param compress: Deflate the arrays, they cannot be memory mapped anymore, defaults to False
+        :type compress: bool, optional
+        """
+        # binary imports this module
+        from .binary import to_binary
+
+        to_binary(self, path, compress=compress)
+
+    @classmethod
+    def from_binary(cls, path: str) -> "YarrowDataset_pydantic":
+        """Load a dataset saved with `to_binary()`, see `yarrow.binary`"""
+        from .binary import from_binary
+
+        return from_binary(path)
+
+    def _check_valid_ids(self, max_samples: int = 10) -> Tuple[bool, List[dict]]:
+        """Checks that the ids referenced by the elements exist, in one set based
+        pass over each reference column, `image_id` and `category_id` can be lists
+
+        Args:
+            max_samples (int, optional): number of offending elements reported for \
+                each kind of error. Defaults to 10.
+
+        Returns:
+            Tuple[bool, List[dict]]: True if no reference is missing, and one report \
+                per kind of error or warning with the `key`, the `error` message, the \
+                `count` of offending elements and `samples` of them
+        """
+        img_ids = {img.id for img in self.images}
+        cat_ids = {cat.id for cat in self.categories or []}
+        contr_ids = {contr.id for contr in self.contributors or []}
+        confid_ids = {confid.id for confid in self.confidential or []}
+        annotations = self.annotations or []
+        multilayers = self.multilayer_images or []
+
+        results = []
+        used = {}
+        for owners, owner_key, key, known, error in (
+            (
+                self.images,
+                "image_id",
+                "confidential_id",
+                confid_ids,
+                "confidential_id does not appear in the confidential list",
+            ),
+            (
+                annotations,
+                "annot_id",
+                "image_id",
+                img_ids,
+                "image_id in the annotation does not appear in the image list",
+            ),
+            (
+                annotations,
+                "annot_id",
+                "category_id",
+                cat_ids,
+                "category_id in the annotation does not appear in the category list",
+            ),
+            (
+                annotations,
+                "annot_id",
+                "contributor_id",
+                contr_ids,
+                "contributor_id in the annotation does not appear in the contributor list",
+            ),
+            (
+                multilayers,
+                "multilayer_id",
+                "image_id",
+                img_ids,
+                "image_id in the multilayer image does not appear in the image list",
+            ),
+        ):
+            values = [getattr(owner, key) for owner in owners]
+            refs = set(_flat_ids(values))
+            used.setdefault(key, set()).update(refs)
+            missing = refs - known
+            if missing:
                 results.append(
-                    {
-                        "key": "confidential_id",
-                        "error": "confidential_id does not appear in the confidential list",
-                        "image_id": img.id,
-                        "confidential_id": img.confidential_id,
-                    }
-                )
-            img_dict[img.id] = 0
-
-        if self.annotations:
-            for annot in self.annotations:
-                if annot.image_id in img_dict.keys():
-                    img_dict[annot.image_id] += 1
-                else:
-                    results.append(
-                        {
-                            "key": "image_id",
-                            "error": "image_id in the annotation does not appear in the image list",
-                            "annot_id": annot.id,
-                            "image_id": annot.image_id,
-                        }
-                    )
-                if annot.category_id in cat_dict.keys():
-                    cat_dict[annot.category_id] += 1
-                else:
-                    results.append(
-                        {
-                            "key": "category_id",
-                            "error": "image_id in the annotation does not appear in the category list",
-                            "annot_id": annot.id,
-                            "category_id": annot.category_id,
-                        }
-                    )
-                if annot.contributor_id in contr_dict.keys():
-                    contr_dict[annot.contributor_id] += 1
-                else:
-                    results.append(
-                        {
-                            "key": "contributor_id",
-                            "error": "image_id in the annotation does not appear in the contributor list",
-                            "annot_id": annot.id,
-                            "contributor_id": annot.contributor_id,
-                        }
+                    _missing_report(
+                        owners, values, missing, owner_key, key, error, max_samples
                     )
+                )
 
         end_res = len(results) == 0
 
-        def gen_warning_unused(input_dict, key_name):
-            result = []
-            for k, v in input_dict.items():
-                if v == 0:
-                    result.append(
-                        {
-                            "key": key_name,
-                            "error": "warning, unused category",
-                            key_name: k,
-                        }
-                    )
-            return result
-
-        results.extend(gen_warning_unused(cat_dict, "category_id"))
-        results.extend(gen_warning_unused(contr_dict, "contributor_id"))
-        results.extend(gen_warning_unused(confid_dict, "confidential_id"))
+        # Reported in the order of the lists, not of the sets of ids
+        for key, name, elems in (
+            ("category_id", "category", self.categories),
+            ("contributor_id", "contributor", self.contributors),
+            ("confidential_id", "confidential", self.confidential),
+        ):
+            unused = list(
+                dict.fromkeys(
+                    elem.id for elem in elems or [] if elem.id not in used[key]
+                )
+            )
+            if unused:
+                results.append(
+                    {
+                        "key": key,
+                        "error": "warning, unused {}".format(name),
+                        "count": len(unused),
+                        "samples": [{key: id_} for id_ in unused[:max_samples]],
+                    }
+                )
 
         return end_res, results
+
+
+def _flat_ids(values: List[Union[str, List[str], None]]) -> List[str]:
+    """Ids of a column of single or list references, None is skipped"""
+    result = []
+    append, extend = result.append, result.extend
+    for value in values:
+        if isinstance(value, str):
+            append(value)
+        elif value is not None:
+            extend(value)
+    return result
+
+
+def _missing_report(
+    owners: list,
+    values: list,
+    missing: set,
+    owner_key: str,
+    key: str,
+    error: str,
+    max_samples: int,
+) -> dict:
+    """Report of the elements of `owners` referencing an id of `missing`"""
+    count = 0
+    samples = []
+    for owner, value in zip(owners, values):
+        if isinstance(value, str):
+            bad = value if value in missing else None
+        else:
+            bad = [id_ for id_ in value or [] if id_ in missing] or None
+        if bad is None:
+            continue
+        count += 1
+        if len(samples) < max_samples:
+            samples.append({owner_key: owner.id, key: bad})
+    return {"key": key, "error": error, "count": count, "samples": samples}
+
+
+def _trusted_datetime(value: Any) -> datetime:
+    return value if isinstance(value, datetime) else parse_datetime(value)
+
+
+def _trusted_json(value: Any) -> Any:
+    return json_loads(value) if isinstance(value, (str, bytes)) else value
+
+
+def _trusted_counts(value: Any) -> List[int]:
+    return _string_to_counts(value) if isinstance(value, str) else value
+
+
+def _trusted_list(model: type) -> Any:
+    return lambda values: [_construct(model, value) for value in values]
+
+
+def _trusted_segmentation(value: Any) -> Any:
+    return _construct(RLE, value) if isinstance(value, dict) else value
+
+
+# Conversions applied to the non None values by `_construct`, the other fields
+# are taken as they are
+_TRUSTED_CONVERTERS = {
+    Info: {"date_created": _trusted_datetime},
+    Image_pydantic: {
+        "date_captured": _trusted_datetime,
+        "meta": _trusted_json,
+        "layers": _trusted_list(Layer),
+    },
+    Category: {"skeleton": _trusted_list(Edge)},
+    RLE: {"counts": _trusted_counts},
+    Annotation_pydantic: {
+        "mask": lambda value: _construct(RLE, value),
+        "segmentation": _trusted_segmentation,
+        "date_captured": _trusted_datetime,
+    },
+    YarrowDataset_pydantic: {
+        "info": lambda value: _construct(Info, value),
+        "images": _trusted_list(Image_pydantic),
+        "annotations": _trusted_list(Annotation_pydantic),
+        "confidential": _trusted_list(Clearance),
+        "contributors": _trusted_list(Contributor),
+        "categories": _trusted_list(Category),
+        "multilayer_images": _trusted_list(MultilayerImage_pydantic),
+    },
+}
+
+
+_IMMUTABLE_DEFAULTS = (type(None), str, int, float, bool)
+
+
+def _construct(model: type, values: dict) -> BaseModel:
+    """Equivalent of `model.construct()` on the known fields of `values` with the
+    cheap conversions of `_TRUSTED_CONVERTERS`"""
+    if isinstance(values, model):
+        return values
+    converters = _TRUSTED_CONVERTERS.get(model, {})
+    fields_values = {}
+    fields_set = set()
+    for name, field in model.__fields__.items():
+        if name in values:
+            value = values[name]
+            if value is not None and name in converters:
+                value = converters[name](value)
+            fields_set.add(name)
+        elif field.default_factory is None and isinstance(
+            field.default, _IMMUTABLE_DEFAULTS
+        ):
+            value = field.default
+        else:
+            value = field.get_default()
+        fields_values[name] = value
+
+    # Same as BaseModel.construct without its per field default copies
+    result = model.__new__(model)
+    object.__setattr__(result, "__dict__", fields_values)
+    object.__setattr__(result, "__fields_set__", fields_set)
+    return result
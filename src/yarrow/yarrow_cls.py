@@ -9,16 +9,89 @@ Each class has a pydantic conversion:
     img_as_dict = img_pydantic.dict() # now you have a dict
 
 """
+import os
+from abc import ABCMeta
 from copy import copy
 from datetime import datetime
+from types import MappingProxyType
+from typing import Callable, Dict, Iterable, Mapping, NamedTuple, Sequence
 from warnings import warn
 
 from pydantic import StrBytes
 
+from .spatial import BoxIndex, annotation_boxes
 from .yarrow import *
 
 
-class Image:
+class _Element:
+    """Base of the runtime classes, `_ATTRIBUTES` are the attributes set by their
+    constructor, stored in the instance dict or in the slots of the `Slotted*`
+    variants"""
+
+    __slots__ = ()
+    _ATTRIBUTES = ()
+
+    def _fields(self) -> dict:
+        """Public attribute values keyed by name"""
+        return {
+            name: getattr(self, name)
+            for name in self._ATTRIBUTES
+            if not name.startswith("_")
+        }
+
+    def __getstate__(self) -> dict:
+        return dict(self.__dict__)
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+
+    def __copy__(self):
+        # Faster than the generic copy going through __reduce_ex__
+        result = object.__new__(type(self))
+        result.__setstate__(self.__getstate__())
+        return result
+
+
+class _Slotted(_Element):
+    """Base of the `Slotted*` variants of the runtime classes, their attributes
+    are stored in `__slots__` instead of a per instance dict to keep large
+    datasets compact in memory, see `YarrowDataset.from_yarrow(slots=True)`.
+    Setting an attribute that is not in `_ATTRIBUTES` raises AttributeError."""
+
+    __slots__ = ()
+
+    @property
+    def __dict__(self) -> Mapping[str, Any]:
+        # Kept for compatibility with `Image(**img.__dict__)`, read-only as
+        # writing to it could not modify the object
+        return MappingProxyType(self._fields())
+
+    def __getstate__(self) -> dict:
+        return {
+            name: getattr(self, name) for name in self.__slots__ if hasattr(self, name)
+        }
+
+    def __setstate__(self, state: dict) -> None:
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+
+
+class _ImageBase(_Element):
+    __slots__ = ()
+    _ATTRIBUTES = (
+        "id",
+        "width",
+        "height",
+        "file_name",
+        "date_captured",
+        "azure_url",
+        "confidential",
+        "meta",
+        "comment",
+        "asset_id",
+        "split",
+    )
+
     def __init__(
         self,
         width: int,
@@ -62,25 +135,21 @@ class Image:
         self.asset_id = asset_id
         self.split = split
 
-        self._pydantic_self = None
-
     def pydantic(self, id: str = None, reset: bool = False) -> Image_pydantic:
-        """Returns the pydantic object mapping this class. After the first call_
-        the object reference is kept. Pass reset=True to reinstantiate the object
+        """Returns the pydantic object mapping this class, a new object is built
+        on each call so that large datasets do not hold one per image
 
         Args:
             id (str, optional): image id that will be passed to the pydantic class. IRIS2 use cas. Defaults to None.
-            reset (bool, optional): Pass True to reinstantiate the object, previous object will be lost. Defaults to False.
+            reset (bool, optional): not used, kept for compatibility. Defaults to False.
 
         Returns:
             Image_pydantic: pydantic image class
         """
-        if self._pydantic_self is None or reset:
-            self._pydantic_self = self._pydantic_call(id)
-        return self._pydantic_self
+        return self._pydantic_call(id)
 
     def __eq__(self, other):
-        if isinstance(other, Image):
+        if isinstance(other, _ImageBase):
             return all(
                 (
                     self.file_name == other.file_name,
@@ -98,11 +167,64 @@ class Image:
             self.id = id
         return Image_pydantic(
             confidential_id=None if self.confidential is None else self.confidential.id,
-            **self.__dict__,
+            **self._fields(),
         )
 
 
-class Annotation:
+class Image(_ImageBase, metaclass=ABCMeta):
+    """Runtime image, see `__init__`. Its attributes are stored in an instance
+    dict, see `SlottedImage` for a compact variant"""
+
+
+class SlottedImage(_Slotted, _ImageBase):
+    """`Image` storing its attributes in `__slots__`, an instance of `Image`"""
+
+    __slots__ = _ImageBase._ATTRIBUTES
+
+
+Image.register(SlottedImage)
+
+
+def _same_elements(elems: list, others: list) -> bool:
+    """Compares two lists as sets"""
+    return elems == others or set(elems) == set(others)
+
+
+def _same_token(token: tuple, other: tuple) -> bool:
+    """Compares two `_identity_token` by identity of their objects. The tokens hold
+    the objects so that their ids cannot be reused by new objects"""
+    return (
+        other is not None
+        and len(token) == len(other)
+        and all(elem is other_elem for elem, other_elem in zip(token, other))
+    )
+
+
+class _AnnotationBase(_Element):
+    __slots__ = ()
+    _ATTRIBUTES = (
+        "id",
+        "name",
+        "images",
+        "categories",
+        "contributor",
+        "comment",
+        "segmentation",
+        "is_crowd",
+        "polygon",
+        "polyline",
+        "mask",
+        "area",
+        "bbox",
+        "keypoints",
+        "num_keypoints",
+        "weight",
+        "date_captured",
+        "meta",
+        "_hash",
+        "_hash_token",
+    )
+
     def __init__(
         self,
         contributor: Contributor,
@@ -122,6 +244,7 @@ class Annotation:
         weight: float = None,
         date_captured: datetime = None,
         meta: dict = None,
+        id: str = None,
         **kwargs
     ) -> None:
         """Annotation class, can handle bbox, polygon, mask and keypoint annotation types \
@@ -160,7 +283,9 @@ class Annotation:
             weight (float, optional): weight given to the quality of the annotation. Defaults to None.
             date_captured (datetime, optional): datetime at which the annotation was created. Defaults to None.
             meta (dict, optional): a free metadata information key. If the Annotation cannot hold your information then put it here
+            id (str, optional): pydantic identifier, generated by the first `pydantic()` call if None. Defaults to None.
         """
+        self.id = id
         self.name = name
 
         self.images = images or []
@@ -203,28 +328,67 @@ class Annotation:
         self.date_captured = date_captured
         self.meta = meta or {}
 
-        self._pydantic_self = None
-
-    def __hash__(self) -> int:
-        return hash(
-            (self.name, *set(self.images), *set(self.categories), self.contributor)
+        self._hash = None
+        self._hash_token = None
+
+    def _identity_token(self) -> tuple:
+        """Changes when `name`, `contributor`, the `images` or `categories`
+        lists are reassigned or when the elements of one of the lists change,
+        compared by identity with `_same_token`"""
+        return (
+            self.name,
+            self.contributor,
+            self.images,
+            self.categories,
+            *self.images,
+            *self.categories,
         )
 
-    def __eq__(self, other) -> bool:
-        if isinstance(other, Annotation):
-            return all(
+    def _relink(
+        self, images: List[Image], categories: List[Category], contributor: Contributor
+    ) -> None:
+        """Replaces the links by equal elements, ex: the ones of a dataset, the
+        cached hash stays valid"""
+        hash(self)
+        self.images = images
+        self.categories = categories
+        self.contributor = contributor
+        self._hash_token = self._identity_token()
+
+    def __hash__(self) -> int:
+        # Only the identity fields are hashed, the bbox and the shapes compared
+        # by `__eq__` can be modified in place while the annotation is in a set
+        # or a dataset index. The images and categories are hashed as sets, the
+        # hash is cached until `_identity_token` changes. Modifying an image or
+        # a category in place is not detected.
+        token = self._identity_token()
+        if self._hash is None or not _same_token(token, self._hash_token):
+            self._hash = hash(
                 (
-                    self.name == other.name,
-                    set(self.images) == set(other.images),
-                    self.contributor == other.contributor,
-                    set(self.categories) == set(other.categories),
-                    self.polygon == other.polygon,
-                    self.polyline == other.polyline,
-                    self.mask == other.mask,
-                    self.bbox == other.bbox,
-                    self.keypoints == other.keypoints,
+                    self.name,
+                    frozenset(self.images),
+                    frozenset(self.categories),
+                    self.contributor,
                 )
             )
+            self._hash_token = token
+        return self._hash
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, _AnnotationBase):
+            # Cheapest and most discriminating comparisons first
+            return (
+                self.bbox == other.bbox
+                and hash(self) == hash(other)
+                and self.name == other.name
+                and self.contributor == other.contributor
+                and _same_elements(self.images, other.images)
+                and _same_elements(self.categories, other.categories)
+                and self.polygon == other.polygon
+                and self.polyline == other.polyline
+                and self.mask == other.mask
+                and self.keypoints == other.keypoints
+            )
         return NotImplemented
 
     def _poly_mask_validator(self):
@@ -265,28 +429,59 @@ class Annotation:
             use only if you know what you are doing
 
         Args:
-            reset (bool, optional): regenerates the pydantic class, using it will reset the id. Defaults to False.
+            reset (bool, optional): generates a new id. Defaults to False.
 
         Returns:
             type(Annotation_pydantic)
         """
-        if self._pydantic_self is None or reset:
-            self._pydantic_self = self._pydantic_call()
-        return self._pydantic_self
+        if self.id is None or reset:
+            self.id = uuid_init()
+        return self._pydantic_call()
 
     def _pydantic_call(self) -> Annotation_pydantic:
         self._poly_mask_validator()
         self._image_list_validator()
 
+        fields = self._fields()
+        # The deprecated is_crowd stays unset at its default, reading the dataset
+        # back would warn about it otherwise
+        if not fields["is_crowd"]:
+            del fields["is_crowd"]
         return Annotation_pydantic(
-            image_id=list({img.pydantic().id for img in self.images}),
+            image_id=list({img.id for img in self.images}),
             category_id=[cat.id for cat in self.categories],
             contributor_id=self.contributor.id,
-            **self.__dict__,
+            **fields,
         )
 
 
-class MultilayerImage:
+class Annotation(_AnnotationBase, metaclass=ABCMeta):
+    """Runtime annotation, see `__init__`. Its attributes are stored in an instance
+    dict, see `SlottedAnnotation` for a compact variant"""
+
+
+class SlottedAnnotation(_Slotted, _AnnotationBase):
+    """`Annotation` storing its attributes in `__slots__`, an instance of
+    `Annotation`"""
+
+    __slots__ = _AnnotationBase._ATTRIBUTES
+
+
+Annotation.register(SlottedAnnotation)
+
+
+class _MultilayerImageBase(_Element):
+    __slots__ = ()
+    _ATTRIBUTES = (
+        "id",
+        "images",
+        "name",
+        "meta",
+        "split",
+        "_hash",
+        "_hash_token",
+    )
+
     def __init__(
         self,
         images: List[Image] = None,
@@ -327,19 +522,26 @@ class MultilayerImage:
         self.meta = meta or {}
         self.split = split
 
-        self._pydantic = None
+        self._hash = None
+        self._hash_token = None
+
+    def _identity_token(self) -> tuple:
+        """See `Annotation._identity_token`"""
+        return (self.name, self.images, *self.images)
 
     def __hash__(self):
-        # return hash((*set(self.images), self.name))
-        return hash((*sorted(self.images, key=lambda x: hash(x)), self.name))
+        token = self._identity_token()
+        if self._hash is None or not _same_token(token, self._hash_token):
+            self._hash = hash((frozenset(self.images), self.name))
+            self._hash_token = token
+        return self._hash
 
     def __eq__(self, other):
-        if isinstance(other, MultilayerImage):
-            return all(
-                (
-                    set(self.images) == set(other.images),
-                    self.name == other.name,
-                )
+        if isinstance(other, _MultilayerImageBase):
+            return (
+                hash(self) == hash(other)
+                and self.name == other.name
+                and _same_elements(self.images, other.images)
             )
         return NotImplemented
 
@@ -354,29 +556,245 @@ class MultilayerImage:
             img.split = split
 
     def pydantic(self, reset: bool = False):
-        """Returns the pydantic object mapping this class. After the first call_
-        the object reference is kept. Pass reset=True to reinstantiate the object
+        """Returns the pydantic object mapping this class, a new object is built
+        on each call
 
         Args:
-            reset (bool, optional): Pass True to reinstantiate the object, previous object will be lost. Defaults to False.
+            reset (bool, optional): not used, kept for compatibility. Defaults to False.
 
         Returns:
             Image_pydantic: pydantic image class
         """
-        if self._pydantic is None or reset:
-            self._pydantic = self._pydantic_call()
-        return self._pydantic
+        return self._pydantic_call()
 
     def _pydantic_call(self, **kwargs):
         return MultilayerImage_pydantic(
             id=self.id,
             name=self.name,
-            image_id=[img.pydantic().id for img in self.images],
+            image_id=[img.id for img in self.images],
             meta=self.meta,
             split=self.split,
         )
 
 
+def _first_by_id(elems: list) -> dict:
+    """Maps each id to the first element of `elems` holding it"""
+    result = {}
+    for elem in elems:
+        result.setdefault(elem.id, elem)
+    return result
+
+
+class MultilayerImage(_MultilayerImageBase, metaclass=ABCMeta):
+    """Runtime multilayer image, see `__init__`. Its attributes are stored in an instance
+    dict, see `SlottedMultilayerImage` for a compact variant"""
+
+
+class SlottedMultilayerImage(_Slotted, _MultilayerImageBase):
+    """`MultilayerImage` storing its attributes in `__slots__`, an instance of
+    `MultilayerImage`"""
+
+    __slots__ = _MultilayerImageBase._ATTRIBUTES
+
+
+MultilayerImage.register(SlottedMultilayerImage)
+
+
+class _ListIndex:
+    """Hash index kept alongside one of the `YarrowDataset` element lists.
+
+    Maps every element to the first equal element found in the list, which is
+    what the previous linear `next(elem for elem in list if elem == x)` lookup
+    returned. The index is rebuilt whenever the list it tracks was replaced or
+    its length changed outside of `get_or_add`. The elements are indexed by
+    their hash, reassigning or modifying one of the hashed fields of an element
+    of the dataset, ex: `annot.name = ...` or `annot.images.append(...)`, is
+    not detected, call `YarrowDataset.reindex()` after.
+    """
+
+    __slots__ = ("_source", "_size", "_mapping")
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self._source = None
+        self._size = -1
+        self._mapping = {}
+
+    def _sync(self, elems: list) -> None:
+        if self._source is elems and self._size == len(elems):
+            return
+        self._mapping = {}
+        for elem in elems:
+            self._mapping.setdefault(elem, elem)
+        self._source = elems
+        self._size = len(elems)
+
+    def get(self, elems: list, elem: Any) -> Any:
+        """Returns the element of `elems` equal to `elem`, None if there is none"""
+        self._sync(elems)
+        return self._mapping.get(elem)
+
+    def add(self, elems: list, elem: Any) -> None:
+        """Appends `elem` to `elems`, it should not be in `elems` already"""
+        self._sync(elems)
+        elems.append(elem)
+        self._mapping[elem] = elem
+        self._size += 1
+
+    def get_or_add(self, elems: list, elem: Any) -> Any:
+        """Returns the element of `elems` equal to `elem`, appending `elem` to
+        `elems` first if no such element exists"""
+        found = self.get(elems, elem)
+        if found is None:
+            self.add(elems, elem)
+            return elem
+        return found
+
+
+class _InvertedIndex:
+    """Maps keys to the elements of one of the `YarrowDataset` lists, ex: each
+    image to the annotations linked to it.
+
+    The elements appended to the list since the last query are indexed
+    incrementally, the index is rebuilt when the list was replaced or shortened
+    and when `reset()` is called after elements were modified in place.
+    """
+
+    __slots__ = ("_keys", "_source", "_size", "_mapping")
+
+    def __init__(self, keys: Callable[[Any], Iterable]) -> None:
+        self._keys = keys
+        self.reset()
+
+    def reset(self) -> None:
+        self._source = None
+        self._size = 0
+        self._mapping = {}
+
+    def _sync(self, elems: list) -> None:
+        if self._source is not elems or self._size > len(elems):
+            self.reset()
+            self._source = elems
+        mapping, keys = self._mapping, self._keys
+        for elem in elems[self._size :]:
+            for key in keys(elem):
+                found = mapping.get(key)
+                if found is None:
+                    mapping[key] = [elem]
+                else:
+                    found.append(elem)
+        self._size = len(elems)
+
+    def get(self, elems: list, key: Any) -> list:
+        """Elements of `elems` indexed under `key`, in the order of `elems`"""
+        return list(self.lookup(elems, key))
+
+    def lookup(self, elems: list, key: Any) -> Sequence:
+        """`get` without copy, the sequence is the one held by the index, it grows
+        when elements are indexed and is replaced when the index is rebuilt"""
+        self._sync(elems)
+        return self._mapping.get(key, ())
+
+
+# Field indexed and keys of each element for the inverted indexes of YarrowDataset,
+# module functions so that the indexes can be pickled
+def _annotation_images(annot: "Annotation") -> Iterable[Image]:
+    return dict.fromkeys(annot.images)
+
+
+def _annotation_categories(annot: "Annotation") -> Iterable[Category]:
+    return dict.fromkeys(annot.categories)
+
+
+def _annotation_contributor(annot: "Annotation") -> Iterable[Contributor]:
+    return (annot.contributor,)
+
+
+def _image_split(image: Image) -> Iterable[str]:
+    return (image.split,)
+
+
+_INVERTED_INDEXES = {
+    "annotations_by_image": ("annotations", _annotation_images),
+    "annotations_by_category": ("annotations", _annotation_categories),
+    "annotations_by_contributor": ("annotations", _annotation_contributor),
+    "images_by_split": ("images", _image_split),
+}
+
+
+class BulkInsertResult(NamedTuple):
+    """Result of the `YarrowDataset.add_*_bulk` functions
+
+    Args:
+        elements (list): the elements of the dataset matching the inserted ones, \
+            in the order of the input
+        nb_new (int): number of elements that were not in the dataset
+        nb_merged (int): number of elements merged with an element of the dataset, \
+            including the duplicates inside the inserted batch
+    """
+
+    elements: list
+    nb_new: int
+    nb_merged: int
+
+
+class _SplitPart:
+    """Elements of one split of a dataset, see `YarrowDataset.partition_by_split`.
+
+    The images are copied once and the copied annotations and multilayer
+    images are linked to the copies, the categories, contributors and
+    clearances are shared with the source dataset like in `add_annotation`.
+    """
+
+    def __init__(self, info: Info, shallow: bool) -> None:
+        self.info = info
+        self.shallow = shallow
+        self.images = {}
+        self.annotations = []
+        self.multilayer_images = []
+        self.categories = {}
+        self.contributors = {}
+        self.confidential = {}
+
+    def image(self, image: Image) -> Image:
+        found = self.images.get(image)
+        if found is None:
+            found = self.images[image] = image if self.shallow else copy(image)
+            if image.confidential is not None:
+                self.confidential.setdefault(image.confidential, image.confidential)
+        return found
+
+    def annotation(self, annot: Annotation) -> None:
+        images = [self.image(img) for img in annot.images]
+        for cat in annot.categories:
+            self.categories.setdefault(cat, cat)
+        self.contributors.setdefault(annot.contributor, annot.contributor)
+        if not self.shallow:
+            annot = copy(annot)
+            annot._relink(images, list(annot.categories), annot.contributor)
+        self.annotations.append(annot)
+
+    def multilayer_image(self, multilayer: MultilayerImage) -> None:
+        images = [self.image(img) for img in multilayer.images]
+        if not self.shallow:
+            multilayer = copy(multilayer)
+            multilayer.images = images
+        self.multilayer_images.append(multilayer)
+
+    def dataset(self) -> "YarrowDataset":
+        return YarrowDataset(
+            info=self.info,
+            images=list(self.images.values()),
+            annotations=self.annotations,
+            contributors=list(self.contributors),
+            confidential=list(self.confidential),
+            categories=list(self.categories),
+            multilayer_images=self.multilayer_images,
+        )
+
+
 class YarrowDataset:
     def __init__(
         self,
@@ -418,6 +836,135 @@ class YarrowDataset:
         self.categories = categories or []
         self.multilayer_images = multilayer_images or []
 
+        self._indexes = {}
+
+    def _index(self, field: str) -> _ListIndex:
+        if not hasattr(self, "_indexes"):
+            self._indexes = {}
+        index = self._indexes.get(field)
+        if index is None:
+            index = self._indexes[field] = _ListIndex()
+        return index
+
+    def _get_or_add(self, field: str, elem: Any) -> Any:
+        return self._index(field).get_or_add(getattr(self, field), elem)
+
+    def _query(self, name: str, key: Any, view: bool = False) -> Sequence:
+        """Elements indexed under `key` in the inverted index `name`, see
+        `_INVERTED_INDEXES`, `view=True` returns the sequence of the index"""
+        if not hasattr(self, "_indexes"):
+            self._indexes = {}
+        field, keys = _INVERTED_INDEXES[name]
+        index = self._indexes.get(name)
+        if index is None:
+            index = self._indexes[name] = _InvertedIndex(keys)
+        if view:
+            return index.lookup(getattr(self, field), key)
+        return index.get(getattr(self, field), key)
+
+    def reindex(self) -> None:
+        """Rebuilds the dedup and query indexes on their next use, call it after
+        modifying the fields compared by `==` of an element of the dataset, ex:
+        the name or the images of an annotation or the file name of an image,
+        or the split of an image in place, see `annotations_for_image`"""
+        for index in getattr(self, "_indexes", {}).values():
+            if isinstance(index, (_ListIndex, _InvertedIndex)):
+                index.reset()
+        getattr(self, "_indexes", {}).pop("boxes_by_image", None)
+
+    def annotations_for_image(self, image: Image) -> List[Annotation]:
+        """Annotations linked to an image, found in an index of the dataset.
+
+        The query indexes are built on the first query and updated with the
+        elements added since then, by `add_*`, `append` or `extend`. Modifying
+        the links of an element in place is not tracked, call `reindex()` after.
+
+        Args:
+            image (Image): image of the dataset or an equal one
+
+        Returns:
+            List[Annotation]: the annotations in the order of `annotations`
+        """
+        return self._query("annotations_by_image", image)
+
+    def annotations_by_category(
+        self, category: Category, contributor: Contributor = None
+    ) -> List[Annotation]:
+        """Annotations of a category, see `annotations_for_image`
+
+        Args:
+            category (Category): category of the dataset or an equal one
+            contributor (Contributor, optional): only keep the annotations of this \
+                contributor. Defaults to None.
+
+        Returns:
+            List[Annotation]: the annotations in the order of `annotations`
+        """
+        result = self._query("annotations_by_category", category)
+        if contributor is None:
+            return result
+        # Filter the smaller of the two lists
+        by_contributor = self._query("annotations_by_contributor", contributor)
+        if len(by_contributor) < len(result):
+            return [annot for annot in by_contributor if category in annot.categories]
+        return [annot for annot in result if annot.contributor == contributor]
+
+    def annotations_by_contributor(self, contributor: Contributor) -> List[Annotation]:
+        """Annotations of a contributor, see `annotations_for_image`"""
+        return self._query("annotations_by_contributor", contributor)
+
+    def query_region(self, image: Image, box: List[float]) -> List[Annotation]:
+        """Annotations of an image whose bbox overlaps a region, found in a spatial
+        index of the boxes of the image, see `yarrow.spatial`.
+
+        The index of an image is built on its first query and rebuilt when
+        annotations are added to the image, call `reindex()` after modifying
+        bbox values in place.
+
+        Args:
+            image (Image): image of the dataset or an equal one
+            box (List[float]): region `[left, top, right, bottom]`, touching edges \
+                overlap
+
+        Returns:
+            List[Annotation]: the annotations in the order of `annotations`, the ones \
+                without bbox are never returned
+        """
+        annots = self._query("annotations_by_image", image, view=True)
+        boxes = self._indexes.setdefault("boxes_by_image", {})
+        found = boxes.get(image)
+        if found is None or found[0] is not annots or found[1] != len(annots):
+            found = boxes[image] = (
+                annots,
+                len(annots),
+                BoxIndex(annotation_boxes(annots)),
+            )
+        return [annots[row] for row in found[2].query(box).tolist()]
+
+    def find_duplicate_annotations(
+        self, iou_threshold: float = 0.9, distinct_contributors: bool = False
+    ) -> list:
+        """Pairs of annotations of the same category on the same image whose boxes
+        have an IoU of at least `iou_threshold`, see `yarrow.iou`
+
+        Args:
+            iou_threshold (float, optional): minimum IoU, in ]0, 1]. Defaults to 0.9.
+            distinct_contributors (bool, optional): only the pairs of annotations of \
+                two different contributors. Defaults to False.
+
+        Returns:
+            List[DuplicateAnnotations]: (first, second, iou) of each pair
+        """
+        # iou imports this module
+        from .iou import find_duplicate_annotations
+
+        return find_duplicate_annotations(self, iou_threshold, distinct_contributors)
+
+    def images_by_split(self, split: Optional[str]) -> List[Image]:
+        """Images of a split, None for the images without split, see
+        `annotations_for_image`"""
+        return self._query("images_by_split", split)
+
     def __eq__(self, other: "YarrowDataset"):
         if isinstance(other, YarrowDataset):
             return all(
@@ -463,27 +1010,17 @@ class YarrowDataset:
 
         out_cat = set(annot.categories)
         for cat in annot.categories:
-            elem_in = next((elem for elem in self.categories if elem == cat), None)
-            if elem_in is None:
-                self.categories.append(cat)
-            else:
+            elem_in = self._get_or_add("categories", cat)
+            if elem_in is not cat:
                 out_cat.remove(cat)
                 out_cat.add(elem_in)
         annot.categories = list(out_cat)
 
         assert isinstance(annot.contributor, Contributor)
-        elem_in = next(
-            (elem for elem in self.contributors if elem == annot.contributor), None
-        )
-        if elem_in is None:
-            self.contributors.append(annot.contributor)
-        else:
-            annot.contributor = elem_in
+        annot.contributor = self._get_or_add("contributors", annot.contributor)
 
-        elem_in = next((elem for elem in self.annotations if elem == annot), None)
-        if elem_in is None:
-            self.annotations.append(annot)
-        else:
+        elem_in = self._get_or_add("annotations", annot)
+        if elem_in is not annot:
             return elem_in
         return annot
 
@@ -518,21 +1055,109 @@ class YarrowDataset:
         """
         image = copy(image)
         if not image.confidential is None:
-            elem_in = next(
-                (elem for elem in self.confidential if elem == image.confidential), None
-            )
-            if elem_in is None:
-                self.confidential.append(image.confidential)
-            else:
-                image.confidential = elem_in
+            image.confidential = self._get_or_add("confidential", image.confidential)
 
-        elem_in = next((elem for elem in self.images if elem == image), None)
-        if elem_in is None:
-            self.images.append(image)
-        else:
+        elem_in = self._get_or_add("images", image)
+        if elem_in is not image:
             return elem_in
         return image
 
+    def add_images_bulk(
+        self, images: List[Image], in_place: bool = False
+    ) -> BulkInsertResult:
+        """Adds a batch of images and their confidential objects, the whole batch
+        is deduplicated against the dataset, equal images of the batch are added
+        once.
+
+        Args:
+            images (List[Image]): images to add
+            in_place (bool, optional): add the given images themselves instead of \
+                copies, their `confidential` is replaced by the one of the dataset. \
+                Defaults to False.
+
+        Returns:
+            BulkInsertResult: the images of the dataset in the order of `images` and \
+                the number of new and merged images
+        """
+        index = self._index("images")
+        confidential = {}
+        result = []
+        nb_new = 0
+        for image in images:
+            found = index.get(self.images, image)
+            if found is None:
+                if not in_place:
+                    image = copy(image)
+                if image.confidential is not None:
+                    conf = confidential.get(image.confidential)
+                    if conf is None:
+                        conf = confidential[image.confidential] = self._get_or_add(
+                            "confidential", image.confidential
+                        )
+                    image.confidential = conf
+                index.add(self.images, image)
+                found = image
+                nb_new += 1
+            result.append(found)
+        return BulkInsertResult(result, nb_new, len(result) - nb_new)
+
+    def add_annotations_bulk(
+        self, annots: List[Annotation], in_place: bool = False
+    ) -> BulkInsertResult:
+        """Adds a batch of annotations with their images, categories and contributors.
+
+        The images, categories and contributors of the whole batch are deduplicated
+        once against the dataset, then each annotation is looked up in the dataset
+        and added if it is new. Like `add_annotation`, the images do not need to be
+        added afterwards.
+
+        Args:
+            annots (List[Annotation]): annotations to add
+            in_place (bool, optional): add the given annotations and images \
+                themselves instead of copies, their links are replaced by the \
+                elements of the dataset. Defaults to False.
+
+        Returns:
+            BulkInsertResult: the annotations of the dataset in the order of `annots` \
+                and the number of new and merged annotations
+        """
+        # Each distinct image, category and contributor of the batch is mapped to
+        # the equal element of the dataset, added if missing
+        batch_images = list({img: None for annot in annots for img in annot.images})
+        images = dict(
+            zip(batch_images, self.add_images_bulk(batch_images, in_place).elements)
+        )
+        categories = {}
+        contributors = {}
+        for annot in annots:
+            for cat in annot.categories:
+                if cat not in categories:
+                    categories[cat] = self._get_or_add("categories", cat)
+            assert isinstance(annot.contributor, Contributor)
+            if annot.contributor not in contributors:
+                contributors[annot.contributor] = self._get_or_add(
+                    "contributors", annot.contributor
+                )
+
+        index = self._index("annotations")
+        result = []
+        nb_new = 0
+        for annot in annots:
+            found = index.get(self.annotations, annot)
+            if found is None:
+                if not in_place:
+                    annot = copy(annot)
+                annot._relink(
+                    [images[img] for img in annot.images],
+                    list(dict.fromkeys(categories[cat] for cat in annot.categories)),
+                    contributors[annot.contributor],
+                )
+                index.add(self.annotations, annot)
+                found = annot
+                nb_new += 1
+            result.append(found)
+        return BulkInsertResult(result, nb_new, len(result) - nb_new)
+
     def add_multilayer_image(self, multilayer: MultilayerImage) -> MultilayerImage:
         """Add a multilayer image object, the returned multilayer object will be
         the one in the current YarrowDataset and the original will remain unchanged
@@ -546,12 +1171,8 @@ class YarrowDataset:
         multilayer = copy(multilayer)
         multilayer.images = self.add_images(multilayer.images)
 
-        elem_in = next(
-            (elem for elem in self.multilayer_images if elem == multilayer), None
-        )
-        if elem_in is None:
-            self.multilayer_images.append(multilayer)
-        else:
+        elem_in = self._get_or_add("multilayer_images", multilayer)
+        if elem_in is not multilayer:
             return elem_in
         return multilayer
 
@@ -582,9 +1203,9 @@ class YarrowDataset:
 
         Args:
             img_id (str, optional): If supplied, this id will be given to all images in \
-                the dataset and reinstantiate their pydantic objects. Defaults to None.
-            reset (bool, optional): If supplied, it will reset all the cached pydantic \
-                classes. Defaults to False
+                the dataset. Defaults to None.
+            reset (bool, optional): If supplied, new ids are generated for all the \
+                annotations. Defaults to False
 
         Returns:
             YarrowDataset_pydantic
@@ -592,7 +1213,7 @@ class YarrowDataset:
 
         return YarrowDataset_pydantic(
             info=self.info,
-            images=[img.pydantic(img_id, bool(img_id)) for img in self.images],
+            images=[img.pydantic(img_id) for img in self.images],
             annotations=[annot.pydantic(reset=reset) for annot in self.annotations]
             if len(self.annotations) > 0
             else None,
@@ -617,12 +1238,41 @@ class YarrowDataset:
             image.split = split
         for multilayer in self.multilayer_images:
             multilayer.split = split
+        index = getattr(self, "_indexes", {}).get("images_by_split")
+        if index is not None:
+            index.reset()
+
+    def assign_splits(
+        self, ratios: Dict[str, float] = None, seed: str = "", stratify: bool = False
+    ) -> Dict[str, int]:
+        """Assigns a split to each image and multilayer image from a hash of their
+        file names, the images keep their split when the dataset grows, see `yarrow.splits`
+
+        Args:
+            ratios (Dict[str, float], optional): relative size of each split. \
+                Defaults to {"train": 0.8, "validate": 0.1, "test": 0.1}.
+            seed (str, optional): another seed gives another assignment. Defaults to "".
+            stratify (bool, optional): keep the exact ratios for each category, the \
+                splits are not stable anymore when the dataset changes. Defaults to False.
+
+        Returns:
+            Dict[str, int]: number of images of each split
+        """
+        # splits imports this module
+        from .splits import assign_splits
+
+        counts = assign_splits(self, ratios, seed=seed, stratify=stratify)
+        index = getattr(self, "_indexes", {}).get("images_by_split")
+        if index is not None:
+            index.reset()
+        return counts
 
     def get_split(self, split: str) -> "YarrowDataset":
-        """Returns a new dataset based on a `split` value. 
-        
-        The returned YarrowDataset will copy all the internal elements,\
-        meaning modifications on the new YarrowDataset won't impact the original YarrowDataset
+        """Returns a new dataset based on a `split` value, see `partition_by_split`.
+
+        The returned YarrowDataset will copy the images, annotations and multilayer \
+        images, meaning modifications on the new YarrowDataset won't impact the \
+        original YarrowDataset
 
         Args:
             split (str): The split to retrieve
@@ -630,18 +1280,53 @@ class YarrowDataset:
         Returns:
             YarrowDataset: A copy of the current dataset containing only the elements linked to a given split value
         """
-        new_yarrow_set = YarrowDataset(info=self.info)
+        partition = self._partition({split}, shallow=False)
+        return partition.get(split) or YarrowDataset(info=self.info)
+
+    def partition_by_split(self, shallow: bool = False) -> Dict[str, "YarrowDataset"]:
+        """Splits the dataset by split value in one pass over its elements.
+
+        An image goes to the dataset of its split, including the images without
+        annotations, an annotation to the one of its first image and a
+        multilayer image to the one of its own split. The images of an
+        annotation or multilayer image are also added to its dataset when their
+        split differs. Only the categories, contributors and clearances used by
+        the elements of a dataset are in it.
+
+        Args:
+            shallow (bool, optional): the datasets hold the elements of this dataset \
+                instead of copies, modifying them modifies this dataset. Defaults to False.
+
+        Returns:
+            Dict[str, YarrowDataset]: a dataset per split value, the images without \
+                split are under None
+        """
+        return self._partition(None, shallow)
+
+    def _partition(self, splits: set, shallow: bool) -> Dict[str, "YarrowDataset"]:
+        """`partition_by_split` restricted to `splits`, all the splits if None"""
+        parts = {}
+
+        def part(split: str) -> _SplitPart:
+            found = parts.get(split)
+            if found is None:
+                found = parts[split] = _SplitPart(self.info, shallow)
+            return found
+
+        for image in self.images:
+            if splits is None or image.split in splits:
+                part(image.split).image(image)
 
         for annot in self.annotations:
-            # Very strong assumption that all images of the annotation have the same value for split
-            if len(annot.images) > 0 and annot.images[0].split == split:
-                new_yarrow_set.add_annotation(annot)
+            split = annot.images[0].split if annot.images else None
+            if splits is None or split in splits:
+                part(split).annotation(annot)
 
-        for multi in self.multilayer_images:
-            if multi.split == split:
-                new_yarrow_set.add_multilayer_image(multi)
+        for multilayer in self.multilayer_images:
+            if splits is None or multilayer.split in splits:
+                part(multilayer.split).multilayer_image(multilayer)
 
-        return new_yarrow_set
+        return {split: found.dataset() for split, found in parts.items()}
 
     def append(self, yarrow: "YarrowDataset") -> None:
         """Appends another YarrowDataset to this dataset. The resulting dataset is this object.
@@ -650,31 +1335,71 @@ class YarrowDataset:
         Args:
             yarrow (YarrowDataset): Input Yarrow to be merge
         """
-        self.add_annotations(yarrow.annotations)
-        self.add_multilayer_images(yarrow.multilayer_images)
-        self.add_images(yarrow.images)
-
-        for cat in yarrow.categories:
-            if cat not in self.categories:
-                self.categories.append(cat)
+        self.extend([yarrow])
 
-    def extend(self, yarrows: List["YarrowDataset"]) -> None:
+    def extend(self, yarrows: Iterable["YarrowDataset"]) -> None:
         """Extends a YarrowDataset with a list of YarrowDatasets
 
+        All the inputs are merged at once, the elements of every input are
+        deduplicated in a single pass against the indexes of this dataset, the
+        time is linear in the total number of elements.
+
         Args:
-            yarrows (List[YarrowDataset]): List of YarrowDatasets, they will remain unchanged
+            yarrows (Iterable[YarrowDataset]): List of YarrowDatasets, they will remain unchanged
         """
+        yarrows = list(yarrows)
+        self.add_annotations_bulk(
+            [annot for yarrow in yarrows for annot in yarrow.annotations]
+        )
+        self.add_multilayer_images(
+            [multi for yarrow in yarrows for multi in yarrow.multilayer_images]
+        )
+        self.add_images_bulk([img for yarrow in yarrows for img in yarrow.images])
+
         for yarrow in yarrows:
-            self.append(yarrow)
+            for cat in yarrow.categories:
+                self._get_or_add("categories", cat)
+
+    @classmethod
+    def merge_files(
+        cls,
+        paths: Iterable[Union[str, os.PathLike]],
+        info: Info = None,
+        workers: int = None,
+        validate: bool = True,
+    ) -> "YarrowDataset":
+        """Parses yarrow files and merges them in a single dataset, see `extend`
+
+        Args:
+            paths (Iterable[Union[str, os.PathLike]]): yarrow files, JSON, compressed or binary
+            info (Info, optional): info of the merged dataset. Defaults to the info \
+                of the first file.
+            workers (int, optional): number of processes parsing the files, the \
+                files are parsed in this process if None or 1, see `yarrow.load_many`. \
+                Defaults to None.
+            validate (bool, optional): see `parse_file`. Defaults to True.
+
+        Returns:
+            YarrowDataset: the merged dataset
+        """
+        # load imports this module
+        from .load import load_many
+
+        return load_many(paths, workers=workers or 1, info=info, validate=validate)
 
     @classmethod
-    def from_yarrow(cls, yarrow: YarrowDataset_pydantic) -> "YarrowDataset":
+    def from_yarrow(
+        cls, yarrow: YarrowDataset_pydantic, slots: bool = False
+    ) -> "YarrowDataset":
         """Constructor to transform a `YarrowDataset_pydantic` and replace all id links \
         with direct object references. Be careful when using directly, it is better \
         to use `parse_*()` functions and not this one directly.
 
         Args:
             yarrow (YarrowDataset_pydantic): _description_
+            slots (bool, optional): builds `SlottedImage`, `SlottedAnnotation` and \
+                `SlottedMultilayerImage` objects, more compact in memory but they \
+                cannot hold other attributes. Defaults to False.
 
         Raises:
             TypeError: If the input is not of correct type.
@@ -687,6 +1412,11 @@ class YarrowDataset:
         """
         if not isinstance(yarrow, YarrowDataset_pydantic):
             raise TypeError("input is not appropriate type %s", yarrow)
+        if slots:
+            image_cls, annot_cls = SlottedImage, SlottedAnnotation
+            multilayer_cls = SlottedMultilayerImage
+        else:
+            image_cls, annot_cls, multilayer_cls = Image, Annotation, MultilayerImage
         cat_list = [] if yarrow.categories is None else yarrow.categories.copy()
         conf_list = [] if yarrow.confidential is None else yarrow.confidential.copy()
         contrib_list = [] if yarrow.contributors is None else yarrow.contributors.copy()
@@ -697,22 +1427,21 @@ class YarrowDataset:
             [] if yarrow.multilayer_images is None else yarrow.multilayer_images.copy()
         )
 
-        # img_list = []
+        # id -> object maps, the first object wins when ids are duplicated
+        conf_id_dict = _first_by_id(conf_list)
+        contrib_id_dict = _first_by_id(contrib_list)
+        cat_id_dict = _first_by_id(cat_list)
+
         img_id_dict = {}
         for img in yarrow.images:
             img_param = img.dict()
 
             # Get confidential from its id
-            conf = next(
-                (conf for conf in conf_list if conf.id == img.confidential_id),
-                None,
-            )
-
-            img_param["confidential"] = conf
+            img_param["confidential"] = conf_id_dict.get(img.confidential_id)
 
             if not img.id in img_id_dict.keys():
                 img_id_dict[img.id] = []
-            img_id_dict[img.id].append(Image(**img_param))
+            img_id_dict[img.id].append(image_cls(**img_param))
 
         # multilayer_image
         multilayer_list = []
@@ -722,7 +1451,7 @@ class YarrowDataset:
                 multi_img.extend(img_id_dict[multi_img_id])
 
             multilayer_list.append(
-                MultilayerImage(
+                multilayer_cls(
                     images=multi_img,
                     name=multilayer.name,
                     meta=multilayer.meta,
@@ -735,10 +1464,7 @@ class YarrowDataset:
             annot_param = annot.dict(exclude_unset=True)
 
             # Get contributor from its id
-            contr = next(
-                (contr for contr in contrib_list if contr.id == annot.contributor_id),
-                None,
-            )
+            contr = contrib_id_dict.get(annot.contributor_id)
             if contr is None:
                 raise ValueError(
                     "could not find the contributor matching object, invalid yarrow"
@@ -763,12 +1489,12 @@ class YarrowDataset:
 
             annot_param["categories"] = []
             for cat_id in cat_id_set:
-                cat_cls = next((cat for cat in cat_list if cat.id == cat_id), None)
+                cat_cls = cat_id_dict.get(cat_id)
                 if cat_cls is None:
                     raise ValueError("Could not find category matching object")
                 annot_param["categories"].append(cat_cls)
 
-            annot_list.append(Annotation(**annot_param))
+            annot_list.append(annot_cls(**annot_param))
 
         img_list = []
         for img_values in img_id_dict.values():
@@ -785,13 +1511,61 @@ class YarrowDataset:
         )
 
     @classmethod
-    def parse_file(cls, path, **kwargs) -> "YarrowDataset":
-        return cls.from_yarrow(YarrowDataset_pydantic.parse_file(path, **kwargs))
+    async def aparse(
+        cls, path_or_stream, source=None, validate: bool = True, name: str = None
+    ) -> "YarrowDataset":
+        """Reads and parses a yarrow file without blocking the event loop, the path is
+        read through `source`, a local file by default, see `yarrow.aio`
+
+        >>> yar_dataset = await YarrowDataset.aparse("path/to/file.yarrow.json")
+        """
+        # aio imports this module
+        from .aio import aparse
+
+        return await aparse(path_or_stream, source=source, validate=validate, name=name)
 
     @classmethod
-    def parse_obj(cls, obj: dict, **kwargs) -> "YarrowDataset":
-        return cls.from_yarrow(YarrowDataset_pydantic.parse_obj(obj))
+    def from_binary(cls, path: str, slots: bool = False) -> "YarrowDataset":
+        """Loads a dataset saved in the columnar binary format, see `yarrow.binary`
+        and `from_yarrow` for `slots`"""
+        return cls.from_yarrow(YarrowDataset_pydantic.from_binary(path), slots=slots)
+
+    def to_binary(self, path: str, compress: bool = False) -> None:
+        """Saves the dataset in the columnar binary format, see `yarrow.binary`
+
+        Args:
+            path (str): file path, by convention ending with .yarrow.npz
+            compress (bool, optional): deflate the arrays. Defaults to False.
+        """
+        self.pydantic().to_binary(path, compress=compress)
 
     @classmethod
-    def parse_raw(cls, raw: StrBytes, **kwargs) -> "YarrowDataset":
-        return cls.from_yarrow(YarrowDataset_pydantic.parse_raw(raw, **kwargs))
+    def parse_file(
+        cls, path, validate: bool = True, slots: bool = False, **kwargs
+    ) -> "YarrowDataset":
+        """Parses a yarrow file, pass `validate=False` to skip the pydantic validation
+        of files you produced yourself, see `YarrowDataset_pydantic.construct_trusted`.
+        Files parsed with `cache_dir="path/to/cache"` are loaded from a binary snapshot
+        the next times, see `yarrow.cache`. Pass `slots=True` to build the compact
+        `Slotted*` classes, see `from_yarrow`"""
+        return cls.from_yarrow(
+            YarrowDataset_pydantic.parse_file(path, validate=validate, **kwargs),
+            slots=slots,
+        )
+
+    @classmethod
+    def parse_obj(
+        cls, obj: dict, validate: bool = True, slots: bool = False, **kwargs
+    ) -> "YarrowDataset":
+        return cls.from_yarrow(
+            YarrowDataset_pydantic.parse_obj(obj, validate=validate), slots=slots
+        )
+
+    @classmethod
+    def parse_raw(
+        cls, raw: StrBytes, validate: bool = True, slots: bool = False, **kwargs
+    ) -> "YarrowDataset":
+        return cls.from_yarrow(
+            YarrowDataset_pydantic.parse_raw(raw, validate=validate, **kwargs),
+            slots=slots,
+        )
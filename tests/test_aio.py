@@ -0,0 +1,110 @@
+import asyncio
+import threading
+
+import pytest
+
+from yarrow import *
+
+
+class MemorySource(ByteSource):
+    """In memory storage counting the concurrent reads"""
+
+    def __init__(self, files: dict) -> None:
+        self.files = files
+        self.running = 0
+        self.max_running = 0
+
+    async def read(self, path: str) -> bytes:
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        return self.files[path]
+
+
+def run(coroutine):
+    """`asyncio.run` is not available on python 3.6"""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+@pytest.fixture
+def directory(tmp_path):
+    rand_dataset().save_to_file(tmp_path / "first.yarrow.json")
+    rand_dataset().save_to_file(tmp_path / "second.yarrow.json.gz")
+    rand_dataset().to_binary(tmp_path / "third.yarrow.npz")
+    return tmp_path
+
+
+def test_aparse(directory):
+    file_path = directory / "second.yarrow.json.gz"
+
+    yar_path = run(YarrowDataset.aparse(file_path))
+    with open(file_path, "rb") as fp:
+        yar_stream = run(YarrowDataset.aparse(fp))
+    yar_source = run(
+        YarrowDataset.aparse("second.yarrow.json.gz", source=LocalSource(directory))
+    )
+
+    yar_expected = YarrowDataset.parse_file(file_path)
+    assert yar_path == yar_expected
+    assert yar_stream == yar_expected
+    assert yar_source == yar_expected
+
+
+def test_aload_many_local(directory):
+    source = LocalSource(directory)
+    paths = ["first.yarrow.json", "second.yarrow.json.gz", "third.yarrow.npz"]
+
+    yar_loaded = run(aload_many(paths, source=source))
+
+    assert yar_loaded == load_many([directory / path for path in paths], workers=1)
+
+
+def test_aload_many_source(directory):
+    files = {}
+    for idx in range(10):
+        file_path = directory / "{}.yarrow.json".format(idx)
+        rand_dataset().save_to_file(file_path)
+        files[file_path.name] = file_path.read_bytes()
+    source = MemorySource(files)
+
+    yar_loaded = run(aload_many(sorted(files), source=source, concurrency=3))
+
+    assert source.max_running == 3
+    assert yar_loaded == load_many(
+        [directory / name for name in sorted(files)], workers=1
+    )
+
+    with pytest.raises(ValueError):
+        run(aload_many([], source=source))
+
+
+def test_aload_many_merge_off_loop(directory, monkeypatch):
+    source = LocalSource(directory)
+    threads = []
+    extend = YarrowDataset.extend
+
+    def recording_extend(self, *args, **kwargs):
+        threads.append(threading.get_ident())
+        return extend(self, *args, **kwargs)
+
+    monkeypatch.setattr(YarrowDataset, "extend", recording_extend)
+    yar_loaded = run(aload_many(["first.yarrow.json"], source=source))
+
+    assert len(yar_loaded.images) > 0
+    assert threads and threading.get_ident() not in threads
+
+    info = yar_loaded.info
+    assert run(aload_many([], source=source, info=info)).info == info
+
+
+def test_byte_source_abstract():
+    class NoReadSource(ByteSource):
+        pass
+
+    with pytest.raises(TypeError):
+        NoReadSource()
@@ -40,3 +40,46 @@ def test_append_empty(yar_dataset: YarrowDataset):
     yar_empty.append(yar_dataset)
 
     assert yar_dataset == yar_empty
+
+
+def test_extend_matches_append():
+    yarrows = [YarrowDataset.from_yarrow(rand_dataset()) for _ in range(3)]
+    # Annotations shared between two inputs are merged
+    yarrows.append(deepcopy(yarrows[0]))
+
+    yar_append = YarrowDataset(info=yarrows[0].info)
+    for yarrow in yarrows:
+        yar_append.append(yarrow)
+    yar_extend = YarrowDataset(info=yarrows[0].info)
+    yar_extend.extend(iter(yarrows))
+
+    assert yar_extend == yar_append
+    assert len(yar_extend.annotations) == sum(
+        len(yarrow.annotations) for yarrow in yarrows[:3]
+    )
+    for annot in yar_extend.annotations:
+        assert all(
+            any(img is dataset_img for dataset_img in yar_extend.images)
+            for img in annot.images
+        )
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_merge_files(tmp_path, workers):
+    yarrows_pydantic = [rand_dataset() for _ in range(3)]
+    paths = []
+    for idx, yarrow in enumerate(yarrows_pydantic):
+        paths.append(tmp_path / "{}.yarrow.json".format(idx))
+        yarrow.save_to_file(paths[-1])
+    paths.append(tmp_path / "binary.yarrow.npz")
+    yarrows_pydantic[0].to_binary(paths[-1])
+
+    yar_merged = YarrowDataset.merge_files(paths, workers=workers)
+
+    yar_expected = YarrowDataset(info=yarrows_pydantic[0].info)
+    yar_expected.extend(YarrowDataset.from_yarrow(yar) for yar in yarrows_pydantic)
+    assert yar_merged == yar_expected
+    assert yar_merged.info == yarrows_pydantic[0].info
+
+    with pytest.raises(ValueError):
+        YarrowDataset.merge_files([])
@@ -0,0 +1,156 @@
+import json
+import warnings
+import zipfile
+from datetime import timedelta, timezone
+
+import numpy as np
+import pytest
+from click.testing import CliRunner
+
+from yarrow import *
+from yarrow.binary import BinaryFile, from_binary, to_binary
+
+
+@pytest.fixture
+def yar_dataset_pydantic():
+    yar_dataset = rand_dataset()
+
+    yar_dataset.images[0].layers = [Layer(frame_id=1, name="layer")]
+    yar_dataset.images[1].meta = {"key": ["value", 1]}
+    yar_dataset.images[2].date_captured = datetime(
+        2022, 1, 2, 3, 4, 5, 6, tzinfo=timezone(timedelta(hours=2))
+    )
+    yar_dataset.images[3].split = "train"
+
+    yar_dataset.annotations[0].mask = RLE(counts=[2, 3, 4], size=[3, 3])
+    yar_dataset.annotations[1].polygon = [[0.1, 0.2], [0.3, 0.4], [0.5, 0.6]]
+    yar_dataset.annotations[2].image_id = [img.id for img in yar_dataset.images[:3]]
+    yar_dataset.annotations[3].bbox = None
+    yar_dataset.annotations[4].weight = 0.5
+    yar_dataset.annotations[5].name = "é ünïcode"
+
+    yar_dataset.categories[0].keypoints = ["head", "tail"]
+    yar_dataset.categories[0].skeleton = [Edge(start_idx=0, end_idx=1)]
+    return yar_dataset
+
+
+def test_round_trip(tmp_path, yar_dataset_pydantic: YarrowDataset_pydantic):
+    file_path = tmp_path / "dataset.yarrow.npz"
+    to_binary(yar_dataset_pydantic, file_path)
+
+    yar_binary = from_binary(file_path)
+
+    assert yar_binary.dict(exclude_none=True) == yar_dataset_pydantic.dict(
+        exclude_none=True
+    )
+    assert yar_binary.images == yar_dataset_pydantic.images
+    assert yar_binary.annotations == yar_dataset_pydantic.annotations
+    assert isinstance(yar_binary.images[0].layers[0], Layer)
+    assert isinstance(yar_binary.annotations[0].mask, RLE)
+    assert (
+        yar_binary.annotations[2].image_id
+        == yar_dataset_pydantic.annotations[2].image_id
+    )
+    assert yar_binary.annotations[3].bbox is None
+    assert "bbox" in yar_binary.annotations[3].__fields_set__
+    assert (
+        yar_binary.images[2].date_captured
+        == yar_dataset_pydantic.images[2].date_captured
+    )
+    assert yar_binary.images[2].date_captured.utcoffset() == timedelta(hours=2)
+
+    binary = BinaryFile(file_path)
+    assert binary.length("annotations") == len(yar_dataset_pydantic.annotations)
+    assert binary.kind("annotations", "bbox") == "vector"
+    assert binary.column_arrays("annotations", "bbox")[""].shape == (
+        len(yar_dataset_pydantic.annotations),
+        4,
+    )
+
+
+def test_round_trip_fields_set(tmp_path, yar_dataset_pydantic: YarrowDataset_pydantic):
+    raw = json.loads(yar_dataset_pydantic.json(exclude_none=True))
+    for annot in raw["annotations"]:
+        annot.pop("is_crowd", None)
+    raw["annotations"][0]["comment"] = None
+    yar_dataset = YarrowDataset_pydantic.parse_obj(raw)
+    file_path = tmp_path / "dataset.yarrow.npz"
+    to_binary(yar_dataset, file_path)
+
+    yar_binary = from_binary(file_path)
+
+    assert yar_binary.dict(exclude_unset=True) == yar_dataset.dict(exclude_unset=True)
+    assert "is_crowd" not in yar_binary.annotations[1].__fields_set__
+    assert yar_binary.annotations[1].is_crowd == 0
+    assert "comment" in yar_binary.annotations[0].__fields_set__
+
+
+def test_empty_sections_and_compress(tmp_path):
+    yar_dataset = rand_dataset(annotations=[], multilayer_images=[])
+    yar_dataset.categories = None
+    file_path = tmp_path / "dataset.yarrow.npz"
+
+    yar_dataset.to_binary(file_path, compress=True)
+    with zipfile.ZipFile(file_path) as archive:
+        assert archive.getinfo("images/width.npy").compress_type == zipfile.ZIP_DEFLATED
+
+    yar_binary = YarrowDataset_pydantic.from_binary(file_path)
+    assert yar_binary.annotations == []
+    assert yar_binary.categories is None
+    assert yar_binary.images == yar_dataset.images
+
+
+def test_yarrow_dataset_binary(tmp_path, yar_dataset_pydantic: YarrowDataset_pydantic):
+    file_path = tmp_path / "dataset.yarrow.npz"
+    yar_dataset = YarrowDataset.from_yarrow(yar_dataset_pydantic)
+
+    yar_dataset.to_binary(file_path)
+
+    assert YarrowDataset.from_binary(file_path) == yar_dataset
+
+
+def test_yarrow_dataset_binary_fields_set(
+    tmp_path, yar_dataset_pydantic: YarrowDataset_pydantic
+):
+    raw = json.loads(yar_dataset_pydantic.json(exclude_none=True))
+    for annot in raw["annotations"]:
+        annot.pop("is_crowd", None)
+    yar_dataset = YarrowDataset.parse_obj(raw)
+    file_path = tmp_path / "dataset.yarrow.npz"
+    yar_dataset.to_binary(file_path)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", DeprecationWarning)
+        yar_binary = YarrowDataset.from_binary(file_path)
+
+    assert yar_binary == yar_dataset
+    assert yar_binary.pydantic().dict(
+        exclude_unset=True
+    ) == yar_dataset.pydantic().dict(exclude_unset=True)
+
+
+def test_invalid_file(tmp_path):
+    file_path = tmp_path / "other.npz"
+    np.savez(file_path, array=np.zeros(3))
+
+    with pytest.raises(ValueError):
+        from_binary(file_path)
+
+
+def test_cli_convert(tmp_path, yar_dataset_pydantic: YarrowDataset_pydantic):
+    json_path = str(tmp_path / "dataset.yarrow.json")
+    binary_path = str(tmp_path / "dataset.yarrow.npz")
+    json_path2 = str(tmp_path / "dataset2.yarrow.json.gz")
+    yar_dataset_pydantic.save_to_file(json_path)
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ["convert", "-f", json_path, "--output", binary_path])
+    assert result.exit_code == 0
+    result = runner.invoke(cli, ["convert", "-f", binary_path, "--output", json_path2])
+    assert result.exit_code == 0
+
+    yar_converted = YarrowDataset_pydantic.parse_file(json_path2)
+    assert yar_converted.annotations == yar_dataset_pydantic.annotations
+
+    result = runner.invoke(cli, ["convert", "-f", json_path])
+    assert result.exit_code == 104
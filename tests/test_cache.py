@@ -0,0 +1,110 @@
+import json
+import os
+
+import pytest
+
+from yarrow import *
+from yarrow.cache import CACHE_EXTENSION, cache_key, cached_parse, evict
+
+
+@pytest.fixture
+def file_path(tmp_path):
+    path = tmp_path / "dataset.yarrow.json.gz"
+    rand_dataset().save_to_file(path)
+    return path
+
+
+def _snapshots(cache_dir):
+    return sorted(
+        name for name in os.listdir(cache_dir) if name.endswith(CACHE_EXTENSION)
+    )
+
+
+def test_parse_file_cache(tmp_path, file_path):
+    cache_dir = tmp_path / "cache"
+
+    yar_expected = YarrowDataset.parse_file(file_path)
+    yar_miss = YarrowDataset.parse_file(file_path, cache_dir=cache_dir)
+    assert _snapshots(cache_dir) == [cache_key(file_path)]
+
+    yar_hit = YarrowDataset.parse_file(file_path, cache_dir=cache_dir)
+    assert yar_miss == yar_expected
+    assert yar_hit == yar_expected
+
+    # validated and trusted parses have their own snapshot
+    YarrowDataset.parse_file(file_path, validate=False, cache_dir=cache_dir)
+    assert len(_snapshots(cache_dir)) == 2
+
+
+def test_cached_parse_hit(tmp_path, file_path):
+    calls = []
+
+    def parse():
+        calls.append(1)
+        return YarrowDataset_pydantic.parse_file(file_path)
+
+    cached_parse(file_path, parse, tmp_path / "cache")
+    yar_hit = cached_parse(file_path, parse, tmp_path / "cache")
+    assert len(calls) == 1
+    assert yar_hit.images == YarrowDataset_pydantic.parse_file(file_path).images
+
+    # a modified file is parsed again
+    rand_dataset().save_to_file(file_path)
+    os.utime(file_path, ns=(0, os.stat(file_path).st_mtime_ns + 10**9))
+    cached_parse(file_path, parse, tmp_path / "cache")
+    assert len(calls) == 2
+
+
+@pytest.mark.parametrize("validate", [True, False])
+def test_cached_parse_fields_set(tmp_path, validate):
+    raw = json.loads(rand_dataset().json(exclude_none=True))
+    for annot in raw["annotations"]:
+        del annot["is_crowd"]
+    path = tmp_path / "dataset.yarrow.json"
+    path.write_text(json.dumps(raw))
+    cache_dir = tmp_path / "cache"
+
+    yar_parsed = YarrowDataset_pydantic.parse_file(path, validate=validate)
+    YarrowDataset_pydantic.parse_file(path, validate=validate, cache_dir=cache_dir)
+    yar_cached = YarrowDataset_pydantic.parse_file(
+        path, validate=validate, cache_dir=cache_dir
+    )
+
+    assert yar_cached.dict(exclude_unset=True) == yar_parsed.dict(exclude_unset=True)
+
+
+def test_cached_parse_corrupted(tmp_path, file_path):
+    cache_dir = tmp_path / "cache"
+    YarrowDataset_pydantic.parse_file(file_path, cache_dir=cache_dir)
+    snapshot = cache_dir / cache_key(file_path)
+    snapshot.write_bytes(b"not a zip file")
+
+    yar_parsed = YarrowDataset_pydantic.parse_file(file_path, cache_dir=cache_dir)
+    assert yar_parsed.images == YarrowDataset_pydantic.parse_file(file_path).images
+    assert snapshot.stat().st_size > len(b"not a zip file")
+
+
+def test_evict(tmp_path):
+    cache_dir = tmp_path / "cache"
+    paths = []
+    for idx in range(4):
+        path = tmp_path / "{}.yarrow.json".format(idx)
+        rand_dataset().save_to_file(path)
+        YarrowDataset_pydantic.parse_file(path, cache_dir=cache_dir)
+        snapshot = cache_dir / cache_key(path)
+        os.utime(snapshot, (idx, idx))
+        paths.append(path)
+    (cache_dir / "other.txt").write_text("not a snapshot")
+
+    # the first file is used again, the second one is the least recently used
+    YarrowDataset_pydantic.parse_file(paths[0], cache_dir=cache_dir)
+    sizes = {name: (cache_dir / name).stat().st_size for name in _snapshots(cache_dir)}
+    evict(cache_dir, max_size=sum(sizes.values()) - 1)
+
+    assert _snapshots(cache_dir) == sorted(
+        cache_key(path) for path in paths if path != paths[1]
+    )
+    assert (cache_dir / "other.txt").exists()
+
+    evict(cache_dir, max_size=0)
+    assert _snapshots(cache_dir) == []
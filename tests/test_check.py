@@ -1,4 +1,4 @@
-from yarrow import rand_dataset
+from yarrow import Category, rand_dataset
 from yarrow.cli import check_default
 
 
@@ -8,3 +8,57 @@ def test_check_valid_ids():
     expected_res = {"result": True, "detail": []}
 
     assert expected_res == check_default(yar_example)
+
+
+def test_check_list_references():
+    yar_example = rand_dataset()
+    images = yar_example.images
+    yar_example.annotations[0].image_id = [img.id for img in images[:3]]
+    yar_example.annotations[1].category_id = [
+        cat.id for cat in yar_example.categories[:2]
+    ]
+
+    end_res, results = yar_example._check_valid_ids()
+
+    assert end_res
+    assert all(res["error"].startswith("warning") for res in results)
+
+
+def test_check_missing_references():
+    yar_example = rand_dataset()
+    annotations = yar_example.annotations
+    annotations[0].image_id = [yar_example.images[0].id, "missing-0"]
+    for annot in annotations[1:5]:
+        annot.image_id = "missing-1"
+    annotations[5].category_id = "missing-category"
+
+    end_res, results = yar_example._check_valid_ids(max_samples=2)
+    reports = {res["key"]: res for res in results if "warning" not in res["error"]}
+
+    assert not end_res
+    assert set(reports) == {"image_id", "category_id"}
+    assert reports["image_id"]["count"] == 5
+    assert reports["image_id"]["samples"] == [
+        {"annot_id": annotations[0].id, "image_id": ["missing-0"]},
+        {"annot_id": annotations[1].id, "image_id": "missing-1"},
+    ]
+    assert reports["category_id"]["count"] == 1
+    assert reports["category_id"]["samples"] == [
+        {"annot_id": annotations[5].id, "category_id": "missing-category"}
+    ]
+
+
+def test_check_unused():
+    yar_example = rand_dataset()
+    yar_example.categories.append(Category(name="unused", super_category="unused"))
+    yar_example.categories.append(Category(name="unused2", super_category="unused"))
+
+    end_res, results = yar_example._check_valid_ids()
+    unused = [res for res in results if res["key"] == "category_id"]
+
+    assert end_res
+    assert len(unused) == 1
+    assert unused[0]["error"] == "warning, unused category"
+    assert unused[0]["samples"] == [
+        {"category_id": cat.id} for cat in yar_example.categories[-2:]
+    ]
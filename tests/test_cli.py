@@ -47,3 +47,39 @@ def test_check_invoke(cli_runner: CliRunner):
     )
     pattern = re.compile("File was successfully parsed.*")
     assert re.match(pattern, result.output)
+
+
+def test_json_backend_option(cli_runner: CliRunner):
+    result = cli_runner.invoke(
+        cli,
+        [
+            "--json-backend",
+            "json",
+            "check",
+            "-f",
+            "examples/generate_simple/example_simple.yarrow.json",
+        ],
+    )
+    assert result.exit_code == 0
+
+    result = cli_runner.invoke(cli, ["--json-backend", "unknown", "check"])
+    assert result.exit_code == 2
+
+
+def test_trusted_option(cli_runner: CliRunner, tmp_path):
+    output_path = str(tmp_path / "output.yarrow.json")
+    result = cli_runner.invoke(
+        cli,
+        [
+            "save",
+            "--trusted",
+            "-f",
+            "examples/generate_simple/example_simple.yarrow.json",
+            "--output",
+            output_path,
+        ],
+    )
+    assert result.exit_code == 0
+
+    result = cli_runner.invoke(cli, ["check", "--trusted", "-f", output_path])
+    assert result.exit_code == 0
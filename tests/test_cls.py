@@ -1,3 +1,6 @@
+import pickle
+from copy import copy
+
 import pytest
 
 from yarrow import *
@@ -382,3 +385,294 @@ def test_get_split_should_return_only_split(yar_dataset: YarrowDataset):
     assert multi_set == set(res_dataset.multilayer_images)
     assert image_set == set(res_dataset.images)
     assert annot_set == set(res_dataset.annotations)
+
+
+def test_add_image_returns_existing_object(yar_dataset: YarrowDataset):
+    nb_images = len(yar_dataset.images)
+    img = yar_dataset.images[3]
+
+    same_img = Image(**img.__dict__)
+    res_img = yar_dataset.add_image(same_img)
+
+    assert res_img is img
+    assert len(yar_dataset.images) == nb_images
+
+
+def test_index_follows_list_replacement(yar_dataset: YarrowDataset, new_image: Image):
+    res_image = yar_dataset.add_image(new_image)
+    assert yar_dataset.add_image(new_image) is res_image
+
+    # Lists can still be manipulated directly, the index is rebuilt
+    yar_dataset.images = [img for img in yar_dataset.images if img is not res_image]
+    res_image2 = yar_dataset.add_image(new_image)
+
+    assert res_image2 is not res_image
+    assert res_image2 in yar_dataset.images
+    assert len([img for img in yar_dataset.images if img == new_image]) == 1
+
+
+def test_index_follows_identity_edits(
+    yar_dataset: YarrowDataset, new_annotation: Annotation, new_image: Image
+):
+    res_annot = yar_dataset.add_annotation(new_annotation)
+    res_annot.name = "renamed"
+    yar_dataset.reindex()
+    renamed = copy(new_annotation)
+    renamed.name = "renamed"
+    nb_annotations = len(yar_dataset.annotations)
+
+    assert yar_dataset.add_annotation(renamed) is res_annot
+    assert len(yar_dataset.annotations) == nb_annotations
+
+    res_image = yar_dataset.add_image(new_image)
+    res_image.file_name = "renamed.png"
+    yar_dataset.reindex()
+    renamed_image = Image(**new_image.__dict__)
+    renamed_image.file_name = "renamed.png"
+    nb_images = len(yar_dataset.images)
+
+    assert yar_dataset.add_image(renamed_image) is res_image
+    assert len(yar_dataset.images) == nb_images
+
+    res_annot.categories.append(Category(name="other"))
+    yar_dataset.reindex()
+    assert yar_dataset.add_annotation(copy(res_annot)) is res_annot
+
+
+def test_parse_trusted(yar_dataset_pydantic: YarrowDataset_pydantic, tmp_path):
+    yar_dataset_pydantic.images[0].layers = [Layer(frame_id=1, name="layer")]
+    yar_dataset_pydantic.images[1].meta = {"key": "value"}
+    yar_dataset_pydantic.annotations[0].mask = RLE(counts=[2, 3, 4], size=[3, 3])
+    file_path = tmp_path / "dataset.yarrow.json"
+    yar_dataset_pydantic.save_to_file(file_path, rle_encoding="compressed")
+
+    yar_validated = YarrowDataset_pydantic.parse_file(file_path)
+    yar_trusted = YarrowDataset_pydantic.parse_file(file_path, validate=False)
+
+    assert yar_trusted.dict(exclude_unset=True) == yar_validated.dict(
+        exclude_unset=True
+    )
+    assert isinstance(yar_trusted.images[0].date_captured, datetime)
+    assert isinstance(yar_trusted.images[0].layers[0], Layer)
+    assert yar_trusted.annotations[0].mask.counts == [2, 3, 4]
+
+    yar_cls = YarrowDataset.parse_file(file_path, validate=False)
+    assert yar_cls == YarrowDataset.parse_file(file_path)
+
+    raw = yar_dataset_pydantic.json(exclude_none=True)
+    assert YarrowDataset.parse_raw(raw, validate=False) == yar_cls
+    assert YarrowDataset.parse_obj(json.loads(raw), validate=False) == yar_cls
+
+
+def test_instance_dict(yar_dataset: YarrowDataset):
+    annot = yar_dataset.annotations[0]
+    multilayer = MultilayerImage(images=annot.images, name="multi")
+
+    for elem in (annot, annot.images[0], multilayer):
+        elem.other_attribute = 1
+        elem.__dict__["dict_attribute"] = 2
+        assert elem.other_attribute == 1
+        assert elem.dict_attribute == 2
+
+    annot_copy = copy(annot)
+    assert annot_copy.other_attribute == 1
+    assert pickle.loads(pickle.dumps(annot)).dict_attribute == 2
+
+
+def test_slots(yar_dataset_pydantic: YarrowDataset_pydantic):
+    yar_dataset = YarrowDataset.from_yarrow(yar_dataset_pydantic, slots=True)
+    assert yar_dataset == YarrowDataset.from_yarrow(yar_dataset_pydantic)
+    annot = yar_dataset.annotations[0]
+    multilayer = SlottedMultilayerImage(images=annot.images, name="multi")
+
+    assert isinstance(annot, SlottedAnnotation) and isinstance(annot, Annotation)
+    assert isinstance(annot.images[0], SlottedImage)
+    assert isinstance(annot.images[0], Image)
+    assert isinstance(multilayer, MultilayerImage)
+    for elem in (annot, annot.images[0], multilayer):
+        with pytest.raises(AttributeError):
+            elem.unknown_attribute = None
+        with pytest.raises(TypeError):
+            elem.__dict__["unknown_attribute"] = None
+        assert "_hash" not in elem.__dict__
+
+    annot.pydantic()
+    annot_copy = copy(annot)
+    assert annot_copy == annot
+    assert annot_copy.pydantic() == annot.pydantic()
+    assert annot_copy.pydantic().id == annot.pydantic().id
+
+    annot_unpickled = pickle.loads(pickle.dumps(annot))
+    assert annot_unpickled == annot
+    assert annot_unpickled.images == annot.images
+    assert pickle.loads(pickle.dumps(multilayer)) == multilayer
+
+    # Equal to the dict based classes
+    assert Annotation(**annot.__dict__) == annot
+    assert yar_dataset.add_annotation(Annotation(**annot.__dict__)) is annot
+
+
+def test_add_annotations_bulk(
+    yar_dataset: YarrowDataset,
+    new_annotation: Annotation,
+    new_image: Image,
+    new_category: Category,
+    new_clearance: Clearance,
+):
+    existing = yar_dataset.annotations[:5]
+    nb_annotations = len(yar_dataset.annotations)
+    nb_images = len(yar_dataset.images)
+
+    result = yar_dataset.add_annotations_bulk(
+        existing + [new_annotation, copy(new_annotation)]
+    )
+
+    assert isinstance(result, BulkInsertResult)
+    assert result.nb_new == 1
+    assert result.nb_merged == 6
+    assert result.elements[:5] == existing
+    assert all(found is annot for found, annot in zip(result.elements, existing))
+    assert result.elements[5] is result.elements[6]
+    assert result.elements[5] is not new_annotation
+    assert len(yar_dataset.annotations) == nb_annotations + 1
+    assert len(yar_dataset.images) == nb_images + 1
+    assert new_category in yar_dataset.categories
+    assert new_clearance in yar_dataset.confidential
+
+    added = result.elements[5]
+    assert added.images[0] is yar_dataset.images[-1]
+    assert added.images[0] is not new_image
+    assert added.categories[0] is yar_dataset.categories[-1]
+
+
+def test_add_annotations_bulk_in_place(
+    yar_dataset: YarrowDataset, new_annotation: Annotation
+):
+    yar_bulk = YarrowDataset(info=yar_dataset.info)
+    result = yar_bulk.add_annotations_bulk(
+        yar_dataset.annotations + [new_annotation], in_place=True
+    )
+
+    assert result.nb_new == len(yar_dataset.annotations) + 1
+    assert result.elements[-1] is new_annotation
+    assert yar_bulk.annotations[-1] is new_annotation
+
+    yar_single = YarrowDataset(info=yar_dataset.info)
+    yar_single.add_annotations(yar_dataset.annotations + [new_annotation])
+    assert yar_bulk == yar_single
+    assert yar_bulk.pydantic().images == yar_single.pydantic().images
+
+
+def test_add_images_bulk(yar_dataset: YarrowDataset, new_image: Image):
+    nb_images = len(yar_dataset.images)
+
+    result = yar_dataset.add_images_bulk(
+        [new_image, yar_dataset.images[0], copy(new_image)]
+    )
+
+    assert result.nb_new == 1
+    assert result.nb_merged == 2
+    assert result.elements[1] is yar_dataset.images[0]
+    assert result.elements[0] is result.elements[2]
+    assert result.elements[0] is not new_image
+    assert len(yar_dataset.images) == nb_images + 1
+    assert new_image.confidential in yar_dataset.confidential
+
+
+def test_query_indexes(yar_dataset: YarrowDataset, new_annotation: Annotation):
+    def brute_force():
+        for img in yar_dataset.images:
+            assert yar_dataset.annotations_for_image(img) == [
+                annot for annot in yar_dataset.annotations if img in annot.images
+            ]
+        for cat in yar_dataset.categories:
+            assert yar_dataset.annotations_by_category(cat) == [
+                annot for annot in yar_dataset.annotations if cat in annot.categories
+            ]
+            for contrib in yar_dataset.contributors:
+                assert yar_dataset.annotations_by_category(cat, contrib) == [
+                    annot
+                    for annot in yar_dataset.annotations
+                    if cat in annot.categories and annot.contributor == contrib
+                ]
+        for contrib in yar_dataset.contributors:
+            assert yar_dataset.annotations_by_contributor(contrib) == [
+                annot
+                for annot in yar_dataset.annotations
+                if annot.contributor == contrib
+            ]
+
+    brute_force()
+    assert yar_dataset.annotations_for_image(copy(yar_dataset.images[0]))
+
+    # The indexes follow the insertions
+    res_annot = yar_dataset.add_annotation(new_annotation)
+    assert yar_dataset.annotations_for_image(new_annotation.images[0]) == [res_annot]
+    yar_dataset.append(YarrowDataset.from_yarrow(rand_dataset()))
+    brute_force()
+
+    # and are rebuilt on demand after modifications in place
+    res_annot.categories = [yar_dataset.categories[0]]
+    yar_dataset.reindex()
+    brute_force()
+
+
+def test_images_by_split(yar_dataset: YarrowDataset, new_image: Image):
+    assert yar_dataset.images_by_split(None) == yar_dataset.images
+    assert yar_dataset.images_by_split("train") == []
+
+    yar_dataset.set_split("train")
+    res_image = yar_dataset.add_image(new_image)
+
+    assert yar_dataset.images_by_split("train") == yar_dataset.images[:-1]
+    assert yar_dataset.images_by_split(None) == [res_image]
+
+
+def test_partition_by_split(yar_dataset: YarrowDataset, new_image: Image):
+    for idx, img in enumerate(yar_dataset.images):
+        img.split = ["train", "test", None][idx % 3]
+    for multi in yar_dataset.multilayer_images[::2]:
+        multi.set_split("validate")
+    res_image = yar_dataset.add_image(new_image)
+    res_image.split = "test"
+
+    partition = yar_dataset.partition_by_split()
+
+    for split, part in partition.items():
+        # Each image of the split is there, the other ones come from an annotation
+        # or a multilayer image of the split
+        assert set(part.images) >= set(yar_dataset.images_by_split(split))
+        assert part.annotations == [
+            annot for annot in yar_dataset.annotations if annot.images[0].split == split
+        ]
+        assert part.multilayer_images == [
+            multi for multi in yar_dataset.multilayer_images if multi.split == split
+        ]
+        for annot in part.annotations:
+            assert all(
+                any(img is part_img for part_img in part.images) for img in annot.images
+            )
+            assert set(annot.categories) <= set(part.categories)
+            assert annot.contributor in part.contributors
+        assert part == yar_dataset.get_split(split)
+
+    # The unannotated image is kept
+    assert new_image in partition["test"].images
+    assert set(partition) == {"train", "test", "validate", None}
+
+    # Copies by default
+    assert all(img is not res_image for img in partition["test"].images)
+    partition["test"].images[0].split = "other"
+    assert all(img.split != "other" for img in yar_dataset.images)
+
+
+def test_partition_by_split_shallow(yar_dataset: YarrowDataset):
+    yar_dataset.set_split("train")
+
+    partition = yar_dataset.partition_by_split(shallow=True)
+
+    assert list(partition) == ["train"]
+    part = partition["train"]
+    assert all(a is b for a, b in zip(part.images, yar_dataset.images))
+    assert all(a is b for a, b in zip(part.annotations, yar_dataset.annotations))
+    assert part == yar_dataset
@@ -0,0 +1,65 @@
+import gzip
+
+import pytest
+from click.testing import CliRunner
+
+from yarrow import *
+from yarrow.compression import compression_of, open_file
+
+
+@pytest.fixture
+def yar_dataset_pydantic():
+    return rand_dataset()
+
+
+def test_compression_of():
+    assert compression_of("dataset.yarrow.json") is None
+    assert compression_of("dataset.yarrow.json.gz") == ".gz"
+    assert compression_of("dataset.yarrow.json.XZ") == ".xz"
+    assert compression_of("dataset.yarrow.json.zst") == ".zst"
+
+
+@pytest.mark.parametrize("extension", [".gz", ".xz", ".zst"])
+def test_save_parse_compressed(
+    tmp_path, yar_dataset_pydantic: YarrowDataset_pydantic, extension: str
+):
+    if extension == ".zst":
+        pytest.importorskip("zstandard")
+    file_path = tmp_path / ("dataset.yarrow.json" + extension)
+    plain_path = tmp_path / "dataset.yarrow.json"
+
+    yar_dataset_pydantic.save_to_file(file_path)
+    yar_dataset_pydantic.save_to_file(plain_path)
+
+    with open_file(file_path, "r") as fp, open(plain_path) as plain_fp:
+        assert fp.read() == plain_fp.read()
+
+    for validate in (True, False):
+        yar_parsed = YarrowDataset_pydantic.parse_file(file_path, validate=validate)
+        assert yar_parsed.images == yar_dataset_pydantic.images
+        assert yar_parsed.annotations == yar_dataset_pydantic.annotations
+
+    assert list(iter_section(file_path, "categories")) == (
+        yar_dataset_pydantic.categories
+    )
+    assert YarrowDataset.parse_file(file_path) == YarrowDataset.from_yarrow(
+        yar_dataset_pydantic
+    )
+
+
+def test_cli_compressed(tmp_path, yar_dataset_pydantic: YarrowDataset_pydantic):
+    input_path = str(tmp_path / "input.yarrow.json.xz")
+    output_path = str(tmp_path / "output.yarrow.json.gz")
+    yar_dataset_pydantic.save_to_file(input_path)
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ["save", "-f", input_path, "--output", output_path])
+    assert result.exit_code == 0
+
+    with gzip.open(output_path, "rt") as fp:
+        assert YarrowDataset_pydantic.parse_raw(fp.read()).images == (
+            yar_dataset_pydantic.images
+        )
+
+    result = runner.invoke(cli, ["check", "-f", output_path])
+    assert result.exit_code == 0
@@ -1,4 +1,6 @@
-from yarrow import rand_category, rand_contrib, rand_image
+from copy import copy
+
+from yarrow import *
 
 
 def test_cat_hash():
@@ -25,3 +27,93 @@ def test_image_hash():
 
     assert image_dict[image1] == "image1"
     assert image_dict[image2] == "image2"
+
+
+def test_annotation_hash_invalidation():
+    yar_dataset = YarrowDataset.from_yarrow(rand_dataset())
+    annot = yar_dataset.annotations[0]
+    other = copy(annot)
+    assert annot == other and hash(annot) == hash(other)
+
+    other.images = other.images + [yar_dataset.images[-1]]
+    assert annot != other
+
+    other.images = list(annot.images)
+    assert annot == other and hash(annot) == hash(other)
+
+    other.images.append(yar_dataset.images[-1])
+    assert annot != other
+    other.images.pop()
+
+    other.name = "other name"
+    assert annot != other
+    other.name = annot.name
+
+    other.categories = []
+    assert annot != other
+    other.categories = annot.categories
+
+    other.contributor = rand_contrib()
+    assert annot != other
+    other.contributor = annot.contributor
+
+    other.bbox = [0.0, 0.0, 1.0, 1.0]
+    assert annot != other
+    other.bbox = annot.bbox
+    assert annot == other and hash(annot) == hash(other)
+
+    # Elements replaced in place at the same length
+    other.images = list(annot.images)
+    other.images[0] = yar_dataset.images[-1]
+    assert annot != other
+    other.images[0] = annot.images[0]
+    assert annot == other and hash(annot) == hash(other)
+
+
+def test_annotation_bbox_edit_in_set():
+    yar_dataset = YarrowDataset.from_yarrow(rand_dataset())
+    res_annot = yar_dataset.annotations[0]
+    annots = {res_annot}
+
+    res_annot.bbox = [0.0, 0.0, 1.0, 1.0]
+    assert res_annot in annots
+
+    nb_annotations = len(yar_dataset.annotations)
+    res_annot.bbox[2] = 2.0
+    assert yar_dataset.add_annotation(copy(res_annot)) is res_annot
+    assert len(yar_dataset.annotations) == nb_annotations
+
+
+def test_multilayer_hash_invalidation():
+    images = [Image(**rand_image().dict()) for _ in range(3)]
+    multilayer = MultilayerImage(images=images[:2], name="multi")
+    other = MultilayerImage(images=images[1::-1], name="multi")
+    assert multilayer == other and hash(multilayer) == hash(other)
+
+    other.images.append(images[2])
+    assert multilayer != other
+
+    other.images = images[:2]
+    other.name = "other"
+    assert multilayer != other
+
+
+def test_hash_link_replaced_at_same_address():
+    # A popped image is freed and a new one can get its id(), the cached hash
+    # must not be reused for the new image
+    yar_dataset = YarrowDataset.from_yarrow(rand_dataset())
+    annot = yar_dataset.annotations[0]
+    multilayer = MultilayerImage(images=[yar_dataset.images[0]], name="multi")
+
+    for _ in range(200):
+        for elem in (annot, multilayer):
+            elem.images.append(Image(**rand_image().dict()))
+            hash(elem)
+            elem.images.pop()
+            elem.images.append(Image(**rand_image().dict()))
+
+            expected = copy(elem)
+            expected.images = list(elem.images)
+            assert hash(elem) == hash(expected)
+            assert elem == expected
+            elem.images.pop()
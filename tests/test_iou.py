@@ -0,0 +1,104 @@
+from copy import copy
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+from yarrow import *
+
+
+def test_box_iou():
+    boxes = np.array([[0, 0, 2, 2], [1, 1, 3, 3], [2, 0, 4, 2], [5, 5, 5, 5]])
+
+    ious = box_iou(boxes, boxes[:2])
+
+    np.testing.assert_allclose(
+        ious, [[1, 1 / 7], [1 / 7, 1], [0, 1 / 7], [0, 0]], atol=1e-12
+    )
+    np.testing.assert_allclose(paired_iou(boxes[:2], boxes[1:3]), [1 / 7, 1 / 7])
+    assert np.isnan(box_iou([[np.nan] * 4], boxes)).all()
+
+
+def test_overlapping_pairs():
+    rng = np.random.default_rng(0)
+    corners = rng.uniform(0, 100, size=(300, 2))
+    boxes = np.concatenate((corners, corners + rng.uniform(0, 20, size=(300, 2))), 1)
+    boxes[::11] = np.nan
+    groups = rng.integers(0, 5, size=300)
+
+    firsts, seconds = overlapping_pairs(boxes, groups)
+
+    expected = {
+        (i, j)
+        for i, j in combinations(range(300), 2)
+        if groups[i] == groups[j]
+        and not np.isnan(boxes[[i, j]]).any()
+        and boxes[i, 0] <= boxes[j, 2]
+        and boxes[j, 0] <= boxes[i, 2]
+    }
+    found = {tuple(sorted(pair)) for pair in zip(firsts.tolist(), seconds.tolist())}
+    assert found == expected
+    assert len(firsts) == len(expected)
+
+
+@pytest.fixture
+def yar_dataset():
+    yar_dataset = YarrowDataset.from_yarrow(rand_dataset())
+    for annot in yar_dataset.annotations:
+        annot.bbox = [10.0, 10.0, 20.0, 20.0] if annot.bbox is None else annot.bbox
+    return yar_dataset
+
+
+def brute_force(yar_dataset: YarrowDataset, threshold: float) -> list:
+    result = []
+    for first, second in combinations(yar_dataset.annotations, 2):
+        if set(first.images).isdisjoint(second.images) or set(
+            first.categories
+        ).isdisjoint(second.categories):
+            continue
+        iou = float(box_iou([first.bbox], [second.bbox])[0, 0])
+        if iou >= threshold:
+            result.append((first, second))
+    return result
+
+
+def test_find_duplicate_annotations(yar_dataset: YarrowDataset):
+    annotations = yar_dataset.annotations
+    contributors = yar_dataset.contributors
+    # Near duplicates of the first annotations, by another contributor
+    for annot in annotations[:5]:
+        duplicate = copy(annot)
+        duplicate.bbox = [value + 0.001 for value in annot.bbox]
+        duplicate.contributor = next(
+            contrib for contrib in contributors if contrib != annot.contributor
+        )
+        yar_dataset.add_annotation(duplicate)
+    # Same box on two images
+    multi = copy(annotations[6])
+    multi.images = annotations[6].images + annotations[7].images
+    multi.categories = annotations[7].categories
+    multi.bbox = list(annotations[7].bbox)
+    res_multi = yar_dataset.add_annotation(multi)
+
+    for threshold in (0.1, 0.9):
+        duplicates = yar_dataset.find_duplicate_annotations(threshold)
+        assert [(dup.first, dup.second) for dup in duplicates] == brute_force(
+            yar_dataset, threshold
+        )
+    duplicates = yar_dataset.find_duplicate_annotations(0.9)
+    assert any(dup.second is res_multi and dup.iou == 1 for dup in duplicates)
+    assert len(duplicates) >= 6
+
+    distinct = yar_dataset.find_duplicate_annotations(0.9, distinct_contributors=True)
+    assert distinct == [
+        dup for dup in duplicates if dup.first.contributor != dup.second.contributor
+    ]
+    # The pydantic dataset gives the same pairs
+    yar_pydantic = yar_dataset.pydantic()
+    assert [
+        (dup.first.id, dup.second.id)
+        for dup in find_duplicate_annotations(yar_pydantic, 0.9)
+    ] == [(dup.first.pydantic().id, dup.second.pydantic().id) for dup in duplicates]
+
+    with pytest.raises(ValueError):
+        yar_dataset.find_duplicate_annotations(0)
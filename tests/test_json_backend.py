@@ -0,0 +1,66 @@
+import json
+from datetime import datetime
+
+import pytest
+
+import yarrow.json_backend as json_backend_module
+from yarrow import *
+from yarrow.json_backend import (
+    available_json_backends,
+    get_json_backend,
+    json_dumps,
+    set_json_backend,
+)
+
+
+@pytest.fixture(params=available_json_backends())
+def json_backend(request):
+    previous = get_json_backend().name
+    yield set_json_backend(request.param)
+    set_json_backend(previous)
+
+
+def test_auto_selects_fastest():
+    previous = get_json_backend().name
+    assert set_json_backend("auto").name == available_json_backends()[0]
+    assert available_json_backends()[-1] == "json"
+    set_json_backend(previous)
+
+    with pytest.raises(ValueError):
+        set_json_backend("unknown")
+
+
+def test_default_is_standard_library(monkeypatch):
+    monkeypatch.setattr(json_backend_module, "_current_backend", None)
+    assert get_json_backend().name == "json"
+
+    set_json_backend("auto")
+    assert set_json_backend().name == "json"
+
+
+def test_dumps_equivalent_to_json(json_backend):
+    value = {"date": datetime(2022, 1, 2, 3, 4, 5), "list": [1, 0.5, {}], "text": "é/"}
+
+    for indent in (None, 2, 4):
+        text = json_backend.dumps(value, default=str, indent=indent)
+        assert json.loads(text) == json.loads(json.dumps(value, default=str))
+
+    assert json_backend.dumps(value, default=str, indent=4).splitlines()[1] == (
+        '    "date": "2022-01-02 03:04:05",'
+    )
+    assert json_dumps([1, 2], indent=None, sort_keys=True) == "[1, 2]"
+
+
+def test_save_parse(tmp_path, json_backend):
+    yar_dataset = rand_dataset()
+    file_path = tmp_path / "dataset.yarrow.json"
+
+    yar_dataset.save_to_file(file_path)
+    yar_parsed = YarrowDataset_pydantic.parse_file(file_path)
+
+    assert yar_parsed.info == yar_dataset.info
+    assert yar_parsed.images == yar_dataset.images
+    assert yar_parsed.annotations == yar_dataset.annotations
+
+    yar_raw = YarrowDataset.parse_raw(yar_dataset.json(exclude_none=True))
+    assert yar_raw == YarrowDataset.from_yarrow(yar_dataset)
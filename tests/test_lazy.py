@@ -0,0 +1,128 @@
+import pickle
+import warnings
+
+import pytest
+
+from yarrow import *
+from yarrow.binary import BinaryFile
+from yarrow.lazy import LazySection, LazyYarrowDataset
+
+
+@pytest.fixture
+def binary_path(tmp_path):
+    yar_dataset = rand_dataset()
+    yar_dataset.annotations[0].image_id = [img.id for img in yar_dataset.images[:3]]
+    yar_dataset.annotations[1].mask = RLE(counts=[2, 3, 4], size=[3, 3])
+    yar_dataset.annotations[2].bbox = None
+    yar_dataset.images[0].split = "train"
+
+    file_path = tmp_path / "dataset.yarrow.npz"
+    yar_dataset.to_binary(file_path)
+    return file_path
+
+
+def annotation_dict(annot: Annotation) -> dict:
+    result = annot.pydantic().dict(exclude={"id"})
+    result["image_id"] = sorted(result["image_id"])
+    return result
+
+
+def test_lazy_matches_loaded(binary_path):
+    yar_full = YarrowDataset.from_binary(binary_path)
+    yar_lazy = LazyYarrowDataset(binary_path)
+
+    assert isinstance(yar_lazy.annotations, LazySection)
+    assert len(yar_lazy.images) == len(yar_full.images)
+    assert len(yar_lazy.annotations) == len(yar_full.annotations)
+    assert list(yar_lazy.images) == yar_full.images
+    assert list(yar_lazy.annotations) == yar_full.annotations
+    assert list(yar_lazy.multilayer_images) == yar_full.multilayer_images
+    assert yar_lazy.categories == yar_full.categories
+    assert yar_lazy.contributors == yar_full.contributors
+    assert yar_lazy.info == yar_full.info
+
+    for annot_lazy, annot_full in zip(yar_lazy.annotations, yar_full.annotations):
+        assert annotation_dict(annot_lazy) == annotation_dict(annot_full)
+    for img_lazy, img_full in zip(yar_lazy.images, yar_full.images):
+        assert img_lazy.pydantic().dict() == img_full.pydantic().dict()
+
+    assert len(yar_lazy.annotations[0].images) == 3
+    assert yar_lazy.annotations[2].bbox is None
+    assert yar_lazy.images[0].split == "train"
+
+
+def test_lazy_indexing(binary_path):
+    yar_lazy = LazyYarrowDataset(binary_path)
+
+    assert yar_lazy.images[-1] == yar_lazy.images[len(yar_lazy.images) - 1]
+    assert yar_lazy.images[1:3] == [yar_lazy.images[1], yar_lazy.images[2]]
+    with pytest.raises(IndexError):
+        yar_lazy.images[len(yar_lazy.images)]
+
+
+def test_lazy_pickle(binary_path):
+    yar_lazy = LazyYarrowDataset(binary_path)
+
+    data = pickle.dumps(yar_lazy)
+    # Only the path is pickled, not the arrays
+    assert len(data) < 1000
+
+    yar_unpickled = pickle.loads(data)
+    assert yar_unpickled.annotations[3] == yar_lazy.annotations[3]
+
+
+def test_lazy_compressed(tmp_path):
+    yar_dataset = rand_dataset()
+    file_path = tmp_path / "dataset.yarrow.npz"
+    yar_dataset.to_binary(file_path, compress=True)
+
+    yar_lazy = LazyYarrowDataset(file_path)
+
+    assert (
+        list(yar_lazy.annotations) == YarrowDataset.from_binary(file_path).annotations
+    )
+
+
+def test_lazy_materialize(binary_path):
+    yar_lazy = LazyYarrowDataset(binary_path)
+
+    yar_full = yar_lazy.materialize()
+
+    assert isinstance(yar_full, YarrowDataset)
+    assert yar_full.annotations == list(yar_lazy.annotations)
+
+
+def test_lazy_unset_fields(tmp_path):
+    yar_dataset = rand_dataset()
+    for annot in yar_dataset.annotations:
+        annot.__fields_set__.discard("is_crowd")
+    file_path = tmp_path / "dataset.yarrow.npz"
+    yar_dataset.to_binary(file_path)
+
+    yar_lazy = LazyYarrowDataset(file_path)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", DeprecationWarning)
+        annotations = list(yar_lazy.annotations)
+
+    assert [annot.pydantic() for annot in annotations] == yar_dataset.annotations
+
+
+def test_lazy_json_image_id(tmp_path):
+    yar_dataset = rand_dataset()
+    # A tuple cannot be stored as references, the column falls back to json
+    yar_dataset.annotations[0].image_id = tuple(
+        img.id for img in yar_dataset.images[:2]
+    )
+    file_path = tmp_path / "dataset.yarrow.npz"
+    yar_dataset.to_binary(file_path)
+    assert (
+        BinaryFile(file_path).header["sections"]["annotations"]["columns"]["image_id"]
+        == "json"
+    )
+
+    yar_lazy = LazyYarrowDataset(file_path)
+
+    assert len(yar_lazy.annotations[0].images) == 2
+    assert (
+        list(yar_lazy.annotations) == YarrowDataset.from_binary(file_path).annotations
+    )
@@ -0,0 +1,65 @@
+import pytest
+
+from yarrow import *
+
+
+@pytest.fixture
+def paths(tmp_path):
+    yar_first = rand_dataset()
+    yar_second = rand_dataset()
+    # The second file shares an annotation and its image with the first one
+    shared = yar_first.annotations[0]
+    yar_second.annotations.append(shared)
+    yar_second.images.extend(
+        img for img in yar_first.images if img.id in shared.image_id
+    )
+    yar_second.categories.extend(
+        cat for cat in yar_first.categories if cat.id in shared.category_id
+    )
+    yar_second.contributors.extend(
+        contrib
+        for contrib in yar_first.contributors
+        if contrib.id == shared.contributor_id
+    )
+
+    result = [tmp_path / "first.yarrow.json", tmp_path / "second.yarrow.json.gz"]
+    yar_first.save_to_file(result[0])
+    yar_second.save_to_file(result[1])
+    result.append(tmp_path / "third.yarrow.npz")
+    rand_dataset().to_binary(result[2])
+    return result
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_load_many(paths, workers):
+    yar_loaded = load_many(paths, workers=workers)
+
+    yar_expected = YarrowDataset(info=YarrowDataset_pydantic.parse_file(paths[0]).info)
+    yar_expected.extend(
+        [
+            YarrowDataset.parse_file(paths[0]),
+            YarrowDataset.parse_file(paths[1]),
+            YarrowDataset.from_binary(paths[2]),
+        ]
+    )
+    assert yar_loaded == yar_expected
+    assert len(yar_loaded.annotations) == len(yar_expected.annotations)
+    assert yar_loaded.info == yar_expected.info
+
+
+def test_load_many_identity(paths):
+    yar_loaded = load_many(paths, workers=2)
+
+    image_ids = {id(img) for img in yar_loaded.images}
+    category_ids = {id(cat) for cat in yar_loaded.categories}
+    for annot in yar_loaded.annotations:
+        assert all(id(img) in image_ids for img in annot.images)
+        assert all(id(cat) in category_ids for cat in annot.categories)
+    assert len(set(yar_loaded.images)) == len(yar_loaded.images)
+
+
+def test_load_many_empty():
+    info = rand_info()
+    assert load_many([], info=info).info == info
+    with pytest.raises(ValueError):
+        load_many([])
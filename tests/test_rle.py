@@ -0,0 +1,126 @@
+import json
+
+import numpy as np
+import pytest
+
+from yarrow import RLE
+
+
+def reference_encode(binary_mask: np.ndarray):
+    """Pixel by pixel encoding, kept to check the vectorized one"""
+    counts = []
+    last_elem = 0
+    running_length = 0
+    for elem in binary_mask.ravel(order="C"):
+        if elem != last_elem:
+            counts.append(running_length)
+            running_length = 0
+            last_elem = elem
+        running_length += 1
+    counts.append(running_length)
+    return counts, list(binary_mask.shape)
+
+
+@pytest.fixture
+def masks():
+    rng = np.random.default_rng(0)
+    result = [
+        np.zeros((7, 5), dtype=np.uint8),
+        np.ones((7, 5), dtype=np.uint8),
+        (rng.random((7, 5)) > 0.5).astype(np.uint8),
+        rng.random((7, 5)) > 0.8,
+    ]
+    first_on = np.zeros((7, 5), dtype=np.uint8)
+    first_on[0, :3] = 1
+    result.append(first_on)
+    return result
+
+
+def test_encode_same_as_reference(masks):
+    for mask in masks:
+        rle = RLE(binary_mask=mask)
+        counts, size = reference_encode(mask)
+        assert rle.counts == counts
+        assert rle.size == size
+        assert all(type(count) is int for count in rle.counts)
+
+
+def test_decode_round_trip(masks):
+    for mask in masks:
+        rle = RLE(binary_mask=mask)
+        decoded = rle.binary_mask
+        assert decoded.dtype == np.uint8
+        assert decoded.shape == mask.shape
+        assert np.array_equal(decoded, mask.astype(np.uint8))
+
+
+def test_decode_malformed_counts():
+    assert np.array_equal(
+        RLE(counts=[1, 2], size=[2, 2]).binary_mask, np.array([[0, 1], [1, 0]])
+    )
+    assert np.array_equal(
+        RLE(counts=[0, 3, 4], size=[1, 2]).binary_mask, np.array([[1, 1]])
+    )
+
+
+def test_batch_encode(masks):
+    stack = np.stack([mask.astype(np.uint8) for mask in masks])
+    rles = RLE.from_binary_masks(stack)
+
+    assert rles == [RLE(binary_mask=mask) for mask in stack]
+
+    assert RLE.from_binary_masks(np.zeros((0, 7, 5), dtype=np.uint8)) == []
+
+
+def test_batch_decode(masks):
+    stack = np.stack([mask.astype(np.uint8) for mask in masks])
+    rles = [RLE(binary_mask=mask) for mask in stack]
+
+    assert np.array_equal(RLE.to_binary_masks(rles), stack)
+
+    rles.append(RLE(counts=[1], size=[7, 5]))
+    assert RLE.to_binary_masks(rles).shape == (len(masks) + 1, 7, 5)
+
+    with pytest.raises(ValueError):
+        RLE.to_binary_masks([rles[0], RLE(counts=[4], size=[2, 2])])
+
+
+def test_compressed_counts_round_trip(masks):
+    for mask in masks:
+        rle = RLE(binary_mask=mask)
+        compressed = rle.compressed_counts
+
+        assert isinstance(compressed, str)
+        assert RLE(counts=compressed, size=rle.size) == rle
+
+    counts = [0, 5, 100000, 3, 2, 70000, 1]
+    assert (
+        RLE(counts=RLE(counts=counts, size=[1]).compressed_counts, size=[1]).counts
+        == counts
+    )
+
+
+def test_save_compressed_mask(tmp_path):
+    from yarrow import rand_dataset
+
+    mask = np.zeros((20, 30), dtype=np.uint8)
+    mask[5:15, 10:25] = 1
+    yar_dataset = rand_dataset()
+    yar_dataset.annotations[0].mask = RLE(binary_mask=mask)
+
+    file_list = tmp_path / "list.yarrow.json"
+    file_compressed = tmp_path / "compressed.yarrow.json"
+    yar_dataset.save_to_file(file_list)
+    yar_dataset.save_to_file(file_compressed, rle_encoding="compressed")
+
+    with open(file_compressed) as fp:
+        content = json.load(fp)
+    assert isinstance(content["annotations"][0]["mask"]["counts"], str)
+
+    for path in (file_list, file_compressed):
+        loaded = type(yar_dataset).parse_file(path)
+        assert loaded.annotations[0].mask == yar_dataset.annotations[0].mask
+        assert np.array_equal(loaded.annotations[0].mask.binary_mask, mask)
+
+    with pytest.raises(ValueError):
+        yar_dataset.save_to_file(file_list, rle_encoding="unknown")
@@ -0,0 +1,73 @@
+from copy import copy
+
+import numpy as np
+import pytest
+
+from yarrow import *
+
+
+def rand_boxes(nb_boxes: int, rng: np.random.Generator) -> np.ndarray:
+    corners = rng.uniform(0, 1000, size=(nb_boxes, 2))
+    sizes = rng.uniform(0, 50, size=(nb_boxes, 2))
+    return np.concatenate((corners, corners + sizes), axis=1)
+
+
+@pytest.mark.parametrize("nb_boxes", [0, 1, 16, 17, 1000])
+@pytest.mark.parametrize("node_size", [2, 16])
+def test_box_index(nb_boxes: int, node_size: int):
+    rng = np.random.default_rng(nb_boxes)
+    boxes = rand_boxes(nb_boxes, rng)
+    boxes[::7] = np.nan
+
+    index = BoxIndex(boxes, node_size=node_size)
+
+    assert len(index) == nb_boxes
+    for query in rand_boxes(50, rng) * [1, 1, 1.2, 1.2]:
+        np.testing.assert_array_equal(
+            index.query(query), brute_force_query(boxes, query)
+        )
+    np.testing.assert_array_equal(
+        index.query([-1, -1, 2000, 2000]), np.flatnonzero(~np.isnan(boxes[:, 0]))
+    )
+    # Touching edges overlap
+    if nb_boxes > 1:
+        assert 1 in index.query([boxes[1, 2], boxes[1, 3], 2000, 2000]).tolist()
+
+
+def test_query_region():
+    yar_dataset = YarrowDataset.from_yarrow(rand_dataset())
+    image = yar_dataset.images[0]
+    annot = yar_dataset.annotations_for_image(image)[0]
+    rng = np.random.default_rng(0)
+    for box in rand_boxes(200, rng).tolist():
+        new_annot = copy(annot)
+        new_annot.bbox = box
+        yar_dataset.add_annotation(new_annot)
+
+    def brute_force(region):
+        return [
+            annot
+            for annot in yar_dataset.annotations
+            if image in annot.images
+            and annot.bbox is not None
+            and annot.bbox[0] <= region[2]
+            and annot.bbox[2] >= region[0]
+            and annot.bbox[1] <= region[3]
+            and annot.bbox[3] >= region[1]
+        ]
+
+    regions = rand_boxes(20, rng) * [1, 1, 2, 2]
+    for region in regions:
+        assert yar_dataset.query_region(image, region) == brute_force(region)
+
+    # Added annotations are found
+    new_annot = copy(annot)
+    new_annot.bbox = [5000, 5000, 5001, 5001]
+    res_annot = yar_dataset.add_annotation(new_annot)
+    assert yar_dataset.query_region(image, [4990, 4990, 5010, 5010]) == [res_annot]
+
+    # and modified boxes after reindex()
+    res_annot.bbox = [6000, 6000, 6001, 6001]
+    yar_dataset.reindex()
+    assert yar_dataset.query_region(image, [4990, 4990, 5010, 5010]) == []
+    assert yar_dataset.query_region(image, [5990, 5990, 6010, 6010]) == [res_annot]
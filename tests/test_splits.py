@@ -0,0 +1,115 @@
+import pytest
+
+from yarrow import *
+
+
+def add_annotations(yar_dataset: YarrowDataset, images: list, category: Category):
+    contributor = yar_dataset.contributors[0]
+    for image in images:
+        yar_dataset.add_annotation(
+            Annotation(
+                images=[image],
+                categories=[category],
+                contributor=contributor,
+                **rand_annot(image_id=image.id, cat_id=category.id).dict()
+            )
+        )
+
+
+@pytest.fixture
+def yar_dataset():
+    yar_dataset = YarrowDataset.from_yarrow(
+        rand_dataset(images=[rand_image() for _ in range(300)], annotations=[])
+    )
+    add_annotations(yar_dataset, yar_dataset.images[:200], rand_category())
+    # A rare category on a few images, outside of the multilayer images
+    add_annotations(yar_dataset, yar_dataset.images[100:120], rand_category())
+    return yar_dataset
+
+
+def test_split_assignment_deterministic(yar_dataset: YarrowDataset):
+    splits = split_assignment(yar_dataset)
+    assert split_assignment(yar_dataset) == splits
+
+    # The order of the images does not matter
+    by_name = dict(zip((img.file_name for img in yar_dataset.images), splits))
+    yar_dataset.images.sort(key=lambda img: img.id)
+    shuffled = split_assignment(yar_dataset)
+    assert shuffled == [by_name[img.file_name] for img in yar_dataset.images]
+
+    assert split_assignment(yar_dataset, seed="other") != splits
+
+
+def test_split_assignment_stable(yar_dataset: YarrowDataset):
+    splits = split_assignment(yar_dataset, {"train": 0.6, "test": 0.4})
+    assert abs(splits.count("train") - 0.6 * len(splits)) <= 40
+
+    # Adding and removing images does not move the other images
+    kept = dict(zip(yar_dataset.images, splits))
+    linked = {
+        img
+        for elem in (*yar_dataset.annotations, *yar_dataset.multilayer_images)
+        for img in elem.images
+    }
+    unlinked = [img for img in yar_dataset.images if img not in linked]
+    assert unlinked
+    yar_dataset.images.remove(unlinked[0])
+    for _ in range(100):
+        yar_dataset.add_image(Image(**rand_image().dict()))
+    grown = split_assignment(yar_dataset, {"train": 0.6, "test": 0.4})
+    for image, split in zip(yar_dataset.images, grown):
+        if image in kept:
+            assert split == kept[image]
+
+
+def test_split_assignment_group_ratios():
+    images = [Image(**rand_image().dict()) for _ in range(4000)]
+    yar_dataset = YarrowDataset(info=rand_info())
+    yar_dataset.add_images(images)
+    for start in range(0, len(images), 4):
+        yar_dataset.add_multilayer_image(
+            MultilayerImage(images=images[start : start + 4], name=str(start))
+        )
+
+    splits = split_assignment(yar_dataset)
+
+    # 1000 groups of 4 images, each split gets its ratio of the groups
+    nb_groups = len(images) // 4
+    for split, ratio in DEFAULT_RATIOS.items():
+        assert abs(splits.count(split) / 4 - ratio * nb_groups) <= 60
+
+
+def test_assign_splits_ratios(yar_dataset: YarrowDataset):
+    counts = yar_dataset.assign_splits({"train": 0.6, "test": 0.4}, stratify=True)
+
+    assert set(counts) == {"train", "test"}
+    assert sum(counts.values()) == len(yar_dataset.images)
+    assert abs(counts["train"] - 0.6 * len(yar_dataset.images)) <= 10
+    assert set(yar_dataset.images_by_split("train")) == {
+        img for img in yar_dataset.images if img.split == "train"
+    }
+
+    # The rare category is stratified
+    rare = yar_dataset.annotations[-1].categories[0]
+    rare_splits = [
+        annot.images[0].split for annot in yar_dataset.annotations_by_category(rare)
+    ]
+    assert rare_splits.count("train") == 12
+
+
+def test_assign_splits_groups(yar_dataset: YarrowDataset):
+    multi = yar_dataset.multilayer_images[0]
+    annot = yar_dataset.annotations[0]
+    annot.images = annot.images + yar_dataset.images[-3:]
+
+    yar_dataset.assign_splits({"train": 0.5, "validate": 0.5})
+
+    assert {img.split for img in multi.images} == {multi.split}
+    assert len({img.split for img in annot.images}) == 1
+
+
+def test_split_assignment_errors(yar_dataset: YarrowDataset):
+    with pytest.raises(ValueError):
+        split_assignment(yar_dataset, {})
+    with pytest.raises(ValueError):
+        split_assignment(yar_dataset, {"train": 1, "test": -1})
@@ -0,0 +1,145 @@
+import io
+import json
+
+import pytest
+
+from yarrow import *
+from yarrow.json_backend import get_json_backend, set_json_backend
+
+
+@pytest.fixture
+def yar_dataset_pydantic():
+    return rand_dataset()
+
+
+@pytest.fixture
+def std_json_backend():
+    previous = get_json_backend().name
+    yield set_json_backend("json")
+    set_json_backend(previous)
+
+
+@pytest.fixture
+def yar_file(tmp_path, yar_dataset_pydantic: YarrowDataset_pydantic):
+    file_path = tmp_path / "dataset.yarrow.json"
+    yar_dataset_pydantic.save_to_file(file_path)
+    return file_path
+
+
+def collect_sections(elements):
+    result = {}
+    for key, elem in elements:
+        result.setdefault(key, []).append(elem)
+    return result
+
+
+@pytest.mark.parametrize("chunk_size", [7, 1 << 16])
+def test_iter_file_same_as_parse(yar_file, chunk_size: int):
+    yar_parsed = YarrowDataset_pydantic.parse_file(yar_file)
+    result = collect_sections(iter_file(yar_file, chunk_size=chunk_size))
+
+    assert result["info"] == [yar_parsed.info]
+    assert result["images"] == yar_parsed.images
+    assert result["annotations"] == yar_parsed.annotations
+    assert result["categories"] == yar_parsed.categories
+    assert result["contributors"] == yar_parsed.contributors
+    assert result["confidential"] == yar_parsed.confidential
+    assert [multi.id for multi in result["multilayer_images"]] == [
+        multi.id for multi in yar_parsed.multilayer_images
+    ]
+
+
+def test_iter_section(yar_file, yar_dataset_pydantic: YarrowDataset_pydantic):
+    annotations = list(iter_section(yar_file, "annotations", chunk_size=13))
+
+    assert all(isinstance(annot, Annotation_pydantic) for annot in annotations)
+    assert annotations == yar_dataset_pydantic.annotations
+
+    with pytest.raises(ValueError):
+        list(iter_section(yar_file, "unknown"))
+
+
+def test_iter_file_streams():
+    raw = '{"info": {"source": "test", "date_created": "2022-01-01T00:00:00"}, "other": [1, 2], "images": [], "annotations": null}'
+
+    for source in (io.StringIO(raw), io.BytesIO(raw.encode("utf-8"))):
+        result = list(iter_file(source))
+        assert [key for key, _ in result] == ["info"]
+        assert result[0][1].source == "test"
+
+    with pytest.raises(ValueError):
+        list(iter_file(io.StringIO("[]")))
+    with pytest.raises(ValueError):
+        list(iter_file(io.StringIO('{"images": {}}')))
+
+
+@pytest.mark.parametrize("indent", [4, 2, "\t", None])
+@pytest.mark.parametrize("exclude_unset", [True, False])
+def test_save_same_as_dump(
+    tmp_path,
+    yar_dataset_pydantic: YarrowDataset_pydantic,
+    indent,
+    exclude_unset,
+    std_json_backend,
+):
+    file_path = tmp_path / "dataset.yarrow.json"
+    yar_dataset_pydantic.save_to_file(
+        file_path, indent=indent, exclude_unset=exclude_unset
+    )
+
+    separators = (",", ":") if indent is None else None
+    expected = json.dumps(
+        yar_dataset_pydantic.dict(exclude_unset=exclude_unset, exclude_none=True),
+        default=str,
+        indent=indent,
+        separators=separators,
+    )
+    with open(file_path) as fp:
+        assert fp.read() == expected
+
+    yar_parsed = YarrowDataset_pydantic.parse_file(file_path)
+    assert yar_parsed.images == yar_dataset_pydantic.images
+    assert yar_parsed.annotations == yar_dataset_pydantic.annotations
+
+
+def test_save_keeps_unset_sections_out(
+    tmp_path, yar_dataset_pydantic: YarrowDataset_pydantic, std_json_backend
+):
+    file_path = tmp_path / "dataset.yarrow.json"
+    yar_partial = YarrowDataset_pydantic(
+        info=yar_dataset_pydantic.info, images=yar_dataset_pydantic.images
+    )
+    yar_partial.save_to_file(file_path, exclude_unset=True, exclude_none=False)
+
+    expected = json.dumps(
+        yar_partial.dict(exclude_unset=True, exclude_none=False),
+        default=str,
+        indent=4,
+    )
+    with open(file_path) as fp:
+        content = fp.read()
+    assert content == expected
+    assert "annotations" not in json.loads(content)
+
+
+def test_write_file_generators(tmp_path, yar_dataset_pydantic: YarrowDataset_pydantic):
+    file_path = tmp_path / "dataset.yarrow.json"
+    stream = io.StringIO()
+
+    write_file(
+        stream,
+        info=yar_dataset_pydantic.info,
+        images=(img for img in yar_dataset_pydantic.images),
+        annotations=(annot.dict() for annot in yar_dataset_pydantic.annotations),
+        categories=iter(yar_dataset_pydantic.categories),
+        indent=None,
+    )
+    yar_written = YarrowDataset_pydantic.parse_raw(stream.getvalue())
+
+    assert yar_written.images == yar_dataset_pydantic.images
+    assert yar_written.annotations == yar_dataset_pydantic.annotations
+    assert yar_written.categories == yar_dataset_pydantic.categories
+    assert yar_written.contributors == []
+
+    write_file(file_path, info=yar_dataset_pydantic.info)
+    assert YarrowDataset_pydantic.parse_file(file_path).images == []
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from yarrow import *
+
+
+@pytest.fixture
+def yar_dataset_pydantic():
+    yar_dataset = rand_dataset()
+    yar_dataset.annotations[0].image_id = [img.id for img in yar_dataset.images[:2]]
+    yar_dataset.annotations[1].bbox = None
+    yar_dataset.annotations[2].weight = 0.5
+    yar_dataset.annotations[3].num_keypoints = 3
+    return yar_dataset
+
+
+def test_from_pydantic(yar_dataset_pydantic: YarrowDataset_pydantic):
+    table = AnnotationTable.from_yarrow(yar_dataset_pydantic)
+    annotations = yar_dataset_pydantic.annotations
+
+    assert len(table) == len(annotations)
+    assert table.bbox.shape == (len(annotations), 4)
+    assert table.bbox[0].tolist() == annotations[0].bbox
+    assert np.isnan(table.bbox[1]).all()
+    assert table.weight[2] == 0.5
+    assert table.num_keypoints[3] == 3
+    assert table.num_keypoints[4] == -1
+
+    images_0 = table.image_indexes[table.image_offsets[0] : table.image_offsets[1]]
+    assert [table.images[idx].id for idx in images_0] == annotations[0].image_id
+    for row, annot in enumerate(annotations):
+        assert table.categories[table.category[row]].id == annot.category_id
+        assert table.contributors[table.contributor[row]].id == annot.contributor_id
+    assert table.images[table.image[1]].id == annotations[1].image_id
+
+
+def test_from_runtime(yar_dataset_pydantic: YarrowDataset_pydantic):
+    yar_dataset = YarrowDataset.from_yarrow(yar_dataset_pydantic)
+
+    table = AnnotationTable.from_yarrow(yar_dataset)
+
+    for row, annot in enumerate(yar_dataset.annotations):
+        start, end = table.image_offsets[row], table.image_offsets[row + 1]
+        assert [table.images[idx] for idx in table.image_indexes[start:end]] == (
+            annot.images
+        )
+        assert table.categories[table.category[row]] == annot.categories[0]
+        assert table.contributors[table.contributor[row]] is annot.contributor
+    np.testing.assert_array_equal(
+        table.bbox, AnnotationTable.from_yarrow(yar_dataset_pydantic).bbox
+    )
+
+
+def test_round_trip(yar_dataset_pydantic: YarrowDataset_pydantic):
+    table = AnnotationTable.from_yarrow(yar_dataset_pydantic)
+
+    yar_back = table.to_yarrow()
+
+    assert yar_back.dict(exclude_unset=True) == yar_dataset_pydantic.dict(
+        exclude_unset=True
+    )
+
+    yar_dataset = YarrowDataset.from_yarrow(yar_dataset_pydantic)
+    assert AnnotationTable.from_yarrow(yar_dataset).to_yarrow() == yar_dataset
+
+
+@pytest.mark.parametrize("annotations", [[], None])
+def test_round_trip_without_annotations(
+    yar_dataset_pydantic: YarrowDataset_pydantic, annotations
+):
+    yar_empty = yar_dataset_pydantic.copy(update={"annotations": annotations})
+
+    yar_back = AnnotationTable.from_yarrow(yar_empty).to_yarrow()
+
+    assert yar_back.annotations == annotations
+    assert yar_back.dict(exclude_unset=True) == yar_empty.dict(exclude_unset=True)
+
+
+def test_vectorized_update(yar_dataset_pydantic: YarrowDataset_pydantic):
+    yar_dataset = YarrowDataset.from_yarrow(yar_dataset_pydantic)
+    table = AnnotationTable.from_yarrow(yar_dataset)
+    old_bbox = yar_dataset.annotations[0].bbox
+
+    table.bbox *= 2
+    table.area[:] = np.nan
+    yar_scaled = table.to_yarrow()
+
+    assert yar_scaled.annotations[0].bbox == [value * 2 for value in old_bbox]
+    assert yar_scaled.annotations[0].area is None
+    assert yar_scaled.annotations[1].bbox is None
+    # The source dataset is left unchanged
+    assert yar_dataset.annotations[0].bbox == old_bbox
+
+
+def test_invalid(yar_dataset_pydantic: YarrowDataset_pydantic):
+    with pytest.raises(TypeError):
+        AnnotationTable.from_yarrow([])
+
+    yar_dataset_pydantic.annotations[0].contributor_id = "unknown"
+    with pytest.raises(ValueError):
+        AnnotationTable.from_yarrow(yar_dataset_pydantic)